@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -7,6 +6,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import warnings
+from feedbacks_core import load_dataset
 warnings.filterwarnings('ignore')
 
 class FeedbackAnalyzer:
@@ -22,43 +22,22 @@ class FeedbackAnalyzer:
         self.prepare_data()
     
     def load_data(self, feedbacks_path, rutas_path):
-        """Carga los datos de los archivos Excel"""
+        """Carga el FeedbackDataset compartido (ingesta única de feedbacks_core)"""
         try:
             print("Cargando datos...")
-            self.feedbacks_df = pd.read_excel(feedbacks_path)
-            self.rutas_df = pd.read_excel(rutas_path)
+            self.dataset = load_dataset(feedbacks_path, rutas_path)
+            self.feedbacks_df = self.dataset.feedbacks
+            self.rutas_df = self.dataset.rutas
             print(f"✅ Datos cargados: {len(self.feedbacks_df)} feedbacks, {len(self.rutas_df)} rutas")
         except Exception as e:
             print(f"❌ Error al cargar datos: {e}")
             raise
     
     def prepare_data(self):
-        """Prepara y limpia los datos para análisis"""
-        # Conversión de fechas
-        self.feedbacks_df['fecha_registro'] = pd.to_datetime(self.feedbacks_df['fecha_registro'])
-        self.feedbacks_df['fecha_cierre'] = pd.to_datetime(self.feedbacks_df['fecha_cierre'])
-        
-        # Crear columnas adicionales
-        self.feedbacks_df['mes'] = self.feedbacks_df['fecha_registro'].dt.month
-        self.feedbacks_df['mes_nombre'] = self.feedbacks_df['fecha_registro'].dt.month_name()
-        self.feedbacks_df['semana'] = self.feedbacks_df['fecha_registro'].dt.isocalendar().week
-        self.feedbacks_df['dia_semana'] = self.feedbacks_df['fecha_registro'].dt.day_name()
-        self.feedbacks_df['trimestre'] = self.feedbacks_df['fecha_registro'].dt.quarter
-        self.feedbacks_df['año'] = self.feedbacks_df['fecha_registro'].dt.year
-        self.feedbacks_df['hora'] = self.feedbacks_df['fecha_registro'].dt.hour
-        
-        # Tiempo de resolución
-        self.feedbacks_df['tiempo_resolucion'] = (
-            self.feedbacks_df['fecha_cierre'] - self.feedbacks_df['fecha_registro']
-        ).dt.days
-        
-        # Merge con rutas
-        self.merged_df = self.feedbacks_df.merge(
-            self.rutas_df, 
-            left_on='ruta', 
-            right_on='RUTA', 
-            how='left'
-        )
+        """Usa las columnas derivadas y el merge con rutas ya calculados en la ingesta"""
+        # fecha_registro/fecha_cierre, mes, semana, trimestre, tiempo_resolucion, etc.
+        # ya vienen de feedbacks_core.add_calendar_columns
+        self.merged_df = self.dataset.merged
         
         print("✅ Datos preparados para análisis")
     
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import sys
+from collections import OrderedDict
+from datetime import date, datetime
+
+import pandas as pd
+
+# Tamaño máximo por defecto de la cache de resultados del dashboard
+MAX_BYTES_DEFAULT = 256 * 1024 * 1024
+
+
+def _normalizar(valor):
+    if isinstance(valor, (datetime, date, pd.Timestamp)):
+        return valor.isoformat()
+    if isinstance(valor, (list, tuple, set)):
+        # El orden de selección en los multiselect no cambia el resultado
+        return sorted(str(v) for v in valor)
+    if valor is None:
+        return []
+    return str(valor)
+
+
+def filter_state_key(dataset_version, fecha_inicio, fecha_fin, **selecciones):
+    """
+    Hash canónico del estado de filtros: rango de fechas, selecciones múltiples
+    (sin importar el orden) y versión del dataset.
+    """
+    estado = {
+        'version': dataset_version,
+        'fecha_inicio': _normalizar(fecha_inicio),
+        'fecha_fin': _normalizar(fecha_fin)
+    }
+    for nombre, valores in selecciones.items():
+        estado[nombre] = _normalizar(valores)
+    payload = json.dumps(estado, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _estimar_bytes(valor):
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=False).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=False))
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_estimar_bytes(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_estimar_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class ResultCache:
+    """
+    Cache LRU acotada por tamaño para los resultados de una combinación de filtros:
+    los DataFrames filtrados y los agregados calculados a partir de ellos (KPIs, tablas
+    de cada pestaña). Al superar max_bytes se descartan las entradas menos usadas.
+
+    Los objetos guardados se comparten entre reruns, por lo que no deben modificarse.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES_DEFAULT):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._tamanos = {}
+        self.bytes_usados = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, key):
+        return key in self._entradas
+
+    def _actualizar_tamano(self, key):
+        nuevo = _estimar_bytes(self._entradas[key])
+        self.bytes_usados += nuevo - self._tamanos.get(key, 0)
+        self._tamanos[key] = nuevo
+
+    def _evict(self, conservar=None):
+        while self.bytes_usados > self.max_bytes and len(self._entradas) > 1:
+            key = next(iter(self._entradas))
+            if key == conservar:
+                self._entradas.move_to_end(key)
+                key = next(iter(self._entradas))
+            self._entradas.pop(key)
+            self.bytes_usados -= self._tamanos.pop(key)
+
+    def get(self, key, nombre):
+        """Devuelve el resultado 'nombre' guardado para la clave, o None (cuenta hit/miss)"""
+        entrada = self._entradas.get(key)
+        if entrada is None or nombre not in entrada:
+            self.misses += 1
+            return None
+        self._entradas.move_to_end(key)
+        self.hits += 1
+        return entrada[nombre]
+
+    def put(self, key, nombre, valor):
+        entrada = self._entradas.setdefault(key, {})
+        entrada[nombre] = valor
+        self._entradas.move_to_end(key)
+        self._actualizar_tamano(key)
+        self._evict(conservar=key)
+        return valor
+
+    def get_or_compute(self, key, nombre, calcular):
+        """Devuelve el resultado guardado o lo calcula con calcular() y lo guarda"""
+        valor = self.get(key, nombre)
+        if valor is None:
+            valor = self.put(key, nombre, calcular())
+        return valor
+
+    def clear(self):
+        self._entradas.clear()
+        self._tamanos.clear()
+        self.bytes_usados = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entradas': len(self._entradas),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total * 100) if total else 0.0,
+            'mb_usados': self.bytes_usados / (1024 * 1024),
+            'mb_maximo': self.max_bytes / (1024 * 1024)
+        }
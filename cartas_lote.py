@@ -0,0 +1,205 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from plantilla_cartas import huella_fuente, version_plantilla
+
+# Cada cuántos documentos se informa el avance del lote
+PROGRESO_CADA = 25
+
+# Manifiesto de documentos generados, uno por directorio de salida
+MANIFIESTO_FILE = '.manifiesto_documentos.json'
+
+_NO_PERMITIDOS_RE = re.compile(r'[^\w\-.]+', re.UNICODE)
+
+
+def nombre_archivo_seguro(texto):
+    """Texto apto para nombre de archivo (sin separadores de ruta ni espacios)"""
+    limpio = _NO_PERMITIDOS_RE.sub('_', str(texto).strip()).strip('._')
+    return limpio or 'SIN_NOMBRE'
+
+
+def carta_path(cartas_dir, ruta, mes_nombre, año):
+    """Ruta determinística de la carta de incumplimiento de una ruta en un mes"""
+    return os.path.join(
+        cartas_dir, f"Carta_Incumplimiento_{nombre_archivo_seguro(ruta)}_{mes_nombre}_{año}.pdf"
+    )
+
+
+def huella_documento(datos):
+    """Hash de las entradas de un documento junto con la versión de la plantilla"""
+    contenido = json.dumps(
+        {'plantilla': version_plantilla(), 'datos': datos},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+class ManifiestoDocumentos:
+    """
+    Registro de los documentos de un directorio con la huella de sus entradas. Un documento
+    cuya huella no cambió y cuyo archivo sigue existiendo no necesita generarse de nuevo.
+    """
+
+    def __init__(self, directorio):
+        self.path = os.path.join(directorio or '.', MANIFIESTO_FILE)
+        self.documentos = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.documentos = json.load(f).get('documentos', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Manifiesto ilegible, se regeneran los documentos: {e}")
+
+    def vigente(self, filename, huella):
+        registro = self.documentos.get(os.path.basename(filename))
+        return registro is not None and registro.get('huella') == huella and os.path.exists(filename)
+
+    def registrar(self, filename, huella):
+        self.documentos[os.path.basename(filename)] = {
+            'huella': huella,
+            'generado': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def guardar(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'documentos': self.documentos}, f, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class ResumenLote:
+    """
+    Resultado de un lote de documentos: generados, sin cambios, errores por archivo, duración
+    total y segundos de generación de cada documento (medidos en el proceso que lo generó)
+    """
+    total: int = 0
+    generados: list = field(default_factory=list)
+    errores: list = field(default_factory=list)
+    omitidos: list = field(default_factory=list)
+    segundos: float = 0.0
+    workers: int = 1
+    duraciones: dict = field(default_factory=dict)
+
+    @property
+    def ok(self):
+        return not self.errores
+
+    def estado(self, filename):
+        """'generado', 'sin cambios', 'error' o None si el archivo no es parte del lote"""
+        if filename in self.generados:
+            return 'generado'
+        if filename in self.omitidos:
+            return 'sin cambios'
+        if any(archivo == filename for archivo, _ in self.errores):
+            return 'error'
+        return None
+
+    def imprimir(self, titulo):
+        print(f"✅ {titulo}: {len(self.generados)}/{self.total} generados en {self.segundos:.1f}s "
+              f"({self.workers} {'proceso' if self.workers == 1 else 'procesos'})")
+        if self.omitidos:
+            print(f"⏭️ {len(self.omitidos)} documentos sin cambios (usar --force para regenerarlos)")
+        if self.errores:
+            print(f"❌ {len(self.errores)} documentos con error:")
+            for archivo, error in self.errores:
+                print(f"   • {os.path.basename(archivo)}: {error}")
+
+
+def _render_uno(render, filename, kwargs):
+    """Genera un documento; los errores se devuelven en lugar de cortar el lote"""
+    inicio = time.perf_counter()
+    try:
+        render(filename, **kwargs)
+        return filename, None, time.perf_counter() - inicio
+    except Exception as e:
+        return filename, f"{type(e).__name__}: {e}", time.perf_counter() - inicio
+
+
+def _registrar(resumen, filename, error, segundos=0.0):
+    resumen.duraciones[filename] = segundos
+    if error is None:
+        resumen.generados.append(filename)
+    else:
+        resumen.errores.append((filename, error))
+    hechos = len(resumen.generados) + len(resumen.errores)
+    a_generar = resumen.total - len(resumen.omitidos)
+    if hechos % PROGRESO_CADA == 0 or hechos == a_generar:
+        print(f"   📄 {hechos}/{a_generar} documentos procesados...")
+
+
+def render_batch(render, tareas, workers=None, force=False):
+    """
+    Genera un lote de documentos repartido en un pool de procesos.
+
+    render es una función de nivel de módulo render(filename, **kwargs) y tareas una lista de
+    (filename, kwargs). Un error en un documento no detiene el resto: queda registrado en el
+    resumen. Con workers=1 (o un solo documento) se genera en el proceso actual; si el pool
+    no está disponible se continúa en forma secuencial con los documentos pendientes.
+
+    Los documentos cuyas entradas (kwargs, plantilla y código fuente del módulo de render, que
+    tiene los textos fijos del documento) no cambiaron desde la última generación se omiten
+    según el manifiesto de su directorio; force=True los regenera todos.
+    """
+    tareas = sorted(tareas, key=lambda tarea: tarea[0])
+    resumen = ResumenLote(total=len(tareas))
+    inicio = time.perf_counter()
+    fuente = huella_fuente(inspect.getsourcefile(render))
+
+    manifiestos = {}
+    huellas = {}
+    pendientes = []
+    for filename, kwargs in tareas:
+        directorio = os.path.dirname(filename)
+        if directorio not in manifiestos:
+            manifiestos[directorio] = ManifiestoDocumentos(directorio)
+        huellas[filename] = huella_documento({'render': render.__name__, 'fuente': fuente, 'kwargs': kwargs})
+        if not force and manifiestos[directorio].vigente(filename, huellas[filename]):
+            resumen.omitidos.append(filename)
+        else:
+            pendientes.append((filename, kwargs))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pendientes) or 1))
+    resumen.workers = workers
+
+    if workers > 1 and len(pendientes) > 1:
+        tareas_pool = pendientes
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futuros = {
+                    executor.submit(_render_uno, render, filename, kwargs): filename
+                    for filename, kwargs in tareas_pool
+                }
+                for futuro in as_completed(futuros):
+                    _registrar(resumen, *futuro.result())
+            pendientes = []
+        except Exception as e:
+            print(f"⚠️ Generación paralela no disponible, se continúa en forma secuencial: {e}")
+            hechos = set(resumen.generados) | {archivo for archivo, _ in resumen.errores}
+            pendientes = [tarea for tarea in tareas_pool if tarea[0] not in hechos]
+            resumen.workers = 1
+
+    for filename, kwargs in pendientes:
+        _registrar(resumen, *_render_uno(render, filename, kwargs))
+
+    # Registrar solo los documentos generados: los que fallaron se reintentan en la próxima corrida
+    if resumen.generados:
+        for filename in resumen.generados:
+            manifiestos[os.path.dirname(filename)].registrar(filename, huellas[filename])
+        for directorio in {os.path.dirname(filename) for filename in resumen.generados}:
+            try:
+                manifiestos[directorio].guardar()
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar el manifiesto de {directorio or '.'}: {e}")
+
+    resumen.generados.sort()
+    resumen.errores.sort()
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
@@ -1,8 +1,9 @@
 import pandas as pd
+from excel_cache import read_excel_cached
 
 # Cargar datos y verificar columnas
 print("=== VERIFICACIÓN DE COLUMNAS ===")
-feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+feedbacks_df = read_excel_cached('Feedbacks H1.xlsx')
 rutas_df = pd.read_excel('BD_Rutas.xlsx')
 
 print("\nColumnas en Feedbacks H1.xlsx:")
@@ -0,0 +1,201 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+
+# Tabla de tipos de incidencia, en orden de prioridad. Un motivo (respuesta_sub) toma el tipo
+# cuyo 'motivo' coincide exactamente o, si no, el primero con alguna palabra clave contenida.
+TIPOS_INCIDENCIA = [
+    # Top 1: Cliente demorado en recibir o pagar (30.2% de casos)
+    {
+        'tipo': 'cliente_demora',
+        'motivo': 'Cliente demorado en recibir o pagar',
+        'palabras': ['demorado', 'demora', 'espera', 'recibir', 'pagar'],
+        'plan': 'Coordinación previa con cliente y ventana horaria específica',
+        'intro': 'demoras en recepción y pago',
+        'accion_especifica': 'coordinación previa y ventanas horarias',
+        'objetivo': 'reducir demoras en la ruta',
+        'conclusion': 'mejorando la eficiencia operativa'
+    },
+    # Top 2: Cliente crítico en atención (Safety) (25.4% de casos)
+    {
+        'tipo': 'safety_critico',
+        'motivo': 'Cliente critico en atención (ubicación y/o acceso) - Requiere visita de Safety',
+        'palabras': ['safety', 'critico', 'crítico', 'acceso', 'seguridad', 'peligro', 'riesgo'],
+        'plan': 'Evaluación de seguridad y protocolo de entrega segura',
+        'intro': 'situaciones críticas de seguridad',
+        'accion_especifica': 'evaluación de seguridad especializada',
+        'objetivo': 'garantizar la seguridad del personal',
+        'conclusion': 'protegiendo al equipo'
+    },
+    # Top 3: Cliente con novedad en envase (5.9% de casos)
+    {
+        'tipo': 'envase_canasta',
+        'motivo': 'Cliente con novedad en envase',
+        'palabras': ['envase', 'canasta', 'sucio', 'roto', 'dañado'],
+        'plan': 'Inspección de envases y protocolo de limpieza',
+        'intro': 'problemas con envases',
+        'accion_especifica': 'inspección y limpieza de envases',
+        'objetivo': 'entregar envases en buen estado',
+        'conclusion': 'eliminando reclamos'
+    },
+    # Top 4: Cliente reiterativo en rechazo (5.6% de casos)
+    {
+        'tipo': 'rechazo',
+        'motivo': 'Cliente reiterativo en rechazo',
+        'palabras': ['rechazo', 'rechaza'],
+        'plan': 'Análisis de causas y ajuste de pedidos',
+        'intro': 'rechazos repetitivos',
+        'accion_especifica': 'análisis de causas y ajuste según histórico',
+        'objetivo': 'reducir rechazos',
+        'conclusion': 'mejorando la aceptación'
+    },
+    # Top 5: Cliente problemático o grosero (4.9% de casos)
+    {
+        'tipo': 'cliente_problematico',
+        'motivo': 'Cliente problemático o grosero',
+        'palabras': ['problemático', 'problematico', 'grosero'],
+        'plan': 'Capacitación en manejo de clientes difíciles',
+        'intro': 'clientes problemáticos',
+        'accion_especifica': 'capacitación especializada',
+        'objetivo': 'mantener ambiente profesional',
+        'conclusion': 'asegurando calidad del servicio'
+    },
+    # Otros motivos identificados en el análisis
+    {
+        'tipo': 'faltante_producto',
+        'motivo': 'Faltante de producto',
+        'palabras': ['faltante', 'falta', 'inventario', 'stock'],
+        'plan': 'Checklist de verificación y control de inventario',
+        'intro': 'faltantes de productos',
+        'accion_especifica': 'checklist de verificación',
+        'objetivo': 'asegurar disponibilidad completa',
+        'conclusion': 'eliminando faltantes'
+    },
+    {
+        'tipo': 'calidad_producto',
+        'motivo': 'Calidad del producto (avería, rotura, mal olor, mala presentación)',
+        'palabras': ['calidad', 'rotura', 'avería', 'caducidad', 'vencimiento', 'sabor', 'olor'],
+        'plan': 'Control de calidad pre-despacho',
+        'intro': 'problemas de calidad',
+        'accion_especifica': 'control de calidad previo',
+        'objetivo': 'asegurar calidad óptima',
+        'conclusion': 'eliminando reclamos'
+    },
+    # Categorías generales para motivos sin plan propio
+    {
+        'tipo': 'pedido_orden',
+        'palabras': ['pedido', 'cantidad', 'solicitud'],
+        'plan': 'Verificación dual de cantidades',
+        'intro': 'problemas en toma de pedidos',
+        'accion_especifica': 'verificación dual de cantidades',
+        'objetivo': 'asegurar precisión en los pedidos',
+        'conclusion': 'evitando discrepancias'
+    },
+    {
+        'tipo': 'entrega_delivery',
+        'palabras': ['entrega', 'delivery', 'tarde', 'puntual'],
+        'plan': 'Optimización de rutas y comunicación',
+        'intro': 'problemas de puntualidad en entregas',
+        'accion_especifica': 'optimización logística',
+        'objetivo': 'cumplir los cronogramas de entrega',
+        'conclusion': 'mejorando la eficiencia'
+    },
+    {
+        'tipo': 'factura_documento',
+        'palabras': ['factura', 'documento', 'precio'],
+        'plan': 'Capacitación en facturación',
+        'intro': 'problemas de documentación',
+        'accion_especifica': 'mejora en procesos administrativos',
+        'objetivo': 'eliminar errores de facturación',
+        'conclusion': 'evitando reprocesos'
+    },
+    {
+        'tipo': 'servicio_atencion',
+        'palabras': ['servicio', 'atención', 'cordial', 'trato'],
+        'plan': 'Capacitación en servicio al cliente',
+        'intro': 'problemas de servicio al cliente',
+        'accion_especifica': 'capacitación en excelencia de servicio',
+        'objetivo': 'mejorar la experiencia del cliente',
+        'conclusion': 'aumentando la satisfacción'
+    },
+    {
+        'tipo': 'ruta_vendedor',
+        'palabras': ['vendedor', 'ventas'],
+        'plan': 'Optimización de procedimientos',
+        'intro': 'problemas en procedimientos de ruta',
+        'accion_especifica': 'optimización de procesos con ventas',
+        'objetivo': 'mejorar la eficiencia operativa',
+        'conclusion': 'completando jornadas a tiempo'
+    }
+]
+
+# Tipo para los motivos que no coinciden con ninguna entrada de la tabla
+INCIDENCIA_GENERICA = {
+    'tipo': 'generico',
+    'plan': 'Análisis personalizado de la situación, identificación de causa raíz y implementación de plan de mejora específico',
+    'intro': 'diversos problemas operativos',
+    'accion_especifica': 'análisis personalizado y plan de mejora',
+    'objetivo': 'resolver las problemáticas identificadas',
+    'conclusion': 'mejorando procesos'
+}
+
+
+@dataclass(frozen=True)
+class Clasificacion:
+    """Tipo de incidencia de un motivo con su plan de acción y los textos del reporte"""
+    tipo: str
+    plan: str
+    intro: str
+    accion_especifica: str
+    objetivo: str
+    conclusion: str
+
+    def intro_text(self, semana):
+        """Párrafo introductorio del reporte semanal"""
+        return (f"El equipo de distribución del CD Soyapango informa sobre clientes con {self.intro} "
+                f"en la semana {semana}. Se solicita apoyo en <b>{self.accion_especifica}</b> para "
+                f"{self.objetivo}, {self.conclusion}. Detalles en la tabla:")
+
+
+def _clasificacion(entrada):
+    return Clasificacion(**{campo: entrada[campo] for campo in Clasificacion.__dataclass_fields__})
+
+
+def _compilar(palabras):
+    return re.compile('|'.join(re.escape(palabra) for palabra in palabras), re.IGNORECASE)
+
+
+# Construido una sola vez al importar: motivos exactos y un patrón por tipo, en orden de prioridad
+_POR_MOTIVO = {entrada['motivo'].casefold(): _clasificacion(entrada)
+               for entrada in TIPOS_INCIDENCIA if entrada.get('motivo')}
+_PATRONES = [(_compilar(entrada['palabras']), _clasificacion(entrada)) for entrada in TIPOS_INCIDENCIA]
+_GENERICA = _clasificacion(INCIDENCIA_GENERICA)
+
+
+@lru_cache(maxsize=None)
+def classify_issue(motivo):
+    """Clasificación de un motivo (respuesta_sub); se calcula una sola vez por valor distinto"""
+    if not isinstance(motivo, str) or not motivo.strip():
+        return _GENERICA
+    texto = motivo.strip()
+    exacta = _POR_MOTIVO.get(texto.casefold())
+    if exacta is not None:
+        return exacta
+    for patron, clasificacion in _PATRONES:
+        if patron.search(texto):
+            return clasificacion
+    return _GENERICA
+
+
+def issue_attribute(motivos, campo):
+    """Campo de la clasificación (tipo, plan, intro, ...) para cada motivo de una Serie"""
+    motivos = pd.Series(motivos)
+    valores = {motivo: getattr(classify_issue(motivo), campo) for motivo in motivos.dropna().unique()}
+    return motivos.map(valores)
+
+
+def action_plans(motivos):
+    """Plan de acción de cada motivo de una Serie"""
+    return issue_attribute(motivos, 'plan')
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from indice_filtros import FilterIndex
+
+# Grano del cubo: día de registro y dimensiones de filtro del sidebar
+GRANO = ['fecha_registro', 'ruta', 'usuario', 'SUPERVISOR', 'CONTRATISTA']
+# Columnas que dependen solo del día (no agregan celdas, se guardan para poder agrupar por ellas)
+DERIVADAS = ['año', 'mes', 'mes_nombre', 'semana', 'trimestre', 'trimestre_nombre',
+             'dia_semana', 'dia_semana_num']
+# Dimensiones de análisis que no se desprenden del grano: un cuboide adicional por cada una
+DIMENSIONES_EXTRA = ['vendedor', 'motivo_retro', 'respuesta_sub']
+
+# Medidas aditivas por celda
+MEDIDAS_SUMA = ['registros', 'cerrados', 'tiempo_total', 'tiempo_total2', 'tiempo_total_cerrados']
+
+# Tamaño del sketch KMV de clientes distintos: exacto hasta K clientes por grupo. Los
+# tabs muestran estos conteos como exactos (Clientes_Unicos, clientes_afectados), así que K
+# queda muy por encima de los clientes del dataset; una celda (día, ruta, usuario) guarda
+# como mucho un hash por registro, por lo que el costo en memoria no depende de K
+KMV_K = 65536
+
+
+class _Cuboide:
+    """Celdas agregadas a un grano dado, su índice de filtros y el sketch de clientes"""
+
+    def __init__(self, base, keys, k):
+        grupos = base.groupby(keys, dropna=False, sort=False, observed=True)
+        celda = grupos.ngroup().to_numpy()
+
+        self.celdas = grupos.agg(
+            registros=('_cerrado', 'size'),
+            cerrados=('_cerrado', 'sum'),
+            tiempo_total=('_tiempo', 'sum'),
+            tiempo_total2=('_tiempo2', 'sum'),
+            tiempo_total_cerrados=('_tiempo_cerrado', 'sum'),
+            tiempo_min=('_tiempo', 'min'),
+            tiempo_max=('_tiempo', 'max')
+        ).reset_index()
+        self.indice = FilterIndex(self.celdas)
+
+        # KMV: por celda solo se guardan los k hashes de cliente más pequeños
+        sketch = pd.DataFrame({'celda': celda, 'hash': base['_cliente_hash'].to_numpy()})
+        sketch = sketch.drop_duplicates().sort_values(['celda', 'hash'], kind='mergesort')
+        sketch = sketch[sketch.groupby('celda').cumcount().to_numpy() < k]
+        self.sketch_celda = sketch['celda'].to_numpy()
+        self.sketch_hash = sketch['hash'].to_numpy()
+
+
+class OLAPCube:
+    """
+    Cubo de feedbacks construido una vez por versión del dataset.
+
+    Las medidas son aditivas (registros, cerrados, suma y suma de cuadrados de
+    tiempo_cierre_dias, mínimo y máximo) más un sketch KMV de clientes distintos, de modo
+    que cualquier agrupación por las dimensiones del cubo se responde sumando celdas en
+    lugar de agrupar filas. Las rutas y usuarios distintos son exactos porque forman
+    parte del grano.
+    """
+
+    def __init__(self, merged_df, k=KMV_K):
+        self.k = k
+        fechas = pd.to_datetime(merged_df['fecha_registro'])
+        cerrado = merged_df['fecha_cierre'].notna()
+        tiempo = merged_df['tiempo_cierre_dias'].astype(float)
+
+        base = merged_df.assign(
+            fecha_registro=fechas.dt.normalize(),
+            dia_semana_num=fechas.dt.dayofweek,
+            _cerrado=cerrado,
+            _tiempo=tiempo,
+            _tiempo2=tiempo ** 2,
+            _tiempo_cerrado=tiempo.where(cerrado, 0.0),
+            _cliente_hash=pd.util.hash_pandas_object(
+                merged_df['codigo_cliente'].astype(str), index=False
+            ).to_numpy()
+        )
+
+        keys = [c for c in GRANO + DERIVADAS if c in base.columns]
+        self.dimensiones = set(keys)
+        self.cuboides = {None: _Cuboide(base, keys, k)}
+        for extra in DIMENSIONES_EXTRA:
+            if extra in base.columns:
+                self.cuboides[extra] = _Cuboide(base, keys + [extra], k)
+
+    def _cuboide_para(self, dims):
+        extras = [d for d in dims if d not in self.dimensiones]
+        if not extras:
+            return None
+        if len(extras) == 1 and extras[0] in self.cuboides:
+            return extras[0]
+        raise KeyError(f"El cubo no tiene un cuboide con las dimensiones {dims}")
+
+    def slice(self, fecha_inicio, fecha_fin, cache=None, cache_key=None, **selecciones):
+        """Vista del cubo para un estado de filtros (mismos argumentos que FilterIndex.mask)"""
+        return CubeSlice(self, fecha_inicio, fecha_fin, selecciones, cache, cache_key)
+
+    def _clientes(self, cuboide, celdas_sel, grupo, n_grupos):
+        """Clientes distintos por grupo: exacto hasta k, estimación KMV por encima"""
+        grupo_por_celda = np.full(len(cuboide.celdas), -1, dtype=np.int64)
+        grupo_por_celda[celdas_sel] = grupo
+        sk_grupo = grupo_por_celda[cuboide.sketch_celda]
+        validos = sk_grupo >= 0
+
+        sketch = pd.DataFrame({'grupo': sk_grupo[validos], 'hash': cuboide.sketch_hash[validos]})
+        sketch = sketch.drop_duplicates().sort_values(['grupo', 'hash'], kind='mergesort')
+        sketch = sketch[sketch.groupby('grupo').cumcount().to_numpy() < self.k]
+
+        resumen = sketch.groupby('grupo')['hash'].agg(['size', 'max'])
+        clientes = resumen['size'].astype(float)
+        llenos = resumen['size'] >= self.k
+        if llenos.any():
+            kth = resumen.loc[llenos, 'max'].astype(float) / float(2 ** 64)
+            clientes[llenos] = np.round((self.k - 1) / kth)
+
+        return clientes.reindex(range(n_grupos), fill_value=0).to_numpy()
+
+    def _rollup(self, mask_por_cuboide, dims):
+        dims = list(dims)
+        nombre = self._cuboide_para(dims)
+        cuboide = self.cuboides[nombre]
+        mask = mask_por_cuboide(nombre)
+        celdas_sel = np.flatnonzero(mask)
+        celdas = cuboide.celdas.iloc[celdas_sel]
+
+        claves = dims if dims else np.zeros(len(celdas), dtype=np.int8)
+        grupos = celdas.groupby(claves, sort=True, observed=True)
+        resultado = grupos[MEDIDAS_SUMA].sum()
+        resultado['tiempo_min'] = grupos['tiempo_min'].min()
+        resultado['tiempo_max'] = grupos['tiempo_max'].max()
+        for col, nombre_medida in [('ruta', 'rutas'), ('usuario', 'usuarios')]:
+            if col not in dims and col in celdas.columns:
+                resultado[nombre_medida] = grupos[col].nunique()
+
+        # Las celdas con NaN en una dimensión no pertenecen a ningún grupo (ngroup las deja en NaN)
+        grupo = grupos.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        resultado['clientes'] = self._clientes(cuboide, celdas_sel, grupo, len(resultado))
+
+        # Medidas derivadas
+        n = resultado['registros'].astype(float)
+        resultado['tiempo_promedio'] = resultado['tiempo_total'] / n
+        varianza = (resultado['tiempo_total2'] - resultado['tiempo_total'] ** 2 / n) / (n - 1)
+        resultado['tiempo_std'] = np.sqrt(varianza.clip(lower=0)).where(n > 1)
+        resultado['tasa_cierre'] = resultado['cerrados'] / n * 100
+        resultado['tiempo_promedio_cerrados'] = (
+            resultado['tiempo_total_cerrados'] / resultado['cerrados'].where(resultado['cerrados'] > 0)
+        )
+
+        if not dims:
+            return resultado.reset_index(drop=True)
+        return resultado.reset_index()
+
+
+class CubeSlice:
+    """Cubo restringido a un estado de filtros; los rollups se pueden cachear por estado"""
+
+    def __init__(self, cube, fecha_inicio, fecha_fin, selecciones, cache=None, cache_key=None):
+        self.cube = cube
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.selecciones = selecciones
+        self.cache = cache
+        self.cache_key = cache_key
+        self._masks = {}
+
+    def _mask(self, nombre):
+        if nombre not in self._masks:
+            indice = self.cube.cuboides[nombre].indice
+            self._masks[nombre] = indice.mask(self.fecha_inicio, self.fecha_fin, **self.selecciones)
+        return self._masks[nombre]
+
+    def rollup(self, dims):
+        """
+        Agrega las celdas filtradas por las dimensiones indicadas. Devuelve las dimensiones y
+        las columnas registros, cerrados, tiempo_total, tiempo_promedio, tiempo_std,
+        tiempo_min, tiempo_max, tasa_cierre, tiempo_promedio_cerrados, clientes y, cuando no
+        son parte de la agrupación, rutas y usuarios distintos.
+        """
+        dims = tuple(dims)
+        if self.cache is None or self.cache_key is None:
+            return self.cube._rollup(self._mask, dims)
+        return self.cache.get_or_compute(
+            self.cache_key, ('rollup',) + dims, lambda: self.cube._rollup(self._mask, dims)
+        )
+
+
+def cube_for_frame(df):
+    """Cubo sin filtros sobre un DataFrame ya filtrado (para llamadas fuera del dashboard)"""
+    fechas = pd.to_datetime(df['fecha_registro'])
+    return OLAPCube(df).slice(fechas.min(), fechas.max())
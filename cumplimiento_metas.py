@@ -0,0 +1,203 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from feedbacks_core import MES_INGLES_A_ESPANOL, MESES_ESPANOL
+
+ENTIDADES = ['SUPERVISOR', 'CONTRATISTA']
+
+METAS_FILE = 'metas_mensuales.csv'
+
+# Reglas usadas si no existe el archivo de metas: 10 para Junio, 6 para otros meses
+REGLAS_DEFAULT = [
+    {'mes': None, 'meta': 6, 'descripcion': 'Meta base para todos los meses'},
+    {'mes': 6, 'meta': 10, 'descripcion': 'Meta de Junio'}
+]
+
+# Columnas llave de las reglas (vacía = aplica a todos) -> columna de la grilla, y su peso de especificidad
+LLAVES_REGLA = [
+    ('mes', 'mes', 1),
+    ('cd', 'CD', 2),
+    ('contratista', 'CONTRATISTA', 4),
+    ('ruta', 'ruta', 8)
+]
+
+ESTADO_CUMPLE = '✅ Cumple'
+ESTADO_NO_CUMPLE = '❌ No Cumple'
+
+
+# Reglas ya cargadas en este proceso, por ruta de archivo
+_REGLAS = {}
+
+
+def _normalizar_reglas(reglas):
+    reglas = reglas.copy()
+    for col in ['mes', 'cd', 'contratista', 'ruta', 'vigente_desde', 'vigente_hasta', 'descripcion']:
+        if col not in reglas.columns:
+            reglas[col] = np.nan
+    reglas['mes'] = pd.to_numeric(reglas['mes'], errors='coerce')
+    reglas['meta'] = pd.to_numeric(reglas['meta'], errors='raise').astype(int)
+    for col in ['cd', 'contratista', 'ruta']:
+        reglas[col] = reglas[col].where(reglas[col].isna(), reglas[col].astype(str).str.strip())
+    reglas['vigente_desde'] = pd.to_datetime(reglas['vigente_desde'], errors='coerce')
+    reglas['vigente_hasta'] = pd.to_datetime(reglas['vigente_hasta'], errors='coerce')
+
+    # Especificidad: una regla por ruta gana sobre una por contratista, CD o solo mes;
+    # a igual especificidad gana la que aparece más abajo en el archivo
+    reglas['_prioridad'] = sum(reglas[col].notna().astype(int) * peso for col, _, peso in LLAVES_REGLA)
+    reglas['_orden'] = np.arange(len(reglas))
+    return reglas.reset_index(drop=True)
+
+
+def load_goal_rules(path=METAS_FILE):
+    """
+    Carga la tabla de metas mensuales (CSV con columnas mes, cd, contratista, ruta, meta,
+    vigente_desde, vigente_hasta). Las llaves vacías aplican a todos los valores y las fechas
+    vacías no limitan la vigencia. Se lee una vez y se vuelve a leer solo si el archivo cambia.
+    Si el archivo no existe se usan las metas por defecto (10 en Junio, 6 el resto).
+    """
+    if not os.path.exists(path):
+        return _normalizar_reglas(pd.DataFrame(REGLAS_DEFAULT))
+
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = _REGLAS.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+
+    reglas = _normalizar_reglas(pd.read_csv(path, dtype=str, keep_default_na=True))
+    _REGLAS[key] = ((stat.st_mtime_ns, stat.st_size), reglas)
+    return reglas
+
+
+def default_goal(reglas=None):
+    """Meta base: la de la regla más general vigente hoy (sin mes, CD, contratista ni ruta)"""
+    if reglas is None:
+        reglas = load_goal_rules()
+    hoy = pd.Timestamp.today().normalize()
+    generales = reglas[
+        (reglas['_prioridad'] == 0) &
+        (reglas['vigente_desde'].isna() | (reglas['vigente_desde'] <= hoy)) &
+        (reglas['vigente_hasta'].isna() | (reglas['vigente_hasta'] >= hoy))
+    ]
+    return int(generales['meta'].iloc[-1]) if not generales.empty else 0
+
+
+def assign_goals(grilla, reglas):
+    """
+    Agrega la columna Meta_Mensual a la grilla con un único join contra la tabla de reglas.
+    La grilla debe tener mes (número), fecha_mes (primer día del mes) y las columnas llave
+    disponibles (ruta, CONTRATISTA, CD); una regla con una llave que la grilla no tiene no aplica.
+    """
+    filas = grilla.assign(_fila=np.arange(len(grilla)))
+    columnas = ['_fila', 'fecha_mes'] + [col for _, col, _ in LLAVES_REGLA if col in filas.columns]
+    candidatos = filas[columnas].merge(reglas, how='cross')
+
+    aplica = (
+        (candidatos['vigente_desde'].isna() | (candidatos['fecha_mes'] >= candidatos['vigente_desde'])) &
+        (candidatos['vigente_hasta'].isna() | (candidatos['fecha_mes'] <= candidatos['vigente_hasta']))
+    )
+    for llave, col, _ in LLAVES_REGLA:
+        if col in candidatos.columns:
+            valor = candidatos[col] if llave == 'mes' else candidatos[col].astype(str)
+            aplica &= candidatos[llave].isna() | (candidatos[llave] == valor)
+        else:
+            aplica &= candidatos[llave].isna()
+
+    ganadoras = candidatos[aplica].sort_values(['_fila', '_prioridad', '_orden'], kind='mergesort')
+    ganadoras = ganadoras.drop_duplicates(subset=['_fila'], keep='last').set_index('_fila')['meta']
+
+    return grilla.assign(Meta_Mensual=ganadoras.reindex(np.arange(len(grilla))).fillna(0).astype(int).to_numpy())
+
+
+def _periodos(merged_df, meses):
+    """Número de mes y primer día del mes (año más reciente con datos) para cada mes_nombre"""
+    periodos = merged_df[['mes_nombre', 'mes', 'año']].dropna().drop_duplicates()
+    periodos = periodos.sort_values(['año', 'mes']).drop_duplicates(subset=['mes_nombre'], keep='last')
+    periodos = periodos.set_index('mes_nombre').reindex(meses)
+
+    # Meses sin datos (por ejemplo, seleccionados sin registros): se resuelven por nombre
+    por_nombre = pd.Series(meses, index=meses).map(
+        lambda m: MESES_ESPANOL.index(MES_INGLES_A_ESPANOL.get(m, m)) if MES_INGLES_A_ESPANOL.get(m, m) in MESES_ESPANOL else np.nan
+    )
+    periodos['mes'] = periodos['mes'].fillna(por_nombre)
+    periodos['año'] = periodos['año'].fillna(pd.Timestamp.today().year)
+    periodos['fecha_mes'] = pd.to_datetime(
+        {'year': periodos['año'].astype(int), 'month': periodos['mes'].fillna(1).astype(int), 'day': 1}
+    )
+    return periodos
+
+
+def build_compliance_grid(merged_df, rutas_df, entidad, meses=None, reglas=None):
+    """
+    Grilla completa (entidad, ruta, mes_nombre) de cumplimiento de meta mensual.
+
+    Incluye las rutas asignadas en rutas_df aunque no tengan registros en el mes (0 registros).
+    La grilla se arma con el producto de las asignaciones entidad-ruta por los meses, se
+    completa con los conteos por reindex y la meta sale de la tabla de reglas con un join.
+    Columnas: entidad, ruta, mes_nombre, Registros, Meta_Mensual, Meta Cumplida, Estado, mes_español.
+    """
+    if reglas is None:
+        reglas = load_goal_rules()
+    if meses is None:
+        meses = merged_df['mes_nombre'].unique()
+    meses = np.asarray(meses, dtype=object)
+
+    asignaciones = rutas_df[[entidad, 'RUTA']].astype({entidad: str})
+    asignaciones[entidad] = asignaciones[entidad].str.strip()
+    asignaciones = asignaciones.drop_duplicates()
+
+    n_asignaciones, n_meses = len(asignaciones), len(meses)
+    grilla = pd.MultiIndex.from_arrays(
+        [
+            np.repeat(asignaciones[entidad].to_numpy(), n_meses),
+            np.repeat(asignaciones['RUTA'].to_numpy(), n_meses),
+            np.tile(meses, n_asignaciones)
+        ],
+        names=[entidad, 'ruta', 'mes_nombre']
+    )
+
+    registros = merged_df.groupby([entidad, 'ruta', 'mes_nombre']).size()
+    resultado = registros.reindex(grilla, fill_value=0).astype(int).rename('Registros').reset_index()
+
+    # Llaves adicionales de las reglas: número de mes, fecha del mes y contratista/CD de la ruta
+    periodos = _periodos(merged_df, meses)
+    resultado['mes'] = periodos['mes'].reindex(resultado['mes_nombre']).to_numpy()
+    resultado['fecha_mes'] = periodos['fecha_mes'].reindex(resultado['mes_nombre']).to_numpy()
+    for col in ['CONTRATISTA', 'CD']:
+        if col != entidad and col in rutas_df.columns:
+            por_ruta = rutas_df.drop_duplicates(subset=['RUTA']).set_index('RUTA')[col].astype(str).str.strip()
+            resultado[col] = resultado['ruta'].map(por_ruta)
+    resultado = assign_goals(resultado, reglas)
+    cumple = resultado['Registros'].to_numpy() >= resultado['Meta_Mensual'].to_numpy()
+    resultado['Meta Cumplida'] = cumple
+    resultado['Estado'] = np.where(cumple, ESTADO_CUMPLE, ESTADO_NO_CUMPLE)
+    resultado['mes_español'] = resultado['mes_nombre'].map(MES_INGLES_A_ESPANOL).fillna(resultado['mes_nombre'])
+
+    return resultado
+
+
+def compliance_by_entity(merged_df, rutas_df, meses=None, reglas=None):
+    """Grillas de cumplimiento para supervisores y contratistas presentes en merged_df"""
+    if reglas is None:
+        reglas = load_goal_rules()
+    return {
+        entidad: build_compliance_grid(merged_df, rutas_df, entidad, meses, reglas)
+        for entidad in ENTIDADES
+        if entidad in merged_df.columns and entidad in rutas_df.columns
+    }
+
+
+def roster_signature(rutas_df):
+    """Huella de la BD de rutas activa, para usarla como parte de una clave de cache"""
+    columnas = [c for c in ['RUTA', 'CD'] + ENTIDADES if c in rutas_df.columns]
+    return format(int(pd.util.hash_pandas_object(rutas_df[columnas], index=False).sum()) & 0xFFFFFFFFFFFFFFFF, 'x')
+
+
+def goal_rules_signature(reglas=None):
+    """Huella de la tabla de metas, para invalidar resultados cacheados al editar el archivo"""
+    if reglas is None:
+        reglas = load_goal_rules()
+    columnas = [llave for llave, _, _ in LLAVES_REGLA] + ['meta', 'vigente_desde', 'vigente_hasta']
+    return format(int(pd.util.hash_pandas_object(reglas[columnas].astype(str), index=False).sum()) & 0xFFFFFFFFFFFFFFFF, 'x')
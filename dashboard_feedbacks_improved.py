@@ -10,8 +10,6 @@ from datetime import datetime, timedelta
 import warnings
 from streamlit_option_menu import option_menu
 import calendar
-import io
-import os
 import glob
 from io import BytesIO
 import base64
@@ -25,8 +23,31 @@ from reportlab.lib import colors
 import xlsxwriter
 # IMPORTAR VISUALIZACIONES MEJORADAS
 from enhanced_visualizations import add_day_hour_heatmap, add_recurrence_analysis, add_comparative_time_analysis, add_problem_resolution_analysis
+# CATÁLOGO INDEXADO DE BDs DE RUTAS
+from rutas_catalog import get_rutas_catalog
+# INGESTA CENTRALIZADA DE FEEDBACKS
+from feedbacks_core import MESES_ESPANOL, load_dataset, rutas_vigentes
+# ÍNDICE DE FILTROS DEL SIDEBAR
+from indice_filtros import FilterIndex
+# CACHE LRU DE RESULTADOS POR ESTADO DE FILTROS
+from cache_resultados import ResultCache, filter_state_key
+# CUBO OLAP PARA LAS PESTAÑAS
+from cubo_olap import OLAPCube, cube_for_frame
+# MOTOR DE CUMPLIMIENTO DE METAS MENSUALES
+from cumplimiento_metas import compliance_by_entity, default_goal, goal_rules_signature, load_goal_rules, roster_signature
+# EXPORTACIÓN XLSX EN MODO CONSTANT_MEMORY
+from exportar_excel import (COLOR_AZUL, COLOR_MORADO, COLOR_ROJO, COLOR_VERDE, LibroExcel,
+                            export_frames, formato_encabezado, iter_chunks)
+# DIMENSIÓN DE CLIENTES (ID ENTERO, NOMBRE CANÓNICO Y ETIQUETA, CONSTRUIDA EN LA INGESTA)
+from dimension_clientes import client_attribute, client_ids, client_labels
+# CLASIFICADOR DE INCIDENCIAS (TIPO, PLAN DE ACCIÓN Y TEXTOS POR MOTIVO, COMPARTIDO CON LOS REPORTES)
+from clasificador_incidencias import action_plans
 warnings.filterwarnings('ignore')
 
+# Anchos de columna de las exportaciones de supervisores y contratistas
+ANCHOS_EXPORT_SUPERVISORES = {'Supervisor': 25, 'Ruta': 15, 'Registros': 12, 'Estado': 15, 'Mes': 12}
+ANCHOS_EXPORT_CONTRATISTAS = {'Contratista': 30, 'Ruta': 15, 'Registros': 12, 'Estado': 15, 'Mes': 12}
+
 # Configuración de página
 st.set_page_config(
     page_title="Seguimiento Feedbacks - DS00",
@@ -460,182 +481,81 @@ st.markdown("""
 # Función para cargar todas las BDs de rutas disponibles automáticamente
 @st.cache_data
 def load_all_rutas_databases():
-    """Carga automáticamente todas las BDs de rutas disponibles en el directorio"""
-    import glob
-    
-    # Diccionario para almacenar todas las BDs de rutas
-    rutas_databases = {}
-    
-    # Cargar BD default
+    """Carga todas las BDs de rutas disponibles en el directorio desde el catálogo indexado"""
     try:
-        default_df = pd.read_excel('BD_Rutas.xlsx')
-        rutas_databases['default'] = default_df
-        print("✅ BD_Rutas.xlsx (default) cargada")
+        catalog = get_rutas_catalog()
     except Exception as e:
-        print(f"❌ Error cargando BD_Rutas.xlsx: {e}")
+        print(f"❌ Error cargando el catálogo de rutas: {e}")
         return None
-    
-    # Buscar automáticamente BDs por mes usando patrones de nombres
-    meses_patrones = {
-        'Enero': ['BD_Rutas_Enero.xlsx', 'BD_Rutas_enero.xlsx', 'BD_Rutas_ENERO.xlsx', 'BD_Rutas_Jan.xlsx'],
-        'Febrero': ['BD_Rutas_Febrero.xlsx', 'BD_Rutas_febrero.xlsx', 'BD_Rutas_FEBRERO.xlsx', 'BD_Rutas_Feb.xlsx'],
-        'Marzo': ['BD_Rutas_Marzo.xlsx', 'BD_Rutas_marzo.xlsx', 'BD_Rutas_MARZO.xlsx', 'BD_Rutas_Mar.xlsx'],
-        'Abril': ['BD_Rutas_Abril.xlsx', 'BD_Rutas_abril.xlsx', 'BD_Rutas_ABRIL.xlsx', 'BD_Rutas_Apr.xlsx'],
-        'Mayo': ['BD_Rutas_Mayo.xlsx', 'BD_Rutas_mayo.xlsx', 'BD_Rutas_MAYO.xlsx', 'BD_Rutas_May.xlsx'],
-        'Junio': ['BD_Rutas_Junio.xlsx', 'BD_Rutas_junio.xlsx', 'BD_Rutas_JUNIO.xlsx', 'BD_Rutas_Jun.xlsx'],
-        'Julio': ['BD_Rutas_Julio.xlsx', 'BD_Rutas_julio.xlsx', 'BD_Rutas_JULIO.xlsx', 'BD_Rutas_Jul.xlsx'],
-        'Agosto': ['BD_Rutas_Agosto.xlsx', 'BD_Rutas_agosto.xlsx', 'BD_Rutas_AGOSTO.xlsx', 'BD_Rutas_Aug.xlsx'],
-        'Septiembre': ['BD_Rutas_Septiembre.xlsx', 'BD_Rutas_septiembre.xlsx', 'BD_Rutas_SEPTIEMBRE.xlsx', 'BD_Rutas_Sep.xlsx'],
-        'Octubre': ['BD_Rutas_Octubre.xlsx', 'BD_Rutas_octubre.xlsx', 'BD_Rutas_OCTUBRE.xlsx', 'BD_Rutas_Oct.xlsx'],
-        'Noviembre': ['BD_Rutas_Noviembre.xlsx', 'BD_Rutas_noviembre.xlsx', 'BD_Rutas_NOVIEMBRE.xlsx', 'BD_Rutas_Nov.xlsx'],
-        'Diciembre': ['BD_Rutas_Diciembre.xlsx', 'BD_Rutas_diciembre.xlsx', 'BD_Rutas_DICIEMBRE.xlsx', 'BD_Rutas_Dec.xlsx']
-    }
-    
-    # Buscar archivos para cada mes
-    for mes, patrones in meses_patrones.items():
-        for patron in patrones:
-            try:
-                if os.path.exists(patron):
-                    mes_df = pd.read_excel(patron)
-                    
-                    # Validar que tenga las columnas requeridas
-                    required_cols = ['RUTA', 'SUPERVISOR', 'CONTRATISTA']
-                    if all(col in mes_df.columns for col in required_cols):
-                        rutas_databases[mes] = mes_df
-                        print(f"✅ {patron} cargada para {mes}")
-                        break  # Solo cargar el primer archivo encontrado para cada mes
-                    else:
-                        print(f"⚠️ {patron} no tiene las columnas requeridas: {required_cols}")
-            except Exception as e:
-                print(f"❌ Error cargando {patron}: {e}")
-    
-    # También buscar con patrones de wildcard para capturar variaciones adicionales
-    additional_patterns = [
-        'BD_Rutas_*.xlsx',
-        'bd_rutas_*.xlsx',
-        'BD_RUTAS_*.xlsx'
-    ]
-    
-    for pattern in additional_patterns:
-        files = glob.glob(pattern)
-        for file in files:
-            try:
-                # Extraer el mes del nombre del archivo
-                filename = os.path.basename(file).lower()
-                for mes in meses_patrones.keys():
-                    if mes.lower() in filename and mes not in rutas_databases:
-                        mes_df = pd.read_excel(file)
-                        required_cols = ['RUTA', 'SUPERVISOR', 'CONTRATISTA']
-                        if all(col in mes_df.columns for col in required_cols):
-                            rutas_databases[mes] = mes_df
-                            print(f"✅ {file} cargada automáticamente para {mes}")
-                            break
-            except Exception as e:
-                print(f"❌ Error procesando {file}: {e}")
-    
-    return rutas_databases
+
+    if not catalog.has('default'):
+        print("❌ Error cargando BD_Rutas.xlsx: archivo no encontrado")
+        return None
+
+    for mes, archivo in catalog.archivos.items():
+        print(f"✅ {archivo} cargada para {mes}")
+
+    return catalog.as_dict()
 
 # Función para cargar datos con cache
 @st.cache_data
 def load_data():
     """Carga los datos de los archivos Excel con manejo de duplicados y datos faltantes"""
     try:
-        # Cargar Feedbacks
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
-        
         # Cargar todas las BDs de rutas disponibles automáticamente
         rutas_databases = load_all_rutas_databases()
         if rutas_databases is None:
             st.error("❌ No se pudo cargar ninguna BD de rutas")
             return None
         
-        # Usar BD_Rutas default para el procesamiento inicial
-        rutas_df = rutas_databases['default']
-        
-        # Guardar todas las BDs en session_state para uso posterior
+        # Guardar la información de las BDs detectadas para el sidebar
         if 'rutas_databases_loaded' not in st.session_state:
-            for mes, df in rutas_databases.items():
-                if mes != 'default':
-                    st.session_state[f'rutas_df_{mes}'] = df
             st.session_state['rutas_databases_loaded'] = True
             st.session_state['rutas_databases_info'] = {
                 'available_months': list(rutas_databases.keys()),
                 'total_databases': len(rutas_databases)
             }
         
-        # ========== LIMPIEZA DE DATOS BD_RUTAS ==========        # Identificar y manejar duplicados en BD_Rutas
-        duplicates = rutas_df[rutas_df['RUTA'].duplicated(keep=False)]
-        if len(duplicates) > 0:
-            # st.sidebar.warning(f"⚠️ Encontrados {len(duplicates)} registros duplicados en BD_Rutas")
-            # Mantener solo el primer registro de cada ruta duplicada
-            rutas_df = rutas_df.drop_duplicates(subset=['RUTA'], keep='first')
-          # ========== PREPARACIÓN DE DATOS FEEDBACKS ==========
-        # Limpiar y preparar datos
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
-        feedbacks_df['fecha_cierre'] = pd.to_datetime(feedbacks_df['fecha_cierre'])
-        
-        # CRITICAL: Calculate tiempo_cierre_dias column
-        feedbacks_df['tiempo_cierre_dias'] = (
-            feedbacks_df['fecha_cierre'] - feedbacks_df['fecha_registro']
-        ).dt.days.fillna(0)  # Fill NaN with 0 for non-closed cases
-        
-        # Crear columnas adicionales para análisis
-        feedbacks_df['mes'] = feedbacks_df['fecha_registro'].dt.month
-        feedbacks_df['mes_nombre'] = feedbacks_df['fecha_registro'].dt.month_name()
-        feedbacks_df['semana'] = feedbacks_df['fecha_registro'].dt.isocalendar().week
-        feedbacks_df['dia_semana'] = feedbacks_df['fecha_registro'].dt.day_name()
-        feedbacks_df['trimestre'] = feedbacks_df['fecha_registro'].dt.quarter
-        feedbacks_df['año'] = feedbacks_df['fecha_registro'].dt.year
-        feedbacks_df['hora'] = feedbacks_df['fecha_registro'].dt.hour
-        
-        # Mapear trimestres a nombres
-        trimestre_map = {1: 'Q1 (Ene-Mar)', 2: 'Q2 (Abr-Jun)', 3: 'Q3 (Jul-Sep)', 4: 'Q4 (Oct-Dic)'}
-        feedbacks_df['trimestre_nombre'] = feedbacks_df['trimestre'].map(trimestre_map)
-          # ========== MERGE CON VALIDACIÓN ==========
-        # Identificar rutas faltantes antes del merge
-        rutas_feedbacks = set(feedbacks_df['ruta'].unique())
-        rutas_bd = set(rutas_df['RUTA'].unique())
-        rutas_faltantes = rutas_feedbacks - rutas_bd
-        
-        # Comentado para limpiar la interfaz
-        # if rutas_faltantes:
-        #     st.sidebar.warning(f"⚠️ {len(rutas_faltantes)} rutas en Feedbacks sin datos de supervisor: {list(rutas_faltantes)}")
-        
-        # Join con BD_Rutas
-        merged_df = feedbacks_df.merge(
-            rutas_df, 
-            left_on='ruta', 
-            right_on='RUTA', 
-            how='left'
-        )        # ========== MANEJO DE DATOS FALTANTES ==========
-        # Limpiar espacios en blanco en nombres de supervisores y contratistas en rutas_df
-        rutas_df['SUPERVISOR'] = rutas_df['SUPERVISOR'].astype(str).str.strip()
-        rutas_df['CONTRATISTA'] = rutas_df['CONTRATISTA'].astype(str).str.strip()
-        
-        # Rellenar supervisores y contratistas faltantes
-        merged_df['SUPERVISOR'] = merged_df['SUPERVISOR'].fillna('SIN ASIGNAR').astype(str).str.strip()
-        merged_df['CONTRATISTA'] = merged_df['CONTRATISTA'].fillna('SIN ASIGNAR').astype(str).str.strip()
-        
-        # CRITICAL: Calculate tiempo_cierre_dias for merged_df as well
-        merged_df['tiempo_cierre_dias'] = (
-            merged_df['fecha_cierre'] - merged_df['fecha_registro']
-        ).dt.days.fillna(0)  # Fill NaN with 0 for non-closed cases
-        
-        # Crear resumen de calidad de datos
-        data_quality = {
-            'total_feedbacks': len(feedbacks_df),
-            'rutas_feedbacks': feedbacks_df['ruta'].nunique(),
-            'total_rutas_bd': len(rutas_df),
-            'rutas_unicas_bd': rutas_df['RUTA'].nunique(),
-            'rutas_matched': len(rutas_feedbacks & rutas_bd),
-            'rutas_sin_supervisor': len(rutas_faltantes),
-            'duplicados_bd_rutas': len(duplicates)
-        }
-        
-        return feedbacks_df, rutas_df, merged_df, data_quality
+        # ========== INGESTA ÚNICA (feedbacks_core) ==========
+        # Columnas de calendario, limpieza de BD_Rutas y merge se calculan una sola vez por proceso.
+        # merged_df ya trae para cada feedback la asignación de ruta vigente en su propio mes.
+        dataset = load_dataset()
+        feedbacks_df = dataset.feedbacks
+        rutas_df = dataset.rutas
+        merged_df = dataset.merged
+        data_quality = dataset.data_quality
+        rutas_scd = dataset.rutas_scd
+        
+        return feedbacks_df, rutas_df, merged_df, data_quality, rutas_scd, dataset.version
     except Exception as e:
         st.error(f"Error al cargar los datos: {e}")
-        return None, None, None, None
+        return None, None, None, None, None, None
+
+# Índice de filtros: se construye una vez por versión del dataset y se reutiliza entre reruns
+@st.cache_resource
+def get_filter_index(_merged_df, dataset_version):
+    """Índice de filtros para merged_df (el argumento con _ no se hashea)"""
+    return FilterIndex(_merged_df)
+
+# Cubo OLAP: se construye una vez por versión del dataset
+@st.cache_resource
+def get_olap_cube(_merged_df, dataset_version):
+    """Cubo pre-agregado sobre merged_df (el argumento con _ no se hashea)"""
+    return OLAPCube(_merged_df)
+
+# Cache de resultados compartida por todas las sesiones del servidor
+@st.cache_resource
+def get_result_cache():
+    """Cache LRU de DataFrames filtrados y agregados por combinación de filtros"""
+    return ResultCache()
+
+def client_dimension():
+    """Dimensión de clientes del dataset del proceso (se construye en la ingesta)"""
+    return load_dataset().clientes
+
+def client_names(codigos):
+    """Nombre canónico de cada código de cliente según la dimensión de clientes"""
+    return client_attribute(client_ids(codigos), client_dimension(), 'nombre_cliente')
 
 # Función para limpiar DataFrames antes de mostrar (soluciona errores de Arrow)
 def clean_dataframe_for_display(df):
@@ -687,10 +607,24 @@ def clean_dataframe_for_display(df):
     return df_clean
 
 # Función para crear métricas KPI mejoradas
-def create_advanced_kpi_metrics(df, merged_df):
+def compute_kpi_values(df):
+    """Calcula los valores de los KPIs principales (separado del render para poder cachearlos)"""
+    return {
+        'total_registros': len(df),
+        'registros_ultimo_mes': len(df[df['mes'] == df['mes'].max()]) if 'mes' in df.columns and not df.empty else None,
+        'total_rutas': df['ruta'].nunique(),
+        'total_usuarios': df['usuario'].nunique(),
+        'total_clientes': df['codigo_cliente'].nunique(),
+        'tasa_cierre': (df['fecha_cierre'].notna().sum() / len(df)) * 100 if len(df) else 0.0
+    }
+
+def create_advanced_kpi_metrics(df, merged_df, kpis=None):
     """Crea métricas KPI avanzadas con cubitos uniformes y coloridos"""
     st.markdown("### 📊 KPIs Principales del Sistema")
     
+    if kpis is None:
+        kpis = compute_kpi_values(df)
+    
     col1, col2, col3, col4, col5 = st.columns(5)
     
     # Definir gradientes de colores únicos para cada KPI
@@ -703,15 +637,15 @@ def create_advanced_kpi_metrics(df, merged_df):
     ]
     
     with col1:
-        total_registros = len(df)
+        total_registros = kpis['total_registros']
         st.metric(
             "📊 Total Registros",
             f"{total_registros:,}",
-            f"+{len(df[df['mes'] == df['mes'].max()])} este mes" if 'mes' in df.columns and not df.empty else ""
+            f"+{kpis['registros_ultimo_mes']} este mes" if kpis['registros_ultimo_mes'] is not None else ""
         )
     
     with col2:
-        total_rutas = df['ruta'].nunique()
+        total_rutas = kpis['total_rutas']
         st.metric(
             "🚚 Rutas Únicas", 
             f"{total_rutas}",
@@ -719,7 +653,7 @@ def create_advanced_kpi_metrics(df, merged_df):
         )
     
     with col3:
-        total_usuarios = df['usuario'].nunique()
+        total_usuarios = kpis['total_usuarios']
         st.metric(
             "👥 Usuarios Activos",
             f"{total_usuarios}",
@@ -727,7 +661,7 @@ def create_advanced_kpi_metrics(df, merged_df):
         )
     
     with col4:
-        total_clientes = df['codigo_cliente'].nunique()
+        total_clientes = kpis['total_clientes']
         st.metric(
             "🏢 Clientes Únicos",
             f"{total_clientes:,}",
@@ -735,7 +669,7 @@ def create_advanced_kpi_metrics(df, merged_df):
         )
     
     with col5:
-        tasa_cierre = (df['fecha_cierre'].notna().sum() / len(df)) * 100
+        tasa_cierre = kpis['tasa_cierre']
         st.metric(
             "✅ Tasa de Cierre",
             f"{tasa_cierre:.1f}%",
@@ -1025,59 +959,22 @@ def generate_pdf_report(df, merged_df, report_type="completo"):
         return simple_buffer.getvalue()
 
 def generate_excel_report(df, merged_df, filtros_aplicados=None):
-    """Genera un reporte XLSX completo con múltiples hojas basado en los filtros aplicados"""
+    """
+    Genera un reporte XLSX completo con múltiples hojas basado en los filtros aplicados.
+    El libro se escribe en modo constant_memory y los datos filtrados por bloques, para no
+    duplicar en memoria un export de todo el año.
+    """
     try:
-        # Crear buffer para el archivo Excel
-        excel_buffer = BytesIO()
-        
-        # Crear workbook con xlsxwriter (sin options que pueden no ser compatibles)
-        with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
-            # Definir formatos
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#D7E4BD',
-                'border': 1
-            })
-            
-            date_format = workbook.add_format({
-                'num_format': 'dd/mm/yyyy hh:mm',
-                'border': 1
-            })
-            
-            number_format = workbook.add_format({
-                'num_format': '0.00',
-                'border': 1
-            })
-            
-            # HOJA 1: Datos filtrados principales
+        libro = LibroExcel()
+        with libro:
+            # HOJA 1: Datos filtrados principales (limpieza y escritura bloque por bloque)
             try:
-                df_export = clean_dataframe_for_display(df.copy())
-                # Convertir fechas problemáticas a string
-                for col in df_export.columns:
-                    if 'fecha' in col.lower() and df_export[col].dtype == 'object':
-                        df_export[col] = df_export[col].astype(str)
-                
-                df_export.to_excel(writer, sheet_name='Datos_Filtrados', index=False)
-                worksheet1 = writer.sheets['Datos_Filtrados']
-                
-                # Aplicar formato a la hoja 1
-                for col_num, value in enumerate(df_export.columns.values):
-                    worksheet1.write(0, col_num, value, header_format)
-                    
-                # Ajustar ancho de columnas
-                for i, col in enumerate(df_export.columns):
-                    try:
-                        max_len = max(df_export[col].astype(str).map(len).max(), len(col)) + 2
-                        worksheet1.set_column(i, i, min(max_len, 50))
-                    except:
-                        worksheet1.set_column(i, i, 15)
+                bloques = (clean_dataframe_for_display(bloque) for bloque in iter_chunks(df))
+                libro.write_sheet('Datos_Filtrados', bloques, anchos='auto')
             except Exception as e:
                 print(f"Error en Hoja 1: {e}")
-              # HOJA 2: Análisis por Rutas
+            
+            # HOJA 2: Análisis por Rutas
             try:
                 rutas_analysis = df.groupby('ruta').agg({
                     'id_tema': 'count',
@@ -1093,15 +990,11 @@ def generate_excel_report(df, merged_df, filtros_aplicados=None):
                 rutas_analysis['Tasa_Cierre'] = (rutas_analysis['Registros_Cerrados'] / rutas_analysis['Total_Registros']) * 100
                 rutas_analysis = rutas_analysis.sort_values('Total_Registros', ascending=False)
                 
-                rutas_analysis.to_excel(writer, sheet_name='Analisis_Rutas', index=False)
-                worksheet2 = writer.sheets['Analisis_Rutas']
-                
-                # Aplicar formato a la hoja 2
-                for col_num, value in enumerate(rutas_analysis.columns.values):
-                    worksheet2.write(0, col_num, value, header_format)
+                libro.write_sheet('Analisis_Rutas', rutas_analysis)
             except Exception as e:
                 print(f"Error en Hoja 2: {e}")
-              # HOJA 3: Análisis por Usuarios
+            
+            # HOJA 3: Análisis por Usuarios
             try:
                 usuarios_analysis = df.groupby('usuario').agg({
                     'id_tema': 'count',
@@ -1116,18 +1009,14 @@ def generate_excel_report(df, merged_df, filtros_aplicados=None):
                 usuarios_analysis['Tasa_Cierre'] = (usuarios_analysis['Casos_Cerrados'] / usuarios_analysis['Total_Casos']) * 100
                 usuarios_analysis = usuarios_analysis.sort_values('Total_Casos', ascending=False)
                 
-                usuarios_analysis.to_excel(writer, sheet_name='Analisis_Usuarios', index=False)
-                worksheet3 = writer.sheets['Analisis_Usuarios']
-                
-                # Aplicar formato a la hoja 3
-                for col_num, value in enumerate(usuarios_analysis.columns.values):
-                    worksheet3.write(0, col_num, value, header_format)
+                libro.write_sheet('Analisis_Usuarios', usuarios_analysis)
             except Exception as e:
                 print(f"Error en Hoja 3: {e}")
             
-            # HOJA 4: Top Clientes Problemáticos            try:
-                df['codigo_cliente_display'] = df['codigo_cliente'].apply(lambda x: f"Cliente-{str(x).zfill(6)}")
-                clientes_analysis = df.groupby(['codigo_cliente', 'codigo_cliente_display']).agg({
+            # HOJA 4: Top Clientes Problemáticos
+            try:
+                codigo_display = client_labels(df, client_dimension()).rename('codigo_cliente_display')
+                clientes_analysis = df.groupby(['codigo_cliente', codigo_display]).agg({
                     'id_tema': 'count',
                     'respuesta_sub': lambda x: x.mode().iloc[0] if not x.empty and len(x.mode()) > 0 else 'N/A',
                     'tiempo_cierre_dias': 'mean',
@@ -1139,19 +1028,17 @@ def generate_excel_report(df, merged_df, filtros_aplicados=None):
                 clientes_analysis.columns = ['codigo_cliente', 'codigo_cliente_display', 'total_reportes', 'motivo_principal', 'tiempo_promedio_cierre', 'casos_cerrados', 'ruta_principal', 'usuarios_involucrados']
                 clientes_analysis['tasa_cierre'] = (clientes_analysis['casos_cerrados'] / clientes_analysis['total_reportes']) * 100
                 clientes_analysis = clientes_analysis.sort_values('total_reportes', ascending=False).head(50)
+                clientes_analysis['nombre_cliente'] = client_names(clientes_analysis['codigo_cliente'])
+                clientes_analysis['plan_accion'] = action_plans(clientes_analysis['motivo_principal'])
                 
-                clientes_export = clientes_analysis[['codigo_cliente_display', 'total_reportes', 'motivo_principal', 'tiempo_promedio_cierre', 'tasa_cierre', 'ruta_principal', 'usuarios_involucrados']].copy()
-                clientes_export.columns = ['Cliente', 'Total_Reportes', 'Motivo_Principal', 'Tiempo_Promedio_Cierre_Dias', 'Tasa_Cierre', 'Ruta_Principal', 'Usuarios_Involucrados']
-                
-                clientes_export.to_excel(writer, sheet_name='Top_Clientes_Problematicos', index=False)
-                worksheet4 = writer.sheets['Top_Clientes_Problematicos']
+                clientes_export = clientes_analysis[['codigo_cliente_display', 'nombre_cliente', 'total_reportes', 'motivo_principal', 'plan_accion', 'tiempo_promedio_cierre', 'tasa_cierre', 'ruta_principal', 'usuarios_involucrados']].copy()
+                clientes_export.columns = ['Cliente', 'Nombre_Cliente', 'Total_Reportes', 'Motivo_Principal', 'Plan_Accion', 'Tiempo_Promedio_Cierre_Dias', 'Tasa_Cierre', 'Ruta_Principal', 'Usuarios_Involucrados']
                 
-                # Aplicar formato a la hoja 4
-                for col_num, value in enumerate(clientes_export.columns.values):
-                    worksheet4.write(0, col_num, value, header_format)
+                libro.write_sheet('Top_Clientes_Problematicos', clientes_export)
             except Exception as e:
                 print(f"Error en Hoja 4: {e}")
-              # HOJA 5: Resumen Ejecutivo
+            
+            # HOJA 5: Resumen Ejecutivo
             try:
                 resumen_data = {
                     'Metrica': [
@@ -1193,25 +1080,11 @@ def generate_excel_report(df, merged_df, filtros_aplicados=None):
                     ])
                 
                 resumen_df = pd.DataFrame(resumen_data)
-                resumen_df.to_excel(writer, sheet_name='Resumen_Ejecutivo', index=False)
-                worksheet5 = writer.sheets['Resumen_Ejecutivo']
-                
-                # Aplicar formato a la hoja 5
-                for col_num, value in enumerate(resumen_df.columns.values):
-                    worksheet5.write(0, col_num, value, header_format)
+                libro.write_sheet('Resumen_Ejecutivo', resumen_df)
             except Exception as e:
                 print(f"Error en Hoja 5: {e}")
-            
-            # Ajustar ancho de columnas para todas las hojas
-            try:
-                for sheet_name in writer.sheets:
-                    worksheet = writer.sheets[sheet_name]
-                    worksheet.set_column('A:Z', 15)
-            except Exception as e:
-                print(f"Error ajustando columnas: {e}")
         
-        excel_buffer.seek(0)
-        return excel_buffer.getvalue()
+        return libro.getvalue()
         
     except Exception as e:
         # Si hay error, crear un archivo simple con el error
@@ -1241,11 +1114,11 @@ def main():
     with st.spinner('🔄 Cargando datos...'):
         load_result = load_data()
         
-        if load_result is None or len(load_result) != 4:
+        if load_result is None or len(load_result) != 6:
             st.error("❌ No se pudieron cargar los datos. Verifica que los archivos Excel estén en el directorio correcto.")
             return
             
-        feedbacks_df, rutas_df, merged_df, data_quality = load_result
+        feedbacks_df, rutas_df, merged_df, data_quality, rutas_scd, dataset_version = load_result
     
     if feedbacks_df is None:
         st.error("❌ No se pudieron cargar los datos. Verifica que los archivos Excel estén en el directorio correcto.")
@@ -1323,7 +1196,7 @@ def main():
                     missing_cols = [col for col in required_cols if col not in rutas_df_manual.columns]
                     
                     if not missing_cols:
-                        st.session_state[f'rutas_df_{mes_manual}'] = rutas_df_manual
+                        st.session_state[f'rutas_df_manual_{mes_manual}'] = rutas_df_manual
                         st.success(f"✅ BD manual para {mes_manual} cargada exitosamente!")
                         st.info(f"📊 Rutas cargadas: {len(rutas_df_manual)}")
                         
@@ -1588,103 +1461,52 @@ def main():
     else:
         st.sidebar.info("🔍 Sin filtros aplicados (mostrando todos los datos)")
       # === SELECCIÓN AUTOMÁTICA DE BD DE RUTAS BASADA EN FILTROS (MEJORADA) ===
-    def get_optimal_rutas_db(df_filtrado, mes_predominante):
+    def get_optimal_rutas_db(df_filtrado):
         """
-        Selecciona la BD de rutas más apropiada basada en los filtros aplicados
-        Ahora usa el sistema automático de carga de BDs
+        BD de rutas vigente en los meses filtrados: cada ruta con su última asignación
+        mensual del periodo (tabla SCD) y la BD por defecto para el resto.
+        Una BD subida manualmente tiene prioridad cuando el filtro cubre un único mes.
         """
-        # Si el usuario seleccionó un mes específico, usar esa BD si está disponible
-        if mes_predominante != 'Todos':
-            # Mapear nombres de meses a claves
-            mes_map = {
-                'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
-                'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
-                'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
-                'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-            }
-            
-            mes_esp = mes_map.get(mes_predominante, mes_predominante)
-            if f'rutas_df_{mes_esp}' in st.session_state:
-                st.sidebar.info(f"🎯 Usando BD Rutas específica para {mes_esp}")
-                return st.session_state[f'rutas_df_{mes_esp}'].copy()
-        
-        # Auto-detectar el mes predominante en los datos filtrados
-        if not df_filtrado.empty:
-            mes_pred_modo = df_filtrado['mes_nombre'].mode()
-            if not mes_pred_modo.empty:
-                mes_pred = mes_pred_modo.iloc[0]
-                mes_map = {
-                    'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
-                    'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
-                    'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
-                    'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-                }
-                mes_pred_esp = mes_map.get(mes_pred, mes_pred)
-                
-                if f'rutas_df_{mes_pred_esp}' in st.session_state:
-                    st.sidebar.info(f"🔍 Auto-detectado: Usando BD Rutas para {mes_pred_esp}")
-                    return st.session_state[f'rutas_df_{mes_pred_esp}'].copy()
-        
-        # Fallback a BD por defecto
-        return rutas_df
-    
-    # Aplicar filtros
-    df_filtrado = feedbacks_df[
-        (feedbacks_df['fecha_registro'].dt.date >= fecha_inicio) &
-        (feedbacks_df['fecha_registro'].dt.date <= fecha_fin)
-    ]
-    
-    # APLICAR FILTROS DE SELECCIÓN MÚLTIPLE
-    if rutas_seleccionadas:
-        df_filtrado = df_filtrado[df_filtrado['ruta'].isin(rutas_seleccionadas)]
-    
-    if usuarios_seleccionados:
-        df_filtrado = df_filtrado[df_filtrado['usuario'].isin(usuarios_seleccionados)]
-    
-    if meses_seleccionados:
-        df_filtrado = df_filtrado[df_filtrado['mes_nombre'].isin(meses_seleccionados)]
-    
-    if semanas_seleccionadas:
+        meses_filtrados = df_filtrado['mes'].dropna().unique() if not df_filtrado.empty else []
+        
+        if len(meses_filtrados) == 1:
+            mes_esp = MESES_ESPANOL[int(meses_filtrados[0])]
+            if f'rutas_df_manual_{mes_esp}' in st.session_state:
+                st.sidebar.info(f"🔧 Usando BD Rutas manual para {mes_esp}")
+                return st.session_state[f'rutas_df_manual_{mes_esp}'].assign(archivo=f'Manual ({mes_esp})')
+        
+        return rutas_vigentes(rutas_scd, rutas_df, meses_filtrados)
+    
+    # Aplicar filtros: una sola máscara por posición compartida por feedbacks_df y merged_df
+    # (ambos tienen las mismas filas en el mismo orden)
+    selecciones = {
+        'rutas': rutas_seleccionadas,
+        'usuarios': usuarios_seleccionados,
+        'meses': meses_seleccionados,
         # Extraer números de semana de "Semana X"
-        semanas_numeros = [int(s.split()[1]) for s in semanas_seleccionadas]
-        df_filtrado = df_filtrado[df_filtrado['semana'].isin(semanas_numeros)]
-    
-    if trimestres_seleccionados:
-        df_filtrado = df_filtrado[df_filtrado['trimestre_nombre'].isin(trimestres_seleccionados)]
-    
-    # Filtrar merged_df también con los mismos criterios de df_filtrado
-    merged_df_filtrado = merged_df[
-        (merged_df['fecha_registro'].dt.date >= fecha_inicio) &
-        (merged_df['fecha_registro'].dt.date <= fecha_fin)
-    ]
-    
-    # Aplicar TODOS los filtros de selección múltiple a merged_df_filtrado también
-    if rutas_seleccionadas:
-        merged_df_filtrado = merged_df_filtrado[merged_df_filtrado['ruta'].isin(rutas_seleccionadas)]
+        'semanas': [int(s.split()[1]) for s in semanas_seleccionadas],
+        'trimestres': trimestres_seleccionados,
+        'supervisores': supervisores_seleccionados,
+        'contratistas': contratistas_seleccionados
+    }
     
-    if usuarios_seleccionados:
-        merged_df_filtrado = merged_df_filtrado[merged_df_filtrado['usuario'].isin(usuarios_seleccionados)]
-        
-    if meses_seleccionados:
-        merged_df_filtrado = merged_df_filtrado[merged_df_filtrado['mes_nombre'].isin(meses_seleccionados)]
+    # Los resultados de cada combinación de filtros se reutilizan entre reruns
+    result_cache = get_result_cache()
+    cache_key = filter_state_key(dataset_version, fecha_inicio, fecha_fin, **selecciones)
     
-    if semanas_seleccionadas:
-        semanas_numeros = [int(s.split()[1]) for s in semanas_seleccionadas]
-        merged_df_filtrado = merged_df_filtrado[merged_df_filtrado['semana'].isin(semanas_numeros)]
-        
-    if trimestres_seleccionados:
-        merged_df_filtrado = merged_df_filtrado[merged_df_filtrado['trimestre_nombre'].isin(trimestres_seleccionados)]
+    def filtrar():
+        filtro_mask = get_filter_index(merged_df, dataset_version).mask(fecha_inicio, fecha_fin, **selecciones)
+        return feedbacks_df[filtro_mask], merged_df[filtro_mask]
     
-    # Aplicar filtros de supervisores y contratistas
-    if supervisores_seleccionados:
-        merged_df_filtrado = merged_df_filtrado[merged_df_filtrado['SUPERVISOR'].isin(supervisores_seleccionados)]
+    df_filtrado, merged_df_filtrado = result_cache.get_or_compute(cache_key, 'frames', filtrar)
     
-    if contratistas_seleccionados:
-        merged_df_filtrado = merged_df_filtrado[merged_df_filtrado['CONTRATISTA'].isin(contratistas_seleccionados)]
+    # Las pestañas responden sus gráficas con rollups del cubo (cacheados por estado de filtros)
+    cubo = get_olap_cube(merged_df, dataset_version).slice(
+        fecha_inicio, fecha_fin, cache=result_cache, cache_key=cache_key, **selecciones
+    )
       # ========== SELECCIÓN INTELIGENTE DE BD RUTAS ==========
-    # Obtener la BD de rutas óptima basada en los filtros aplicados
-    mes_predominante = meses_seleccionados[0] if meses_seleccionados else 'Todos'
-    rutas_df_optimizada = get_optimal_rutas_db(df_filtrado, mes_predominante)
+    # Asignaciones de rutas vigentes en el periodo filtrado
+    rutas_df_optimizada = get_optimal_rutas_db(df_filtrado)
       # Mostrar información de la BD de rutas activa
     with st.sidebar.expander("📊 BD Rutas Activa", expanded=False):
         st.metric("🗂️ Total Rutas", rutas_df_optimizada['RUTA'].nunique())
@@ -1698,25 +1520,10 @@ def main():
         ]
         st.metric("✅ Rutas Activas", rutas_reales['RUTA'].nunique())
         
-        # Detectar tipo de BD en uso
-        bd_type_detected = False
-        
-        # Verificar si es una BD específica de mes
-        meses_disponibles = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 
-                           'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-        
-        for mes in meses_disponibles:
-            if f'rutas_df_{mes}' in st.session_state:
-                if st.session_state[f'rutas_df_{mes}'].equals(rutas_df_optimizada):
-                    if mes in st.session_state.get('rutas_databases_info', {}).get('available_months', []):
-                        st.success(f"🎯 BD Auto-detectada: {mes}")
-                    else:
-                        st.success(f"🔧 BD Manual: {mes}")
-                    bd_type_detected = True
-                    break
-        
-        if not bd_type_detected:
-            st.info("📂 BD Default (BD_Rutas.xlsx)")
+        # Origen de las asignaciones en uso
+        st.markdown("**📂 Origen de las asignaciones:**")
+        for archivo, cantidad in rutas_df_optimizada['archivo'].value_counts().items():
+            st.markdown(f"• {archivo}: {cantidad} rutas")
         
         # Exportar BD actual
         if st.button("📤 Exportar BD Activa"):
@@ -1732,15 +1539,20 @@ def main():
             except Exception as e:
                 st.error(f"❌ Error al exportar: {str(e)}")
     
-    # FILTROS CRÍTICOS: Los filtros de supervisor y contratista ya se aplicaron arriba
-    # Si hay supervisores seleccionados, también filtrar df_filtrado basado en las rutas
-    if supervisores_seleccionados:
-        rutas_supervisor = merged_df_filtrado['ruta'].unique()
-        df_filtrado = df_filtrado[df_filtrado['ruta'].isin(rutas_supervisor)]
-    
-    if contratistas_seleccionados:
-        rutas_contratista = merged_df_filtrado['ruta'].unique()
-        df_filtrado = df_filtrado[df_filtrado['ruta'].isin(rutas_contratista)]
+    # Estado de la cache de resultados
+    with st.sidebar.expander("⚡ Cache de Resultados", expanded=False):
+        cache_stats = result_cache.stats()
+        col_h, col_m = st.columns(2)
+        col_h.metric("✅ Hits", cache_stats['hits'])
+        col_m.metric("🔄 Misses", cache_stats['misses'])
+        st.caption(
+            f"{cache_stats['entradas']} combinaciones de filtros | "
+            f"{cache_stats['mb_usados']:.1f} / {cache_stats['mb_maximo']:.0f} MB | "
+            f"Tasa de acierto: {cache_stats['hit_rate']:.1f}%"
+        )
+        if st.button("🧹 Vaciar Cache", key="clear_result_cache"):
+            result_cache.clear()
+            st.rerun()
     
     # Sección de reportes en sidebar
     st.sidebar.markdown("### 📄 Generación de Reportes")
@@ -1835,7 +1647,8 @@ def main():
         """)
     
     # Métricas KPI mejoradas
-    create_advanced_kpi_metrics(df_filtrado, merged_df_filtrado)    # Menú de navegación principal
+    kpis = result_cache.get_or_compute(cache_key, 'kpis', lambda: compute_kpi_values(df_filtrado))
+    create_advanced_kpi_metrics(df_filtrado, merged_df_filtrado, kpis)    # Menú de navegación principal
     selected = option_menu(
         menu_title=None,
         options=[
@@ -1853,26 +1666,36 @@ def main():
         default_index=0,
         orientation="horizontal",    )    # Contenido según la selección    
     if selected == "🏠 Resumen General":
-        show_general_overview(df_filtrado, merged_df_filtrado)
+        show_general_overview(df_filtrado, merged_df_filtrado, cubo)
     elif selected == "📈 Análisis Temporal":
-        show_temporal_analysis(df_filtrado, merged_df_filtrado, rutas_df_optimizada)
+        show_temporal_analysis(df_filtrado, merged_df_filtrado, rutas_df_optimizada, cubo)
     elif selected == "🚚 Análisis por Rutas":
-        show_routes_analysis(df_filtrado, merged_df_filtrado)    
+        show_routes_analysis(df_filtrado, merged_df_filtrado, cubo)    
     elif selected == "👨‍💼 Supervisores y Contratistas":
-        show_supervisors_contractors_analysis(df_filtrado, merged_df_filtrado, rutas_df_optimizada)
+        # Las grillas de cumplimiento se cachean por estado de filtros, BD de rutas activa y tabla de metas
+        reglas_metas = load_goal_rules()
+        cumplimiento = result_cache.get_or_compute(
+            cache_key,
+            ('cumplimiento', roster_signature(rutas_df_optimizada), goal_rules_signature(reglas_metas)),
+            lambda: compliance_by_entity(merged_df_filtrado, rutas_df_optimizada, reglas=reglas_metas)
+        )
+        show_supervisors_contractors_analysis(df_filtrado, merged_df_filtrado, rutas_df_optimizada, cumplimiento)
     elif selected == "👥 Análisis de Personal":
-        show_personnel_analysis(df_filtrado, merged_df_filtrado)
+        show_personnel_analysis(df_filtrado, merged_df_filtrado, cubo)
     elif selected == "🎯 Análisis de Rendimiento":
-        show_performance_analysis(df_filtrado)
+        show_performance_analysis(df_filtrado, cubo)
     elif selected == "🏪 Análisis de Clientes":
         show_advanced_analysis(df_filtrado, merged_df_filtrado)
     elif selected == "📋 Datos Detallados":
         show_detailed_data(df_filtrado, merged_df_filtrado)
 
-def show_general_overview(df, merged_df):
+def show_general_overview(df, merged_df, cubo=None):
     """Muestra el resumen general mejorado con disposición vertical"""
     st.subheader("📊 Resumen General del Sistema")
     
+    if cubo is None:
+        cubo = cube_for_frame(merged_df)
+    
     # Primera fila - Respuestas más reportadas (fila completa)
     st.markdown(
         """
@@ -1883,7 +1706,7 @@ def show_general_overview(df, merged_df):
         unsafe_allow_html=True
     )
     
-    respuestas_data = df['respuesta_sub'].value_counts().head(15).reset_index()
+    respuestas_data = cubo.rollup(['respuesta_sub']).nlargest(15, 'registros')[['respuesta_sub', 'registros']]
     respuestas_data.columns = ['respuesta', 'cantidad']      
     
     fig_respuestas = px.bar(
@@ -1920,10 +1743,7 @@ def show_general_overview(df, merged_df):
         """, 
         unsafe_allow_html=True
     )
-    rutas_respuestas = df.groupby('ruta').agg({
-        'respuesta_sub': 'count',
-        'tiempo_cierre_dias': 'mean'
-    }).round(2).reset_index()
+    rutas_respuestas = cubo.rollup(['ruta'])[['ruta', 'registros', 'tiempo_promedio']].round(2)
     rutas_respuestas.columns = ['ruta', 'total_respuestas', 'tiempo_promedio_cierre']
     rutas_respuestas = rutas_respuestas.sort_values('total_respuestas', ascending=False).head(20)    
     fig_rutas = px.scatter(
@@ -1965,10 +1785,7 @@ def show_general_overview(df, merged_df):
         unsafe_allow_html=True
     )
       # Análisis por mes - Registros y Cierres
-    registros_mes = df.groupby(['mes_nombre', 'mes']).agg({
-        'id_tema': 'count',
-        'fecha_cierre': lambda x: x.notna().sum()
-    }).reset_index()
+    registros_mes = cubo.rollup(['mes_nombre', 'mes'])[['mes_nombre', 'mes', 'registros', 'cerrados']]
     registros_mes.columns = ['mes_nombre', 'mes_num', 'total_registros', 'total_cierres']
     registros_mes = registros_mes.sort_values('mes_num')
     
@@ -2029,11 +1846,7 @@ def show_general_overview(df, merged_df):
         """, 
         unsafe_allow_html=True
     )
-    usuarios_activos = df.groupby('usuario').agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': 'mean',
-        'ruta': 'nunique'
-    }).round(2).reset_index()
+    usuarios_activos = cubo.rollup(['usuario'])[['usuario', 'registros', 'tiempo_promedio', 'rutas']].round(2)
     usuarios_activos.columns = ['usuario', 'total_registros', 'tiempo_promedio_cierre', 'rutas_cubiertas']
     usuarios_activos = usuarios_activos.sort_values('total_registros', ascending=False).head(15)
     fig_usuarios = px.bar(
@@ -2067,11 +1880,7 @@ def show_general_overview(df, merged_df):
             """, 
             unsafe_allow_html=True
         )
-        supervisores_data = merged_df.groupby('SUPERVISOR').agg({
-            'id_tema': 'count',
-            'tiempo_cierre_dias': 'mean',
-            'ruta': 'nunique'
-        }).round(2).reset_index()
+        supervisores_data = cubo.rollup(['SUPERVISOR'])[['SUPERVISOR', 'registros', 'tiempo_promedio', 'rutas']].round(2)
         supervisores_data.columns = ['supervisor', 'total_casos', 'tiempo_promedio_cierre', 'rutas_supervisadas']
         supervisores_data = supervisores_data.sort_values('total_casos', ascending=False).head(15)
         fig_supervisores = px.scatter(
@@ -2092,10 +1901,9 @@ def show_general_overview(df, merged_df):
             )
         )
         st.plotly_chart(fig_supervisores, use_container_width=True)
-        supervisor_cierres = merged_df[merged_df['fecha_cierre'].notna()].groupby('SUPERVISOR').agg({
-            'id_tema': 'count',
-            'tiempo_cierre_dias': 'mean'
-        }).round(2).reset_index()
+        supervisor_cierres = cubo.rollup(['SUPERVISOR'])
+        supervisor_cierres = supervisor_cierres[supervisor_cierres['cerrados'] > 0]
+        supervisor_cierres = supervisor_cierres[['SUPERVISOR', 'cerrados', 'tiempo_promedio_cerrados']].round(2)
         supervisor_cierres.columns = ['supervisor', 'total_cierres', 'tiempo_promedio_cierre']
         supervisor_cierres = supervisor_cierres.sort_values('total_cierres', ascending=False).head(10)
         fig_supervisor_cierres = px.bar(
@@ -2119,10 +1927,13 @@ def show_general_overview(df, merged_df):
         )        
         st.plotly_chart(fig_supervisor_cierres, use_container_width=True)
 
-def show_temporal_analysis(df, merged_df, rutas_df):
+def show_temporal_analysis(df, merged_df, rutas_df, cubo=None):
     """Muestra análisis temporal mejorado y completo"""
     st.subheader("📅 Análisis Temporal Profundo y Detallado")
     
+    if cubo is None:
+        cubo = cube_for_frame(merged_df)
+    
     # === SECCIÓN 1: EVOLUCIÓN TEMPORAL MULTI-NIVEL ===
     st.markdown(
         """
@@ -2133,18 +1944,13 @@ def show_temporal_analysis(df, merged_df, rutas_df):
         unsafe_allow_html=True
     )
       # Análisis temporal por múltiples dimensiones
-    temporal_analysis = df.groupby(['mes', 'mes_nombre']).agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': ['mean', 'std', 'min', 'max'],
-        'fecha_cierre': lambda x: x.notna().sum(),
-        'codigo_cliente': 'nunique',
-        'usuario': 'nunique',
-        'ruta': 'nunique'
-    }).round(2)
+    temporal_analysis = cubo.rollup(['mes', 'mes_nombre'])[[
+        'mes', 'mes_nombre', 'registros', 'tiempo_promedio', 'tiempo_std', 'tiempo_min', 'tiempo_max',
+        'cerrados', 'clientes', 'usuarios', 'rutas'
+    ]].round(2)
     
-    temporal_analysis.columns = ['Total_Registros', 'Tiempo_Cierre_Promedio', 'Tiempo_Cierre_Std', 'Tiempo_Cierre_Min', 'Tiempo_Cierre_Max', 
+    temporal_analysis.columns = ['mes', 'mes_nombre', 'Total_Registros', 'Tiempo_Cierre_Promedio', 'Tiempo_Cierre_Std', 'Tiempo_Cierre_Min', 'Tiempo_Cierre_Max', 
                                 'Total_Cierres', 'Clientes_Unicos', 'Usuarios_Activos', 'Rutas_Activas']
-    temporal_analysis = temporal_analysis.reset_index()
     temporal_analysis['Tasa_Cierre'] = (temporal_analysis['Total_Cierres'] / temporal_analysis['Total_Registros']) * 100
     temporal_analysis = temporal_analysis.sort_values('mes')
     
@@ -2211,14 +2017,9 @@ def show_temporal_analysis(df, merged_df, rutas_df):
     )
     
     # Análisis por días de la semana
-    df['fecha_parsed'] = pd.to_datetime(df['fecha_registro'], errors='coerce')
-    df['dia_semana_num'] = df['fecha_parsed'].dt.dayofweek
-    df['dia_semana_nombre'] = df['fecha_parsed'].dt.day_name()
-    dias_analysis = df.groupby(['dia_semana_num', 'dia_semana_nombre']).agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': 'mean',
-        'fecha_cierre': lambda x: x.notna().sum()
-    }).round(2).reset_index()
+    dias_analysis = cubo.rollup(['dia_semana_num', 'dia_semana'])[[
+        'dia_semana_num', 'dia_semana', 'registros', 'tiempo_promedio', 'cerrados'
+    ]].round(2)
     dias_analysis.columns = ['dia_num', 'dia_nombre', 'total_registros', 'tiempo_promedio_cierre', 'total_cierres']
     dias_analysis['tasa_cierre'] = (dias_analysis['total_cierres'] / dias_analysis['total_registros']) * 100
     dias_analysis = dias_analysis.sort_values('dia_num')
@@ -2437,16 +2238,12 @@ def show_temporal_analysis(df, merged_df, rutas_df):
     """, 
         unsafe_allow_html=True
     )
-    monthly_detailed = df.groupby(['mes', 'mes_nombre']).agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': ['mean', 'sum'],
-        'usuario': 'nunique',
-        'ruta': 'nunique',  # Rutas que tuvieron actividad ese mes
-        'fecha_cierre': lambda x: x.notna().sum()
-    }).round(2)
-    
-    monthly_detailed.columns = ['Total_Registros', 'Tiempo_Cierre_Promedio', 'Tiempo_Cierre_Total', 'Usuarios_Unicos', 'Rutas_Activas', 'Total_Cierres']
-    monthly_detailed = monthly_detailed.reset_index()
+    # rutas: rutas que tuvieron actividad ese mes
+    monthly_detailed = cubo.rollup(['mes', 'mes_nombre'])[[
+        'mes', 'mes_nombre', 'registros', 'tiempo_promedio', 'tiempo_total', 'usuarios', 'rutas', 'cerrados'
+    ]].round(2)
+    
+    monthly_detailed.columns = ['mes', 'mes_nombre', 'Total_Registros', 'Tiempo_Cierre_Promedio', 'Tiempo_Cierre_Total', 'Usuarios_Unicos', 'Rutas_Activas', 'Total_Cierres']
     monthly_detailed = monthly_detailed.sort_values('mes')
     fig_monthly_bars = px.bar(
         monthly_detailed,
@@ -2647,10 +2444,13 @@ def show_temporal_analysis(df, merged_df, rutas_df):
     st.markdown("### 🛠️ Análisis de Problemas Reportados y Tiempos de Resolución")
     add_problem_resolution_analysis(df)
 
-def show_routes_analysis(df, merged_df):
+def show_routes_analysis(df, merged_df, cubo=None):
     """Análisis completo por rutas con supervisores y contratistas"""
     st.subheader("🚚 Análisis Completo por Rutas, Supervisores y Contratistas")
     
+    if cubo is None:
+        cubo = cube_for_frame(merged_df)
+    
     # --- VALIDACIÓN INICIAL ---
     if merged_df.empty:
         st.warning("⚠️ No hay datos para el análisis de rutas. Ajusta los filtros para incluir registros con supervisores o contratistas.")
@@ -2668,7 +2468,7 @@ def show_routes_analysis(df, merged_df):
         unsafe_allow_html=True
     )
 
-    contratista_rutas = merged_df.groupby(['CONTRATISTA', 'ruta']).size().reset_index()
+    contratista_rutas = cubo.rollup(['CONTRATISTA', 'ruta'])[['CONTRATISTA', 'ruta', 'registros']]
     if contratista_rutas.empty:
         st.info("ℹ️ No hay datos de contratistas para mostrar.")
     else:
@@ -2725,7 +2525,7 @@ def show_routes_analysis(df, merged_df):
         unsafe_allow_html=True
     )
 
-    supervisor_rutas = merged_df.groupby(['SUPERVISOR', 'ruta']).size().reset_index()
+    supervisor_rutas = cubo.rollup(['SUPERVISOR', 'ruta'])[['SUPERVISOR', 'ruta', 'registros']]
     if supervisor_rutas.empty:
         st.info("ℹ️ No hay datos de supervisores para mostrar.")
     else:
@@ -2781,7 +2581,7 @@ def show_routes_analysis(df, merged_df):
         unsafe_allow_html=True
     )
     
-    top_rutas_general = df['ruta'].value_counts().head(20).reset_index()
+    top_rutas_general = cubo.rollup(['ruta']).nlargest(20, 'registros')[['ruta', 'registros']]
     top_rutas_general.columns = ['ruta', 'total_registros']
     fig_top_rutas = px.bar(
         top_rutas_general,
@@ -2841,11 +2641,7 @@ def show_routes_analysis(df, merged_df):
     </div>
     """, unsafe_allow_html=True)
     
-    ruta_eficiencia = df.groupby('ruta').agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': 'mean',
-        'fecha_cierre': lambda x: x.notna().sum()
-    }).round(2).reset_index()
+    ruta_eficiencia = cubo.rollup(['ruta'])[['ruta', 'registros', 'tiempo_promedio', 'cerrados']].round(2)
     ruta_eficiencia.columns = ['ruta', 'total_registros', 'tiempo_promedio_cierre', 'total_cierres']
     ruta_eficiencia['tasa_cierre'] = (ruta_eficiencia['total_cierres'] / ruta_eficiencia['total_registros']) * 100
     
@@ -2982,13 +2778,9 @@ def show_routes_analysis(df, merged_df):
         )
         
         # Análisis detallado de supervisores        
-        supervisor_analysis = merged_df.groupby('SUPERVISOR').agg({
-            'id_tema': 'count',
-            'tiempo_cierre_dias': 'mean',
-            'fecha_cierre': lambda x: x.notna().sum(),
-            'ruta': 'nunique',
-            'codigo_cliente': 'nunique'
-        }).round(2).reset_index()
+        supervisor_analysis = cubo.rollup(['SUPERVISOR'])[[
+            'SUPERVISOR', 'registros', 'tiempo_promedio', 'cerrados', 'rutas', 'clientes'
+        ]].round(2)
         supervisor_analysis.columns = ['supervisor', 'total_casos', 'tiempo_promedio_cierre', 'casos_cerrados', 'rutas_supervisadas', 'clientes_unicos']
         supervisor_analysis['tasa_cierre'] = (supervisor_analysis['casos_cerrados'] / supervisor_analysis['total_casos']) * 100
         supervisor_analysis['casos_pendientes'] = supervisor_analysis['total_casos'] - supervisor_analysis['casos_cerrados']
@@ -3074,21 +2866,23 @@ def show_routes_analysis(df, merged_df):
             unsafe_allow_html=True
         )
           # Análisis detallado de contratistas
-        contratista_analysis = merged_df.groupby('CONTRATISTA').agg({
-            'id_tema': 'count',
-            'tiempo_cierre_dias': 'mean',
-            'fecha_cierre': lambda x: x.notna().sum(),
-            'ruta': 'nunique',
-            'motivo_retro': lambda x: x.mode().iloc[0] if not x.empty and len(x.mode()) > 0 else 'N/A',
-            'respuesta_sub': 'nunique'
-        }).round(2).reset_index()
+        # Motivo principal (moda) y tipos de respuesta salen de los cuboides por motivo y respuesta
+        contratista_motivos_cubo = cubo.rollup(['CONTRATISTA', 'motivo_retro'])
+        motivo_principal = contratista_motivos_cubo.loc[
+            contratista_motivos_cubo.groupby('CONTRATISTA')['registros'].idxmax(), ['CONTRATISTA', 'motivo_retro']
+        ].set_index('CONTRATISTA')['motivo_retro']
+        tipos_respuesta = cubo.rollup(['CONTRATISTA', 'respuesta_sub']).groupby('CONTRATISTA').size()
+        
+        contratista_analysis = cubo.rollup(['CONTRATISTA'])[['CONTRATISTA', 'registros', 'tiempo_promedio', 'cerrados', 'rutas']].round(2)
+        contratista_analysis['motivo_principal'] = contratista_analysis['CONTRATISTA'].map(motivo_principal).fillna('N/A')
+        contratista_analysis['tipos_respuesta'] = contratista_analysis['CONTRATISTA'].map(tipos_respuesta).fillna(0).astype(int)
         contratista_analysis.columns = ['contratista', 'total_casos', 'tiempo_promedio_cierre', 'casos_cerrados', 'rutas_trabajadas', 'motivo_principal', 'tipos_respuesta']
         contratista_analysis['tasa_cierre'] = (contratista_analysis['casos_cerrados'] / contratista_analysis['total_casos']) * 100
         contratista_analysis['casos_pendientes'] = contratista_analysis['total_casos'] - contratista_analysis['casos_cerrados']
         contratista_analysis = contratista_analysis.sort_values('total_casos', ascending=False)
         
         # Análisis de tipos de casos por contratista
-        contratista_motivos = merged_df.groupby(['CONTRATISTA', 'motivo_retro']).size().reset_index()
+        contratista_motivos = contratista_motivos_cubo[['CONTRATISTA', 'motivo_retro', 'registros']]
         contratista_motivos.columns = ['contratista', 'motivo_retro', 'cantidad']
         
         # Top 3 motivos por contratista
@@ -3174,14 +2968,10 @@ def show_routes_analysis(df, merged_df):
         unsafe_allow_html=True
     )
       # Análisis detallado de motivos con nombres específicos
-    motivos_analysis = df.groupby('motivo_retro').agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': ['mean', 'std'],
-        'fecha_cierre': lambda x: x.notna().sum(),
-        'codigo_cliente': 'nunique'
-    }).round(2)
-    motivos_analysis.columns = ['total_casos', 'tiempo_promedio_cierre', 'desviacion_tiempo_cierre', 'casos_cerrados', 'clientes_afectados']
-    motivos_analysis = motivos_analysis.reset_index()
+    motivos_analysis = cubo.rollup(['motivo_retro'])[[
+        'motivo_retro', 'registros', 'tiempo_promedio', 'tiempo_std', 'cerrados', 'clientes'
+    ]].round(2)
+    motivos_analysis.columns = ['motivo_retro', 'total_casos', 'tiempo_promedio_cierre', 'desviacion_tiempo_cierre', 'casos_cerrados', 'clientes_afectados']
     motivos_analysis['tasa_cierre'] = (motivos_analysis['casos_cerrados'] / motivos_analysis['total_casos']) * 100
     motivos_analysis = motivos_analysis.sort_values('total_casos', ascending=False)
     
@@ -3237,13 +3027,10 @@ def show_routes_analysis(df, merged_df):
     )
     
     # Análisis de respuestas específicas
-    respuestas_analysis = df.groupby('respuesta_sub').agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': ['mean', 'std'],
-        'fecha_cierre': lambda x: x.notna().sum(),
-        'codigo_cliente': 'nunique'    }).round(2)
-    respuestas_analysis.columns = ['total_casos', 'tiempo_promedio_cierre', 'desviacion_tiempo_cierre', 'casos_cerrados', 'clientes_afectados']
-    respuestas_analysis = respuestas_analysis.reset_index()
+    respuestas_analysis = cubo.rollup(['respuesta_sub'])[[
+        'respuesta_sub', 'registros', 'tiempo_promedio', 'tiempo_std', 'cerrados', 'clientes'
+    ]].round(2)
+    respuestas_analysis.columns = ['respuesta_sub', 'total_casos', 'tiempo_promedio_cierre', 'desviacion_tiempo_cierre', 'casos_cerrados', 'clientes_afectados']
     respuestas_analysis['tasa_cierre'] = (respuestas_analysis['casos_cerrados'] / respuestas_analysis['total_casos']) * 100
     respuestas_analysis = respuestas_analysis.sort_values('total_casos', ascending=False)
     
@@ -3290,11 +3077,12 @@ def show_routes_analysis(df, merged_df):
     st.dataframe(clean_dataframe_for_display(respuestas_details), use_container_width=True)
     # Este análisis de cumplimiento de meta mensual se movió a la sección "Supervisores y Contratistas" para evitar duplicación
 
-def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
+def show_supervisors_contractors_analysis(df, merged_df, rutas_df, cumplimiento=None):
     """Análisis integral dedicado a Supervisores y Contratistas
     
     Esta función muestra análisis de supervisores y contratistas, incluyendo rutas con cero feedbacks.
     Se ha corregido para usar rutas_df directamente para asegurar consistencia entre ambas tablas.
+    cumplimiento: grillas de cumplimiento_metas.compliance_by_entity ya calculadas (opcional).
     """
     st.subheader("👨‍💼 Análisis Integral por Supervisores y Contratistas")
     
@@ -3315,13 +3103,9 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
         st.warning("⚠️ No hay datos de Supervisores o Contratistas disponibles en el dataset.")
         return
     
-    # Función para calcular meta dinámica según el mes
-    def calcular_meta_mensual(mes_nombre):
-        """Calcula la meta mensual: 10 para Junio, 6 para otros meses"""
-        if mes_nombre in ['June', 'Junio']:
-            return 10
-        else:
-            return 6
+    # Grillas (entidad, ruta, mes) con la meta mensual evaluada de forma vectorizada
+    if cumplimiento is None:
+        cumplimiento = compliance_by_entity(merged_df, rutas_df)
       # ========== CALCULAMOS EL TOTAL DE RUTAS DISPONIBLES DESDE BD_RUTAS ==========
     # Filtrar rutas que tienen contratista real asignado (no "Dummy" o nulos)
     rutas_con_contratista_real = rutas_df[
@@ -3340,54 +3124,14 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
     )    # --- Análisis por SUPERVISOR ---
     if 'SUPERVISOR' in merged_df.columns:
         st.markdown("### 👨‍💼 Análisis por Supervisores")        # Usar los datos filtrados por el usuario - respetar filtros de fecha
-        df_meta = merged_df.copy()  # Usar merged_df filtrado que incluye columnas SUPERVISOR y CONTRATISTA
         supervisor_meta = 'Todos'  # Sin filtro global adicional
         
-        # 2. Calcular registros por supervisor-ruta-mes para el período completo
-        registros_activos = df_meta.groupby(['SUPERVISOR', 'ruta', 'mes_nombre']).agg({'id_tema':'count'}).reset_index()
-          # 3. Obtener todas las rutas asignadas a supervisores
-        todas_rutas_supervisor = rutas_df[['SUPERVISOR', 'RUTA']].drop_duplicates()
-        todas_rutas_supervisor = todas_rutas_supervisor.rename(columns={'RUTA': 'ruta'})
-        
-        # 4. Crear combinaciones de supervisor-ruta-mes para incluir rutas con 0 registros
-        meses_disponibles = df_meta['mes_nombre'].unique()
-        supervisor_ruta_mes = []
-        for _, row in todas_rutas_supervisor.iterrows():
-            for mes in meses_disponibles:
-                supervisor_ruta_mes.append({
-                    'SUPERVISOR': row['SUPERVISOR'],
-                    'ruta': row['ruta'],
-                    'mes_nombre': mes
-                })
-        todas_rutas_completas = pd.DataFrame(supervisor_ruta_mes)
-        
-        # 5. Hacer merge completo para incluir rutas con 0 registros
-        supervisor_rutas = todas_rutas_completas.merge(
-            registros_activos, 
-            on=['SUPERVISOR', 'ruta', 'mes_nombre'], 
-            how='left'
-        )
-        supervisor_rutas['id_tema'] = supervisor_rutas['id_tema'].fillna(0).astype(int)
+        # Grilla supervisor-ruta-mes (incluye rutas con 0 registros) con la meta de cada mes
+        supervisor_rutas = cumplimiento['SUPERVISOR']
         
-        # 6. Filtrar por supervisor seleccionado si aplica
+        # Filtrar por supervisor seleccionado si aplica
         if supervisor_meta != 'Todos':
             supervisor_rutas = supervisor_rutas[supervisor_rutas['SUPERVISOR'] == supervisor_meta]
-          # 7. Calcular métricas finales con meta dinámica por mes
-        # Aplicar meta específica para cada mes (10 para Junio, 6 para otros)
-        supervisor_rutas['Meta_Mensual'] = supervisor_rutas['mes_nombre'].apply(calcular_meta_mensual)
-        supervisor_rutas['Meta Cumplida'] = supervisor_rutas['id_tema'] >= supervisor_rutas['Meta_Mensual']
-        supervisor_rutas['Estado'] = supervisor_rutas['Meta Cumplida'].map(lambda x: '✅ Cumple' if x else '❌ No Cumple')
-        supervisor_rutas = supervisor_rutas.rename(columns={'id_tema':'Registros'})
-        
-        # Traducir meses al español
-        traduccion_meses = {
-            'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo', 'April': 'Abril',
-            'May': 'Mayo', 'June': 'Junio', 'July': 'Julio', 'August': 'Agosto',
-            'September': 'Septiembre', 'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-        }
-        
-        # Agregar mes traducido a los datos de supervisores
-        supervisor_rutas['mes_español'] = supervisor_rutas['mes_nombre'].map(traduccion_meses).fillna(supervisor_rutas['mes_nombre'])
         
         # Tabla detallada con filtros por Supervisor, Estado y Mes
         supervisor_table_data = supervisor_rutas[['SUPERVISOR', 'ruta', 'Registros', 'Estado', 'mes_español']].copy()
@@ -3482,37 +3226,15 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     export_data['Estado'] = export_data['Estado'].str.replace('✅ ', '', regex=False).str.replace('❌ ', '', regex=False)
                     
                     # Crear archivo Excel en memoria
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                        export_data.to_excel(writer, index=False, sheet_name='Supervisores_Todos')
-                        
-                        # Obtener el workbook y worksheet para formato
-                        workbook = writer.book
-                        worksheet = writer.sheets['Supervisores_Todos']
-                        
-                        # Formato de encabezados
-                        header_format = workbook.add_format({
-                            'bold': True,
-                            'text_wrap': True,
-                            'valign': 'top',
-                            'fg_color': '#4472C4',
-                            'font_color': 'white'
-                        })
-                        
-                        # Aplicar formato a encabezados
-                        for col_num, value in enumerate(export_data.columns.values):
-                            worksheet.write(0, col_num, value, header_format)
-                        
-                        # Ajustar ancho de columnas
-                        worksheet.set_column('A:A', 25)  # Supervisor
-                        worksheet.set_column('B:B', 15)  # Ruta
-                        worksheet.set_column('C:C', 12)  # Registros
-                        worksheet.set_column('D:D', 15)  # Estado
-                        worksheet.set_column('E:E', 12)  # Mes
+                    output = export_frames(
+                        {'Supervisores_Todos': export_data},
+                        formatos={'encabezado': formato_encabezado(COLOR_AZUL)},
+                        anchos=ANCHOS_EXPORT_SUPERVISORES
+                    )
                     
                     st.download_button(
                         label="📥 Descargar Excel - Todos",
-                        data=output.getvalue(),
+                        data=output,
                         file_name=f"supervisores_todos_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
@@ -3530,38 +3252,16 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     completados['Estado'] = completados['Estado'].str.replace('✅ ', '', regex=False).str.replace('❌ ', '', regex=False)
                     
                     if not completados.empty:
-                        # Crear archivo Excel en memoria
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            completados.to_excel(writer, index=False, sheet_name='Supervisores_Completados')
-                            
-                            # Obtener el workbook y worksheet para formato
-                            workbook = writer.book
-                            worksheet = writer.sheets['Supervisores_Completados']
-                            
-                            # Formato de encabezados (verde para completados)
-                            header_format = workbook.add_format({
-                                'bold': True,
-                                'text_wrap': True,
-                                'valign': 'top',
-                                'fg_color': '#70AD47',
-                                'font_color': 'white'
-                            })
-                            
-                            # Aplicar formato a encabezados
-                            for col_num, value in enumerate(completados.columns.values):
-                                worksheet.write(0, col_num, value, header_format)
-                            
-                            # Ajustar ancho de columnas
-                            worksheet.set_column('A:A', 25)
-                            worksheet.set_column('B:B', 15)
-                            worksheet.set_column('C:C', 12)
-                            worksheet.set_column('D:D', 15)
-                            worksheet.set_column('E:E', 12)
+                        # Crear archivo Excel en memoria (encabezado verde para completados)
+                        output = export_frames(
+                            {'Supervisores_Completados': completados},
+                            formatos={'encabezado': formato_encabezado(COLOR_VERDE)},
+                            anchos=ANCHOS_EXPORT_SUPERVISORES
+                        )
                         
                         st.download_button(
                             label="📥 Descargar Excel - Completados",
-                            data=output.getvalue(),
+                            data=output,
                             file_name=f"supervisores_completados_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                         )
@@ -3581,38 +3281,16 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     pendientes['Estado'] = pendientes['Estado'].str.replace('✅ ', '', regex=False).str.replace('❌ ', '', regex=False)
                     
                     if not pendientes.empty:
-                        # Crear archivo Excel en memoria
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            pendientes.to_excel(writer, index=False, sheet_name='Supervisores_Pendientes')
-                            
-                            # Obtener el workbook y worksheet para formato
-                            workbook = writer.book
-                            worksheet = writer.sheets['Supervisores_Pendientes']
-                            
-                            # Formato de encabezados (rojo para pendientes)
-                            header_format = workbook.add_format({
-                                'bold': True,
-                                'text_wrap': True,
-                                'valign': 'top',
-                                'fg_color': '#C5504B',
-                                'font_color': 'white'
-                            })
-                            
-                            # Aplicar formato a encabezados
-                            for col_num, value in enumerate(pendientes.columns.values):
-                                worksheet.write(0, col_num, value, header_format)
-                            
-                            # Ajustar ancho de columnas
-                            worksheet.set_column('A:A', 25)
-                            worksheet.set_column('B:B', 15)
-                            worksheet.set_column('C:C', 12)
-                            worksheet.set_column('D:D', 15)
-                            worksheet.set_column('E:E', 12)
+                        # Crear archivo Excel en memoria (encabezado rojo para pendientes)
+                        output = export_frames(
+                            {'Supervisores_Pendientes': pendientes},
+                            formatos={'encabezado': formato_encabezado(COLOR_ROJO)},
+                            anchos=ANCHOS_EXPORT_SUPERVISORES
+                        )
                         
                         st.download_button(
                             label="📥 Descargar Excel - Pendientes",
-                            data=output.getvalue(),
+                            data=output,
                             file_name=f"supervisores_pendientes_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                         )
@@ -3634,7 +3312,7 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     'Registros': 'sum'  # Sumar registros de todos los meses por ruta
                 }).reset_index()
                   # Evaluar si cada ruta cumple meta (usar meta promedio para simplificar KPI)
-                rutas_unicas_sup['Cumple_Meta'] = rutas_unicas_sup['Registros'] >= 6  # Meta base
+                rutas_unicas_sup['Cumple_Meta'] = rutas_unicas_sup['Registros'] >= default_goal()  # Meta base (metas_mensuales.csv)
                 
                 total_rutas_sup = len(rutas_unicas_sup)
                 rutas_cumplen_sup = rutas_unicas_sup['Cumple_Meta'].sum()
@@ -3643,7 +3321,7 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                 total_rutas_sup = 0
                 rutas_cumplen_sup = 0
                 porcentaje_cumple_sup = 0                
-            st.metric("📊 % Rutas que Cumplen Meta", f"{porcentaje_cumple_sup:.1f}%", f"Meta: 6-10 reg/ruta según mes")
+            st.metric("📊 % Rutas que Cumplen Meta", f"{porcentaje_cumple_sup:.1f}%", "Meta: según metas_mensuales.csv")
         
         with col_kpi2:
             st.metric("📈 Rutas que Cumplen", f"{rutas_cumplen_sup}/{total_rutas_sup}")
@@ -3696,53 +3374,14 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
     if 'CONTRATISTA' in merged_df.columns:
         st.markdown("### 🏢 Análisis por Contratistas")
           # Usar los datos filtrados por el usuario - respetar filtros de fecha
-        df_meta = merged_df.copy()  # Usar merged_df filtrado que incluye columnas SUPERVISOR y CONTRATISTA
         contratista_meta = 'Todos'  # Sin filtro global adicional
         
-        # 2. Calcular registros por contratista-ruta-mes para el período completo
-        registros_activos_con = df_meta.groupby(['CONTRATISTA', 'ruta', 'mes_nombre']).agg({'id_tema':'count'}).reset_index()
-        
-        # 3. Obtener todas las rutas asignadas a contratistas
-        todas_rutas_contratista = rutas_df[['CONTRATISTA', 'RUTA']].drop_duplicates()
-        todas_rutas_contratista = todas_rutas_contratista.rename(columns={'RUTA': 'ruta'})
-        
-        # 4. Crear combinaciones de contratista-ruta-mes para incluir rutas con 0 registros
-        meses_disponibles = df_meta['mes_nombre'].unique()
-        contratista_ruta_mes = []
-        for _, row in todas_rutas_contratista.iterrows():
-            for mes in meses_disponibles:
-                contratista_ruta_mes.append({
-                    'CONTRATISTA': row['CONTRATISTA'],
-                    'ruta': row['ruta'],
-                    'mes_nombre': mes
-                })
-        todas_rutas_contratista_completas = pd.DataFrame(contratista_ruta_mes)
-        
-        # 5. Hacer merge completo para incluir rutas con 0 registros
-        contratista_rutas = todas_rutas_contratista_completas.merge(
-            registros_activos_con, 
-            on=['CONTRATISTA', 'ruta', 'mes_nombre'], 
-            how='left'
-        )
-        contratista_rutas['id_tema'] = contratista_rutas['id_tema'].fillna(0).astype(int)        # 6. Filtrar por contratista seleccionado si aplica
+        # Grilla contratista-ruta-mes (incluye rutas con 0 registros) con la meta de cada mes
+        contratista_rutas = cumplimiento['CONTRATISTA']
+        
+        # Filtrar por contratista seleccionado si aplica
         if contratista_meta != 'Todos':
             contratista_rutas = contratista_rutas[contratista_rutas['CONTRATISTA'] == contratista_meta]
-          # 7. Calcular métricas finales con meta dinámica por mes
-        # Aplicar meta específica para cada mes (10 para Junio, 6 para otros)
-        contratista_rutas['Meta_Mensual'] = contratista_rutas['mes_nombre'].apply(calcular_meta_mensual)
-        contratista_rutas['Meta Cumplida'] = contratista_rutas['id_tema'] >= contratista_rutas['Meta_Mensual']
-        contratista_rutas['Estado'] = contratista_rutas['Meta Cumplida'].map(lambda x: '✅ Cumple' if x else '❌ No Cumple')
-        contratista_rutas = contratista_rutas.rename(columns={'id_tema':'Registros'})
-        
-        # Traducir meses al español
-        traduccion_meses = {
-            'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo', 'April': 'Abril',
-            'May': 'Mayo', 'June': 'Junio', 'July': 'Julio', 'August': 'Agosto',
-            'September': 'Septiembre', 'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-        }
-        
-        # Agregar mes traducido a los datos de contratistas
-        contratista_rutas['mes_español'] = contratista_rutas['mes_nombre'].map(traduccion_meses).fillna(contratista_rutas['mes_nombre'])
         
         # Tabla detallada de contratistas con filtros por Contratista, Estado y Mes
         contratista_table_data = contratista_rutas[['CONTRATISTA', 'ruta', 'Registros', 'Estado', 'mes_español']].copy()
@@ -3836,37 +3475,15 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     export_data['Estado'] = export_data['Estado'].str.replace('✅ ', '', regex=False).str.replace('❌ ', '', regex=False)
                     
                     # Crear archivo Excel en memoria
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                        export_data.to_excel(writer, index=False, sheet_name='Contratistas_Todos')
-                        
-                        # Obtener el workbook y worksheet para formato
-                        workbook = writer.book
-                        worksheet = writer.sheets['Contratistas_Todos']
-                        
-                        # Formato de encabezados
-                        header_format = workbook.add_format({
-                            'bold': True,
-                            'text_wrap': True,
-                            'valign': 'top',
-                            'fg_color': '#7030A0',
-                            'font_color': 'white'
-                        })
-                        
-                        # Aplicar formato a encabezados
-                        for col_num, value in enumerate(export_data.columns.values):
-                            worksheet.write(0, col_num, value, header_format)
-                        
-                        # Ajustar ancho de columnas
-                        worksheet.set_column('A:A', 30)  # Contratista
-                        worksheet.set_column('B:B', 15)  # Ruta
-                        worksheet.set_column('C:C', 12)  # Registros
-                        worksheet.set_column('D:D', 15)  # Estado
-                        worksheet.set_column('E:E', 12)  # Mes
+                    output = export_frames(
+                        {'Contratistas_Todos': export_data},
+                        formatos={'encabezado': formato_encabezado(COLOR_MORADO)},
+                        anchos=ANCHOS_EXPORT_CONTRATISTAS
+                    )
                     
                     st.download_button(
                         label="📥 Descargar Excel - Todos",
-                        data=output.getvalue(),
+                        data=output,
                         file_name=f"contratistas_todos_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
@@ -3884,38 +3501,16 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     completados['Estado'] = completados['Estado'].str.replace('✅ ', '', regex=False).str.replace('❌ ', '', regex=False)
                     
                     if not completados.empty:
-                        # Crear archivo Excel en memoria
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            completados.to_excel(writer, index=False, sheet_name='Contratistas_Completados')
-                            
-                            # Obtener el workbook y worksheet para formato
-                            workbook = writer.book
-                            worksheet = writer.sheets['Contratistas_Completados']
-                            
-                            # Formato de encabezados (verde para completados)
-                            header_format = workbook.add_format({
-                                'bold': True,
-                                'text_wrap': True,
-                                'valign': 'top',
-                                'fg_color': '#70AD47',
-                                'font_color': 'white'
-                            })
-                            
-                            # Aplicar formato a encabezados
-                            for col_num, value in enumerate(completados.columns.values):
-                                worksheet.write(0, col_num, value, header_format)
-                            
-                            # Ajustar ancho de columnas
-                            worksheet.set_column('A:A', 30)
-                            worksheet.set_column('B:B', 15)
-                            worksheet.set_column('C:C', 12)
-                            worksheet.set_column('D:D', 15)
-                            worksheet.set_column('E:E', 12)
+                        # Crear archivo Excel en memoria (encabezado verde para completados)
+                        output = export_frames(
+                            {'Contratistas_Completados': completados},
+                            formatos={'encabezado': formato_encabezado(COLOR_VERDE)},
+                            anchos=ANCHOS_EXPORT_CONTRATISTAS
+                        )
                         
                         st.download_button(
                             label="📥 Descargar Excel - Completados",
-                            data=output.getvalue(),
+                            data=output,
                             file_name=f"contratistas_completados_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                         )
@@ -3935,38 +3530,16 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     pendientes['Estado'] = pendientes['Estado'].str.replace('✅ ', '', regex=False).str.replace('❌ ', '', regex=False)
                     
                     if not pendientes.empty:
-                        # Crear archivo Excel en memoria
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                            pendientes.to_excel(writer, index=False, sheet_name='Contratistas_Pendientes')
-                            
-                            # Obtener el workbook y worksheet para formato
-                            workbook = writer.book
-                            worksheet = writer.sheets['Contratistas_Pendientes']
-                            
-                            # Formato de encabezados (rojo para pendientes)
-                            header_format = workbook.add_format({
-                                'bold': True,
-                                'text_wrap': True,
-                                'valign': 'top',
-                                'fg_color': '#C5504B',
-                                'font_color': 'white'
-                            })
-                            
-                            # Aplicar formato a encabezados
-                            for col_num, value in enumerate(pendientes.columns.values):
-                                worksheet.write(0, col_num, value, header_format)
-                            
-                            # Ajustar ancho de columnas
-                            worksheet.set_column('A:A', 30)
-                            worksheet.set_column('B:B', 15)
-                            worksheet.set_column('C:C', 12)
-                            worksheet.set_column('D:D', 15)
-                            worksheet.set_column('E:E', 12)
+                        # Crear archivo Excel en memoria (encabezado rojo para pendientes)
+                        output = export_frames(
+                            {'Contratistas_Pendientes': pendientes},
+                            formatos={'encabezado': formato_encabezado(COLOR_ROJO)},
+                            anchos=ANCHOS_EXPORT_CONTRATISTAS
+                        )
                         
                         st.download_button(
                             label="📥 Descargar Excel - Pendientes",
-                            data=output.getvalue(),
+                            data=output,
                             file_name=f"contratistas_pendientes_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                         )
@@ -3988,7 +3561,7 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                     'Registros': 'sum'  # Sumar registros de todos los meses por ruta
                 }).reset_index()
                   # Evaluar si cada ruta cumple meta (usar meta base para simplificar KPI)
-                rutas_unicas_con['Cumple_Meta'] = rutas_unicas_con['Registros'] >= 6  # Meta base
+                rutas_unicas_con['Cumple_Meta'] = rutas_unicas_con['Registros'] >= default_goal()  # Meta base (metas_mensuales.csv)
                 
                 total_rutas_con = len(rutas_unicas_con)
                 rutas_cumplen_con = rutas_unicas_con['Cumple_Meta'].sum()
@@ -3998,7 +3571,7 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
                 rutas_cumplen_con = 0
                 porcentaje_cumple_con = 0
                 
-            st.metric("📊 % Rutas que Cumplen Meta", f"{porcentaje_cumple_con:.1f}%", f"Meta: 6-10 reg/ruta según mes")
+            st.metric("📊 % Rutas que Cumplen Meta", f"{porcentaje_cumple_con:.1f}%", "Meta: según metas_mensuales.csv")
         
         with col_kpi5:
             st.metric("📈 Rutas que Cumplen", f"{rutas_cumplen_con}/{total_rutas_con}")
@@ -4239,10 +3812,13 @@ def show_supervisors_contractors_analysis(df, merged_df, rutas_df):
         st.json(export_data)
         st.success("📊 Datos exportados exitosamente para análisis adicional.")
 
-def show_personnel_analysis(df, merged_df):
+def show_personnel_analysis(df, merged_df, cubo=None):
     """Análisis completo del personal con múltiples métricas"""
     st.subheader("👥 Análisis Detallado del Personal y Rendimiento")
     
+    if cubo is None:
+        cubo = cube_for_frame(merged_df)
+    
     # === SECCIÓN 1: ANÁLISIS DE USUARIOS ===
     st.markdown(
         """
@@ -4252,15 +3828,10 @@ def show_personnel_analysis(df, merged_df):
         """, 
         unsafe_allow_html=True
     )
-    user_performance = df.groupby('usuario').agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': ['mean', 'std'],
-        'fecha_cierre': lambda x: x.notna().sum(),
-        'ruta': 'nunique',
-        'codigo_cliente': 'nunique'
-    }).round(2)
-    user_performance.columns = ['Total_Registros', 'Tiempo_Promedio_Cierre', 'Desviacion_Tiempo_Cierre', 'Registros_Cerrados', 'Rutas_Trabajadas', 'Clientes_Atendidos']
-    user_performance = user_performance.reset_index()
+    user_performance = cubo.rollup(['usuario'])[[
+        'usuario', 'registros', 'tiempo_promedio', 'tiempo_std', 'cerrados', 'rutas', 'clientes'
+    ]].round(2)
+    user_performance.columns = ['usuario', 'Total_Registros', 'Tiempo_Promedio_Cierre', 'Desviacion_Tiempo_Cierre', 'Registros_Cerrados', 'Rutas_Trabajadas', 'Clientes_Atendidos']
     user_performance['Tasa_Cierre'] = (user_performance['Registros_Cerrados'] / user_performance['Total_Registros']) * 100
     user_performance['Eficiencia'] = user_performance['Tasa_Cierre'] / (user_performance['Tiempo_Promedio_Cierre'] + 1)  # Eficiencia basada en rapidez de cierre
     user_performance = user_performance.sort_values('Total_Registros', ascending=False)
@@ -4357,15 +3928,10 @@ def show_personnel_analysis(df, merged_df):
     )
     
     if 'vendedor' in df.columns:
-        vendedor_performance = df.groupby('vendedor').agg({
-            'id_tema': 'count',
-            'tiempo_cierre_dias': ['mean', 'std'],
-            'codigo_cliente': 'nunique',
-            'ruta': 'nunique',
-            'fecha_cierre': lambda x: x.notna().sum()
-        }).round(2)
-        vendedor_performance.columns = ['Total_Casos', 'Tiempo_Promedio_Cierre', 'Desviacion_Tiempo_Cierre', 'Clientes_Unicos', 'Rutas_Cubiertas', 'Casos_Cerrados']
-        vendedor_performance = vendedor_performance.reset_index()
+        vendedor_performance = cubo.rollup(['vendedor'])[[
+            'vendedor', 'registros', 'tiempo_promedio', 'tiempo_std', 'clientes', 'rutas', 'cerrados'
+        ]].round(2)
+        vendedor_performance.columns = ['vendedor', 'Total_Casos', 'Tiempo_Promedio_Cierre', 'Desviacion_Tiempo_Cierre', 'Clientes_Unicos', 'Rutas_Cubiertas', 'Casos_Cerrados']
         vendedor_performance['Tasa_Cierre'] = (vendedor_performance['Casos_Cerrados'] / vendedor_performance['Total_Casos']) * 100
         vendedor_performance = vendedor_performance.sort_values('Total_Casos', ascending=False).head(20)
         
@@ -4555,10 +4121,13 @@ def show_personnel_analysis(df, merged_df):
     for rec in recomendaciones:
         st.markdown(rec)
 
-def show_performance_analysis(df):
+def show_performance_analysis(df, cubo=None):
     """Análisis de rendimiento completo y avanzado con múltiples métricas"""
     st.subheader("🎯 Análisis Detallado de Rendimiento y Calidad")
     
+    if cubo is None:
+        cubo = cube_for_frame(df)
+    
     # === SECCIÓN 1: OVERVIEW DE RENDIMIENTO GENERAL ===
     st.markdown(
         """
@@ -4616,8 +4185,8 @@ def show_performance_analysis(df):
         unsafe_allow_html=True
     )
     
-    # Formatear correctamente el código de cliente como ID
-    df['codigo_cliente_display'] = df['codigo_cliente'].apply(lambda x: f"Cliente-{str(x).zfill(6)}")
+    # Etiqueta de cliente desde la dimensión de clientes (sin formatear fila por fila)
+    df = df.assign(codigo_cliente_display=client_labels(df, client_dimension()))
       # Análisis avanzado de clientes
     clientes_performance = df.groupby(['codigo_cliente', 'codigo_cliente_display']).agg({
         'id_tema': 'count',
@@ -4645,6 +4214,7 @@ def show_performance_analysis(df):
     )
     
     clientes_performance = clientes_performance.sort_values('total_reportes', ascending=False).head(25)
+    clientes_performance['nombre_cliente'] = client_names(clientes_performance['codigo_cliente'])
     
     # Gráfico de dispersión avanzado: Volumen vs Calidad    
     fig_scatter = px.scatter(
@@ -4655,6 +4225,7 @@ def show_performance_analysis(df):
         color='categoria_rendimiento',
         hover_data={
             'codigo_cliente_display': True,
+            'nombre_cliente': True,
             'total_reportes': True,
             'tiempo_promedio_cierre': ':.2f',
             'tasa_cierre': ':.1f',
@@ -4713,13 +4284,9 @@ def show_performance_analysis(df):
     )
     
     # Análisis de usuarios    
-    usuarios_performance = df.groupby('usuario').agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': ['mean', 'std'],
-        'fecha_cierre': lambda x: x.notna().sum(),
-        'codigo_cliente': 'nunique',
-        'ruta': 'nunique'
-    }).round(2).reset_index()
+    usuarios_performance = cubo.rollup(['usuario'])[[
+        'usuario', 'registros', 'tiempo_promedio', 'tiempo_std', 'cerrados', 'clientes', 'rutas'
+    ]].round(2)
     
     usuarios_performance.columns = ['usuario', 'total_casos', 'tiempo_promedio_cierre', 'tiempo_std_cierre', 
                                    'casos_cerrados', 'clientes_atendidos', 'rutas_trabajadas']
@@ -4783,12 +4350,9 @@ def show_performance_analysis(df):
         unsafe_allow_html=True
     )
       # Análisis de motivos vs tiempo de cierre
-    motivos_analysis = df.groupby('respuesta_sub').agg({
-        'id_tema': 'count',
-        'tiempo_cierre_dias': ['mean', 'std'],
-        'fecha_cierre': lambda x: x.notna().sum(),
-        'codigo_cliente': 'nunique'
-    }).round(2).reset_index()
+    motivos_analysis = cubo.rollup(['respuesta_sub'])[[
+        'respuesta_sub', 'registros', 'tiempo_promedio', 'tiempo_std', 'cerrados', 'clientes'
+    ]].round(2)
     
     motivos_analysis.columns = ['motivo', 'total_casos', 'tiempo_promedio_cierre', 'tiempo_cierre_std', 
                                'casos_cerrados', 'clientes_afectados']
@@ -4840,18 +4404,18 @@ def show_performance_analysis(df):
     with col1:
         st.markdown("##### 🏆 Top 5 Clientes por Eficiencia")
         top_eficientes = clientes_performance.nsmallest(5, 'tiempo_promedio_cierre')[
-            ['codigo_cliente_display', 'total_reportes', 'tiempo_promedio_cierre', 'tasa_cierre']
+            ['codigo_cliente_display', 'nombre_cliente', 'total_reportes', 'tiempo_promedio_cierre', 'tasa_cierre']
         ].copy()
-        top_eficientes.columns = ['Cliente', 'Reportes', 'Tiempo Cierre (días)', 'Cierre (%)']
+        top_eficientes.columns = ['Cliente', 'Nombre', 'Reportes', 'Tiempo Cierre (días)', 'Cierre (%)']
         st.dataframe(top_eficientes, use_container_width=True, hide_index=True)
     
     with col2:
         st.markdown("##### ⚠️ Top 5 Clientes Críticos")
         top_criticos = clientes_performance[clientes_performance['categoria_rendimiento'] == '🔴 Crítico'].head(5)[
-            ['codigo_cliente_display', 'total_reportes', 'tiempo_promedio_cierre', 'tasa_cierre']
+            ['codigo_cliente_display', 'nombre_cliente', 'total_reportes', 'tiempo_promedio_cierre', 'tasa_cierre']
         ].copy()
         if not top_criticos.empty:
-            top_criticos.columns = ['Cliente', 'Reportes', 'Tiempo Cierre (días)', 'Cierre (%)']
+            top_criticos.columns = ['Cliente', 'Nombre', 'Reportes', 'Tiempo Cierre (días)', 'Cierre (%)']
             st.dataframe(top_criticos, use_container_width=True, hide_index=True)
         else:
             st.success("🎉 No hay clientes en estado crítico!")
@@ -4878,8 +4442,10 @@ def show_advanced_analysis(df, merged_df):
     """Análisis avanzado enfocado en Clientes y gráficas especializadas"""
     st.subheader("📊 Análisis Avanzado de Clientes e Insights Profundos")
     
-    # Preparar datos de clientes - formatear correctamente el código de cliente
-    df['codigo_cliente_display'] = df['codigo_cliente'].apply(lambda x: f"Cliente-{str(x).zfill(6)}")    # === FILTROS PARA ANÁLISIS DE CLIENTES ===
+    # Preparar datos de clientes - etiqueta de cliente desde la dimensión de clientes
+    df = df.assign(codigo_cliente_display=client_labels(df, client_dimension()))
+    
+    # === FILTROS PARA ANÁLISIS DE CLIENTES ===
     st.markdown("#### 🔍 Filtros de Análisis")
     st.markdown("Utilice los siguientes filtros para refinar el análisis de clientes según sus necesidades.")
     
@@ -5105,6 +4671,8 @@ def show_advanced_analysis(df, merged_df):
     }).round(2).reset_index()    
     clientes_analysis.columns = ['codigo_cliente', 'codigo_cliente_display', 'total_reportes', 'motivo_principal', 'tiempo_promedio_cierre', 'casos_cerrados', 'ruta_principal', 'usuarios_involucrados']
     clientes_analysis['tasa_cierre'] = (clientes_analysis['casos_cerrados'] / clientes_analysis['total_reportes']) * 100
+    clientes_analysis['nombre_cliente'] = client_names(clientes_analysis['codigo_cliente'])
+    clientes_analysis['plan_accion'] = action_plans(clientes_analysis['motivo_principal'])
     
     # Aplicar filtro de frecuencia después de agrupar
     if frecuencia_filtro != 'Todos':
@@ -5154,6 +4722,7 @@ def show_advanced_analysis(df, merged_df):
         text='total_reportes',        
         hover_data={
             'codigo_cliente_display': True,
+            'nombre_cliente': True,
             'total_reportes': True,
             'tasa_cierre': ':.1f',
             'tiempo_promedio_cierre': ':.2f',
@@ -5912,9 +5481,9 @@ def show_advanced_analysis(df, merged_df):
     with col_export1:
         if st.button("💾 Exportar Top Clientes Problemáticos", key="export_top_clientes"):
             try:                
-                export_data = clientes_analysis[['codigo_cliente_display', 'total_reportes', 'motivo_principal', 
-                                               'tiempo_promedio_cierre', 'tasa_cierre', 'categoria_riesgo']].copy()
-                export_data.columns = ['Cliente', 'Total Reportes', 'Motivo Principal', 'Tiempo Promedio Cierre (días)', 'Tasa Cierre (%)', 'Categoría Riesgo']
+                export_data = clientes_analysis[['codigo_cliente_display', 'nombre_cliente', 'total_reportes', 'motivo_principal', 
+                                               'plan_accion', 'tiempo_promedio_cierre', 'tasa_cierre', 'categoria_riesgo']].copy()
+                export_data.columns = ['Cliente', 'Nombre', 'Total Reportes', 'Motivo Principal', 'Plan de Acción', 'Tiempo Promedio Cierre (días)', 'Tasa Cierre (%)', 'Categoría Riesgo']
                 
                 csv = export_data.to_csv(index=False)
                 st.download_button(
@@ -6091,11 +5660,11 @@ def show_detailed_data(df, merged_df):
         with col_download2:
             # Descarga XLSX con análisis básico
             try:
-                excel_buffer = BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                    # Hoja principal con datos filtrados
-                    df_export = clean_dataframe_for_display(df_tabla.copy())
-                    df_export.to_excel(writer, sheet_name='Datos_Filtrados', index=False)
+                libro = LibroExcel()
+                with libro:
+                    # Hoja principal con datos filtrados (limpieza y escritura por bloques)
+                    bloques = (clean_dataframe_for_display(bloque) for bloque in iter_chunks(df_tabla))
+                    libro.write_sheet('Datos_Filtrados', bloques, ancho_default=20)
                     
                     # Hoja con resumen estadístico
                     if len(df_tabla) > 0:                        
@@ -6121,42 +5690,11 @@ def show_detailed_data(df, merged_df):
                                 datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                             ]
                         })
-                        resumen_stats.to_excel(writer, sheet_name='Resumen_Estadistico', index=False)
-                    
-                    # Aplicar formato
-                    workbook = writer.book
-                    header_format = workbook.add_format({
-                        'bold': True,
-                        'text_wrap': True,
-                        'valign': 'top',
-                        'fg_color': '#D7E4BD',
-                        'border': 1
-                    })
-                    
-                    # Aplicar formato a las hojas
-                    for sheet_name in writer.sheets:
-                        worksheet = writer.sheets[sheet_name]
-                        # Obtener las columnas del DataFrame correspondiente
-                        if sheet_name == 'Datos_Filtrados':
-                            columns = df_export.columns
-                        elif sheet_name == 'Resumen_Estadistico' and len(df_tabla) > 0:
-                            columns = resumen_stats.columns
-                        else:
-                            continue
-                            
-                        # Aplicar formato a los headers
-                        for col_num, col_name in enumerate(columns):
-                            worksheet.write(0, col_num, col_name, header_format)
-                        
-                        # Ajustar ancho de columnas
-                        for i, col in enumerate(columns):
-                            worksheet.set_column(i, i, 20)
-                
-                excel_buffer.seek(0)
+                        libro.write_sheet('Resumen_Estadistico', resumen_stats, ancho_default=20)
                 
                 st.download_button(
                     label="📊 Descargar XLSX",
-                    data=excel_buffer.getvalue(),
+                    data=libro.getvalue(),
                     file_name=f"datos_filtrados_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     key="download_xlsx_detailed"
@@ -0,0 +1,73 @@
+import pandas as pd
+
+from normalizador_clientes import client_code_numbers
+
+# Prefijo y ancho de la etiqueta de cliente que muestran los reportes: Cliente-000123
+PREFIJO_ETIQUETA = 'Cliente-'
+ANCHO_ETIQUETA = 6
+
+COLUMNAS_DIMENSION = ['nombre_cliente', 'primera_fecha', 'ultima_fecha', 'etiqueta']
+
+
+def client_ids(codigos):
+    """Clave entera de cliente: parte numérica inicial del código (nulo si no empieza con dígitos)"""
+    return pd.to_numeric(client_code_numbers(codigos), errors='coerce').astype('Int64')
+
+
+def _dimension_vacia():
+    return pd.DataFrame(columns=COLUMNAS_DIMENSION, index=pd.Index([], name='cliente_id', dtype='int64'))
+
+
+def build_client_dimension(feedbacks_df):
+    """
+    Dimensión de clientes indexada por cliente_id: nombre canónico (el del registro más
+    reciente), primera y última fecha de registro y etiqueta para reportes. Usa las columnas
+    de cliente derivadas en la ingesta (feedbacks_core.add_client_columns). La validez de
+    un cliente es por fila (cliente_valido), no de la dimensión.
+    """
+    filas = feedbacks_df.loc[feedbacks_df['cliente_id'].notna(),
+                             ['cliente_id', 'nombre_canonico', 'fecha_registro']]
+    if filas.empty:
+        return _dimension_vacia()
+
+    filas = filas.sort_values('fecha_registro', kind='mergesort')
+    dimension = filas.groupby('cliente_id').agg(
+        nombre_cliente=('nombre_canonico', 'last'),
+        primera_fecha=('fecha_registro', 'min'),
+        ultima_fecha=('fecha_registro', 'max')
+    )
+    dimension.index = dimension.index.astype('int64')
+
+    dimension['etiqueta'] = PREFIJO_ETIQUETA + dimension.index.astype(str).str.zfill(ANCHO_ETIQUETA)
+    return dimension[COLUMNAS_DIMENSION]
+
+
+def update_client_dimension(dimension, feedbacks_df, cliente_ids):
+    """
+    Recalcula en la dimensión solo los clientes indicados (los de filas nuevas o modificadas)
+    a partir de todas sus filas en feedbacks_df; el resto de la dimensión no se toca.
+    """
+    ids = pd.Series(cliente_ids).dropna().unique()
+    if len(ids) == 0:
+        return dimension
+    actualizados = build_client_dimension(feedbacks_df[feedbacks_df['cliente_id'].isin(ids)])
+    resto = dimension.drop(index=[int(i) for i in ids], errors='ignore')
+    return pd.concat([resto, actualizados]).sort_index()
+
+
+def client_attribute(cliente_ids, dimension, columna):
+    """Valor de una columna de la dimensión para cada cliente_id (NaN si no está)"""
+    return pd.Series(cliente_ids).map(dimension[columna])
+
+
+def client_labels(feedbacks_df, dimension):
+    """
+    Etiqueta de cliente de cada fila (Cliente-000123) tomada de la dimensión; solo las filas
+    sin cliente_id formatean su código original.
+    """
+    etiquetas = client_attribute(feedbacks_df['cliente_id'], dimension, 'etiqueta').astype(object)
+    faltantes = etiquetas.isna()
+    if faltantes.any():
+        codigos = feedbacks_df.loc[faltantes, 'codigo_cliente'].astype(str).str.zfill(ANCHO_ETIQUETA)
+        etiquetas[faltantes] = PREFIJO_ETIQUETA + codigos
+    return etiquetas
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+
+# pyarrow es opcional: si no está instalado la cache se guarda en pickle
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+CACHE_DIR_NAME = '.cache_excel'
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_fingerprint(path, with_hash=True):
+    """
+    Devuelve la huella de un archivo: mtime, tamaño y (opcional) hash SHA-256 del contenido
+    """
+    stat = os.stat(path)
+    fingerprint = {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size
+    }
+
+    if with_hash:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        fingerprint['sha256'] = sha.hexdigest()
+
+    return fingerprint
+
+
+def get_cache_dir(path):
+    """Directorio de cache ubicado junto al archivo de origen"""
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+
+
+def _load_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(cache_dir, manifest):
+    # Escritura atómica para que dos procesos no dejen el manifiesto a medias
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def write_frame(df, base_path):
+    """
+    Guarda un DataFrame en formato columnar (Feather sin compresión, apto para memory-map).
+    Si Arrow no puede representar alguna columna (tipos mezclados) se usa pickle.
+    Devuelve la ruta del archivo escrito.
+    """
+    if feather is not None:
+        feather_path = f"{base_path}.feather"
+        try:
+            feather.write_feather(df, feather_path, compression='uncompressed')
+            return feather_path
+        except Exception:
+            if os.path.exists(feather_path):
+                os.remove(feather_path)
+
+    pickle_path = f"{base_path}.pkl"
+    with open(pickle_path, 'wb') as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return pickle_path
+
+
+def read_frame(frame_path):
+    """Lee un DataFrame escrito con write_frame (Feather se abre con memory-map)"""
+    if frame_path.endswith('.feather'):
+        if feather is None:
+            raise ImportError("pyarrow no está instalado")
+        return feather.read_table(frame_path, memory_map=True).to_pandas()
+    return pd.read_pickle(frame_path)
+
+
+def _entry_key(path, read_kwargs):
+    kwargs_key = json.dumps(read_kwargs, sort_keys=True, default=str)
+    return f"{os.path.basename(path)}|{kwargs_key}"
+
+
+def read_excel_cached(path, **read_kwargs):
+    """
+    Lee una hoja de Excel usando una cache columnar en disco.
+
+    La cache se identifica por mtime, tamaño y hash del contenido del archivo de origen:
+    - Si mtime y tamaño coinciden con el manifiesto, se lee la cache directamente.
+    - Si cambiaron, se recalcula el hash; si el contenido es el mismo solo se actualiza el manifiesto.
+    - Si el contenido cambió, se vuelve a leer el Excel y se reconstruye la cache.
+
+    Acepta los mismos argumentos que pd.read_excel para una sola hoja.
+    Lanza FileNotFoundError si el archivo no existe, igual que pd.read_excel.
+    """
+    fingerprint = file_fingerprint(path, with_hash=False)
+    cache_dir = get_cache_dir(path)
+    key = _entry_key(path, read_kwargs)
+    manifest = _load_manifest(cache_dir)
+    entry = manifest.get(key)
+
+    if entry and os.path.exists(os.path.join(cache_dir, entry['archivo'])):
+        cache_path = os.path.join(cache_dir, entry['archivo'])
+        same_stat = (entry.get('mtime_ns') == fingerprint['mtime_ns'] and
+                     entry.get('size') == fingerprint['size'])
+
+        if not same_stat:
+            fingerprint = file_fingerprint(path)
+            if entry.get('sha256') == fingerprint['sha256']:
+                # Archivo tocado pero sin cambios reales: solo actualizar el manifiesto
+                entry.update(fingerprint)
+                try:
+                    _save_manifest(cache_dir, manifest)
+                except OSError:
+                    pass
+                same_stat = True
+
+        if same_stat:
+            try:
+                return read_frame(cache_path)
+            except Exception as e:
+                print(f"⚠️ Cache inválida para {path}, se reconstruye: {e}")
+
+    # Cache inexistente o desactualizada: leer el Excel y reconstruir
+    df = pd.read_excel(path, **read_kwargs)
+
+    try:
+        if 'sha256' not in fingerprint:
+            fingerprint = file_fingerprint(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        base_name = f"{os.path.splitext(os.path.basename(path))[0]}_{fingerprint['sha256'][:16]}"
+        if read_kwargs:
+            base_name += '_' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]
+        cache_path = write_frame(df, os.path.join(cache_dir, base_name))
+
+        # Eliminar la versión anterior de la cache para esta misma entrada
+        if entry and entry.get('archivo') != os.path.basename(cache_path):
+            old_path = os.path.join(cache_dir, entry['archivo'])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+        manifest = _load_manifest(cache_dir)
+        manifest[key] = dict(fingerprint, archivo=os.path.basename(cache_path))
+        _save_manifest(cache_dir, manifest)
+    except Exception as e:
+        # La cache nunca debe impedir la lectura de datos
+        print(f"⚠️ No se pudo escribir la cache de {path}: {e}")
+
+    return df
+
+
+def clear_cache(path):
+    """Elimina la cache asociada al directorio de un archivo de origen"""
+    cache_dir = get_cache_dir(path)
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    removed = 0
+    for name in os.listdir(cache_dir):
+        os.remove(os.path.join(cache_dir, name))
+        removed += 1
+    os.rmdir(cache_dir)
+    return removed
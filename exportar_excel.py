@@ -0,0 +1,164 @@
+import io
+from datetime import date, time
+
+import pandas as pd
+import xlsxwriter
+
+# Filas por bloque al escribir un DataFrame grande hoja por hoja
+FILAS_POR_BLOQUE = 20000
+
+# Ancho máximo al calcular anchos de columna automáticos
+ANCHO_MAXIMO = 50
+
+# Formatos base de los reportes; cada libro los crea una sola vez
+FORMATOS = {
+    'encabezado': {
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'fg_color': '#D7E4BD',
+        'border': 1
+    },
+    'fecha': {
+        'num_format': 'dd/mm/yyyy hh:mm',
+        'border': 1
+    },
+    'numero': {
+        'num_format': '0.00',
+        'border': 1
+    }
+}
+
+# Colores de encabezado usados en las exportaciones del dashboard
+COLOR_AZUL = '#4472C4'
+COLOR_VERDE = '#70AD47'
+COLOR_ROJO = '#C5504B'
+COLOR_MORADO = '#7030A0'
+
+
+def formato_encabezado(color, font_color='white', **extra):
+    """Propiedades de un encabezado en negrita con fondo de color"""
+    return {'bold': True, 'text_wrap': True, 'valign': 'top', 'fg_color': color,
+            'font_color': font_color, **extra}
+
+
+def iter_chunks(df, filas=FILAS_POR_BLOQUE):
+    """Bloques consecutivos de un DataFrame (vistas, sin copiar los datos completos)"""
+    if len(df) == 0:
+        # Un DataFrame vacío se escribe igual, con sus encabezados
+        yield df
+        return
+    for inicio in range(0, len(df), filas):
+        yield df.iloc[inicio:inicio + filas]
+
+
+def _valores(bloque):
+    """Filas del bloque como valores de Python con nulos (NaN/NaT) como None"""
+    valores = bloque.astype(object).to_numpy()
+    valores[pd.isna(valores)] = None
+    return valores.tolist()
+
+
+def _anchos_automaticos(bloque):
+    anchos = {}
+    for col in bloque.columns:
+        try:
+            largo = bloque[col].astype(str).map(len).max() if len(bloque) else 0
+            anchos[col] = min(max(int(largo), len(str(col))) + 2, ANCHO_MAXIMO)
+        except Exception:
+            anchos[col] = 15
+    return anchos
+
+
+class LibroExcel:
+    """
+    Libro xlsxwriter en modo constant_memory: cada fila se vuelca a disco en cuanto se
+    completa, así que el libro no guarda una segunda copia de los datos en memoria.
+    Los formatos se crean una vez por libro y se reutilizan en todas las hojas.
+
+    Uso:
+        with LibroExcel() as libro:
+            libro.write_sheet('Datos', iter_chunks(df))
+        contenido = libro.getvalue()
+    """
+
+    def __init__(self, destino=None, formatos=None):
+        self.buffer = io.BytesIO() if destino is None else None
+        self.workbook = xlsxwriter.Workbook(self.buffer if destino is None else destino, {
+            'constant_memory': True,
+            'default_date_format': FORMATOS['fecha']['num_format'],
+            'remove_timezone': True,
+            'strings_to_urls': False
+        })
+        propiedades = dict(FORMATOS)
+        propiedades.update(formatos or {})
+        self.formatos = {nombre: self.workbook.add_format(props) for nombre, props in propiedades.items()}
+        self.hojas = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def write_sheet(self, nombre, datos, anchos=None, ancho_default=15,
+                    encabezado='encabezado', formatos_columna=None):
+        """
+        Escribe una hoja desde un DataFrame o desde un iterable de DataFrames con las mismas
+        columnas (por ejemplo iter_chunks o un generador que arma cada bloque al vuelo).
+
+        anchos: {columna: ancho}, 'auto' (según el primer bloque) o None (ancho_default).
+        formatos_columna: {columna: nombre de formato del libro} para las celdas de datos.
+        Devuelve la cantidad de filas de datos escritas.
+        """
+        bloques = [datos] if isinstance(datos, pd.DataFrame) else datos
+        hoja = self.workbook.add_worksheet(nombre[:31])
+        self.hojas[nombre] = hoja
+        formatos_columna = formatos_columna or {}
+
+        fila = 0
+        for bloque in bloques:
+            if fila == 0:
+                # En modo constant_memory las columnas se configuran antes de la primera fila
+                columnas = list(bloque.columns)
+                anchos_hoja = _anchos_automaticos(bloque) if anchos == 'auto' else (anchos or {})
+                for i, col in enumerate(columnas):
+                    formato = self.formatos.get(formatos_columna.get(col))
+                    hoja.set_column(i, i, anchos_hoja.get(col, ancho_default), formato)
+                hoja.write_row(0, 0, [str(col) for col in columnas], self.formatos[encabezado])
+                fila = 1
+
+            for valores in _valores(bloque):
+                try:
+                    hoja.write_row(fila, 0, valores)
+                except TypeError:
+                    # Tipos que xlsxwriter no conoce (listas, objetos) se escriben como texto
+                    hoja.write_row(fila, 0, [v if v is None or isinstance(v, (str, int, float, date, time)) else str(v)
+                                             for v in valores])
+                fila += 1
+
+        return max(fila - 1, 0)
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+    def getvalue(self):
+        """Contenido del libro (solo para libros en memoria, después de cerrarlo)"""
+        self.close()
+        return self.buffer.getvalue() if self.buffer is not None else None
+
+
+def export_frames(hojas, destino=None, formatos=None, **opciones):
+    """
+    Escribe varias hojas {nombre: DataFrame o iterable de bloques} en un libro nuevo.
+    Devuelve los bytes del libro si destino es None, o el destino.
+    Las opciones (anchos, encabezado, ...) se aplican a todas las hojas.
+    """
+    libro = LibroExcel(destino, formatos=formatos)
+    with libro:
+        for nombre, datos in hojas.items():
+            libro.write_sheet(nombre, datos, **opciones)
+    return libro.getvalue() if destino is None else destino
@@ -0,0 +1,316 @@
+import hashlib
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import read_excel_cached
+
+FEEDBACKS_FILE = 'Feedbacks H1.xlsx'
+RUTAS_DEFAULT_FILE = 'BD_Rutas.xlsx'
+
+MESES_ESPANOL = [
+    '', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+    'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'
+]
+
+MES_INGLES_A_ESPANOL = {
+    'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
+    'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
+    'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
+    'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
+}
+
+TRIMESTRE_MAP = {1: 'Q1 (Ene-Mar)', 2: 'Q2 (Abr-Jun)', 3: 'Q3 (Jul-Sep)', 4: 'Q4 (Oct-Dic)'}
+
+# Columnas de cliente derivadas en la ingesta (ver add_client_columns)
+COLUMNAS_CLIENTE = ['cliente_id', 'codigo_numerico', 'nombre_canonico', 'codigo_valido', 'cliente_valido']
+
+# Datasets ya construidos en este proceso, indexados por rutas de archivos
+_DATASETS = {}
+
+
+@dataclass
+class FeedbackDataset:
+    """
+    Resultado único de la ingesta: feedbacks con columnas derivadas, BD de rutas limpia,
+    el merge de ambos y la dimensión de clientes por cliente_id. Los DataFrames se comparten
+    entre consumidores del mismo proceso, por lo que no deben modificarse in-place (usar
+    .copy() antes de agregar columnas).
+    """
+    feedbacks: pd.DataFrame
+    rutas: pd.DataFrame
+    merged: pd.DataFrame
+    data_quality: dict
+    source_fingerprint: tuple = field(default=())
+    rutas_scd: pd.DataFrame = None
+    clientes: pd.DataFrame = None
+
+    @property
+    def version(self):
+        """Identificador estable del dataset según la huella de los archivos de origen"""
+        return hashlib.sha256(repr(self.source_fingerprint).encode('utf-8')).hexdigest()[:16]
+
+    def rutas_para_meses(self, meses):
+        """BD de rutas vigente en los meses indicados (ver rutas_vigentes)"""
+        return rutas_vigentes(self.rutas_scd, self.rutas, meses)
+
+
+def add_calendar_columns(feedbacks_df):
+    """
+    Deriva en una sola pasada todas las columnas de calendario que usan los reportes:
+    mes, mes_nombre, semana, dia_semana, trimestre, trimestre_nombre, año, hora,
+    los alias en inglés year/month/week/weekday y los tiempos de cierre.
+    """
+    fecha_registro = pd.to_datetime(feedbacks_df['fecha_registro'])
+    fecha_cierre = pd.to_datetime(feedbacks_df['fecha_cierre'])
+
+    mes = fecha_registro.dt.month
+    año = fecha_registro.dt.year
+    semana = fecha_registro.dt.isocalendar().week
+    dia_semana = fecha_registro.dt.day_name()
+    trimestre = fecha_registro.dt.quarter
+    tiempo_resolucion = (fecha_cierre - fecha_registro).dt.days
+
+    columnas = {
+        'fecha_registro': fecha_registro,
+        'fecha_cierre': fecha_cierre,
+        'mes': mes,
+        'mes_nombre': fecha_registro.dt.month_name(),
+        'semana': semana,
+        'dia_semana': dia_semana,
+        'trimestre': trimestre,
+        'trimestre_nombre': trimestre.map(TRIMESTRE_MAP),
+        'año': año,
+        'hora': fecha_registro.dt.hour,
+        'year': año,
+        'month': mes,
+        'week': semana,
+        'weekday': dia_semana,
+        'tiempo_resolucion': tiempo_resolucion,
+        # Los casos sin cierre cuentan como 0 días
+        'tiempo_cierre_dias': tiempo_resolucion.fillna(0)
+    }
+
+    return feedbacks_df.assign(**columnas)
+
+
+def add_client_columns(feedbacks_df):
+    """
+    Deriva una sola vez, en la ingesta, las columnas de cliente de cada fila que comparten
+    los reportes: cliente_id (clave entera), codigo_numerico (parte numérica de
+    codigo_cliente), nombre_canonico, codigo_valido y cliente_valido (código y nombre
+    canónico de la fila identifican a un cliente real).
+    """
+    # Import diferido: dimension_clientes y normalizador_clientes dependen de este módulo
+    from dimension_clientes import client_ids
+    from normalizador_clientes import client_code_numbers, invalid_code_mask, invalid_name_mask, normalize_client_names
+
+    codigo_numerico = client_code_numbers(feedbacks_df['codigo_cliente'])
+    if 'nombre_cliente' in feedbacks_df.columns:
+        nombres = normalize_client_names(feedbacks_df['nombre_cliente'])
+    else:
+        nombres = pd.Series(np.nan, index=feedbacks_df.index, dtype=object)
+    codigo_valido = ~invalid_code_mask(codigo_numerico)
+
+    return feedbacks_df.assign(
+        cliente_id=client_ids(feedbacks_df['codigo_cliente']),
+        codigo_numerico=codigo_numerico.to_numpy(),
+        nombre_canonico=nombres.to_numpy(),
+        codigo_valido=codigo_valido,
+        cliente_valido=codigo_valido & ~invalid_name_mask(nombres)
+    )
+
+
+def clean_rutas(rutas_df):
+    """Elimina RUTA duplicadas y limpia espacios en SUPERVISOR y CONTRATISTA"""
+    rutas_df = rutas_df.drop_duplicates(subset=['RUTA'], keep='first').copy()
+    for col in ['SUPERVISOR', 'CONTRATISTA']:
+        if col in rutas_df.columns:
+            rutas_df[col] = rutas_df[col].astype(str).str.strip()
+    return rutas_df
+
+
+def merge_rutas(feedbacks_df, rutas_df):
+    """
+    Une feedbacks con la BD de rutas (left join por ruta).
+    La BD debe venir sin RUTA duplicadas para no duplicar feedbacks.
+    """
+    merged_df = feedbacks_df.merge(
+        rutas_df,
+        left_on='ruta',
+        right_on='RUTA',
+        how='left'
+    )
+
+    for col in ['SUPERVISOR', 'CONTRATISTA']:
+        if col in merged_df.columns:
+            merged_df[col] = merged_df[col].fillna('SIN ASIGNAR').astype(str).str.strip()
+
+    return merged_df
+
+
+def merge_rutas_scd(feedbacks_df, rutas_scd, rutas_df):
+    """
+    Une cada feedback con la asignación de su ruta vigente en el mes del feedback
+    (tabla SCD de rutas_catalog.build_rutas_scd) en una sola pasada vectorizada.
+    Las filas sin versión mensual vigente usan la BD por defecto, como merge_rutas.
+    El resultado conserva el orden y la cantidad de filas de feedbacks_df.
+    """
+    merged_df = merge_rutas(feedbacks_df, rutas_df)
+    if rutas_scd is None or rutas_scd.empty or feedbacks_df.empty:
+        return merged_df
+
+    claves = pd.DataFrame({
+        '_fila': np.arange(len(feedbacks_df)),
+        '_ruta_key': feedbacks_df['ruta'].astype(str).to_numpy(),
+        '_mes_key': pd.to_numeric(feedbacks_df['mes'], errors='coerce').fillna(0).astype('int64').to_numpy()
+    })
+    versiones = rutas_scd.assign(
+        _ruta_key=rutas_scd['RUTA'].astype(str),
+        _desde=rutas_scd['valid_from'].astype('int64')
+    )
+
+    asignadas = pd.merge_asof(
+        claves.sort_values('_mes_key', kind='mergesort'),
+        versiones.sort_values('_desde', kind='mergesort'),
+        left_on='_mes_key',
+        right_on='_desde',
+        by='_ruta_key',
+        direction='backward'
+    )
+    vigentes = asignadas['RUTA'].notna() & (asignadas['_mes_key'] <= asignadas['valid_to'])
+    asignadas = asignadas[vigentes]
+    if asignadas.empty:
+        return merged_df
+
+    # Sobrescribir solo las filas con versión mensual vigente
+    filas = asignadas['_fila'].to_numpy()
+    columnas = [c for c in rutas_scd.columns if c not in ('valid_from', 'valid_to', 'archivo')]
+    for col in columnas:
+        if col not in merged_df.columns:
+            merged_df[col] = pd.Series(np.nan, index=merged_df.index, dtype=object)
+        merged_df.loc[filas, col] = asignadas[col].to_numpy()
+
+    # Mismo relleno que merge_rutas para los vacíos de la versión mensual
+    for col in ['SUPERVISOR', 'CONTRATISTA']:
+        if col in columnas:
+            merged_df[col] = merged_df[col].fillna('SIN ASIGNAR').astype(str).str.strip()
+
+    return merged_df
+
+
+def rutas_vigentes(rutas_scd, rutas_df, meses):
+    """
+    BD de rutas para un conjunto de meses: por cada ruta, la última versión mensual vigente
+    en alguno de esos meses; las rutas sin versión mensual se toman de la BD por defecto.
+    La columna 'archivo' indica de qué BD proviene cada asignación.
+    """
+    default_df = rutas_df.assign(archivo=RUTAS_DEFAULT_FILE)
+    meses = [int(m) for m in pd.Series(meses).dropna().unique()]
+    if rutas_scd is None or rutas_scd.empty or not meses:
+        return default_df
+
+    en_periodo = np.zeros(len(rutas_scd), dtype=bool)
+    for mes in meses:
+        en_periodo |= ((rutas_scd['valid_from'] <= mes) & (rutas_scd['valid_to'] >= mes)).to_numpy()
+
+    versiones = rutas_scd[en_periodo]
+    versiones = versiones.sort_values('valid_from', kind='mergesort').drop_duplicates(subset=['RUTA'], keep='last')
+    versiones = versiones.drop(columns=['valid_from', 'valid_to'])
+
+    sin_version = default_df[~default_df['RUTA'].isin(versiones['RUTA'])]
+    return pd.concat([versiones, sin_version], ignore_index=True)
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def load_feedbacks(feedbacks_path=FEEDBACKS_FILE, incremental=True):
+    """
+    Carga los feedbacks con las columnas de calendario ya derivadas.
+    En modo incremental se reutiliza el dataset persistido y solo se procesan las filas nuevas.
+    """
+    if incremental:
+        # Import diferido: ingesta_incremental depende de este módulo
+        from ingesta_incremental import ingest_incremental
+        return ingest_incremental(feedbacks_path).feedbacks
+    return add_client_columns(add_calendar_columns(read_excel_cached(feedbacks_path)))
+
+
+def load_dataset(feedbacks_path=FEEDBACKS_FILE, rutas_path=RUTAS_DEFAULT_FILE, por_mes=True):
+    """
+    Devuelve el FeedbackDataset del proceso. Se construye una sola vez y se reutiliza
+    mientras los archivos de origen no cambien (mtime y tamaño).
+
+    Con por_mes=True cada feedback toma la asignación de ruta vigente en su propio mes
+    según las BDs BD_Rutas_<Mes>.xlsx del directorio de rutas_path; rutas_path queda
+    como BD por defecto para los meses y rutas sin BD mensual.
+    """
+    # Import diferido: rutas_catalog depende de este módulo
+    from rutas_catalog import build_rutas_scd, get_rutas_catalog, scan_rutas_files
+
+    directorio_rutas = os.path.dirname(os.path.abspath(rutas_path))
+    archivos_mes = {}
+    if por_mes:
+        archivos_mes = {mes: archivo for mes, archivo in scan_rutas_files(directorio_rutas).items()
+                        if mes in MESES_ESPANOL}
+
+    fingerprint = (
+        _fingerprint(feedbacks_path),
+        _fingerprint(rutas_path),
+        tuple(_fingerprint(os.path.join(directorio_rutas, archivos_mes[mes]))
+              for mes in sorted(archivos_mes))
+    )
+    key = (os.path.abspath(feedbacks_path), os.path.abspath(rutas_path), por_mes)
+
+    cached = _DATASETS.get(key)
+    if cached is not None and cached.source_fingerprint == fingerprint:
+        return cached
+
+    # Import diferido: ingesta_incremental depende de este módulo
+    from ingesta_incremental import ingest_incremental
+    ingesta = ingest_incremental(feedbacks_path)
+    feedbacks_df = ingesta.feedbacks
+    rutas_raw = read_excel_cached(rutas_path)
+    duplicados = int(rutas_raw['RUTA'].duplicated(keep=False).sum())
+    rutas_df = clean_rutas(rutas_raw)
+
+    rutas_scd = build_rutas_scd(get_rutas_catalog(directorio_rutas)) if archivos_mes else None
+    merged_df = merge_rutas_scd(feedbacks_df, rutas_scd, rutas_df)
+
+    rutas_feedbacks = set(feedbacks_df['ruta'].unique())
+    rutas_bd = set(rutas_df['RUTA'].unique())
+    if rutas_scd is not None:
+        rutas_bd |= set(rutas_scd['RUTA'].unique())
+
+    data_quality = {
+        'total_feedbacks': len(feedbacks_df),
+        'rutas_feedbacks': feedbacks_df['ruta'].nunique(),
+        'total_rutas_bd': len(rutas_df),
+        'rutas_unicas_bd': rutas_df['RUTA'].nunique(),
+        'rutas_matched': len(rutas_feedbacks & rutas_bd),
+        'rutas_sin_supervisor': len(rutas_feedbacks - rutas_bd),
+        'duplicados_bd_rutas': duplicados,
+        'bds_mensuales': len(archivos_mes)
+    }
+
+    dataset = FeedbackDataset(
+        feedbacks=feedbacks_df,
+        rutas=rutas_df,
+        merged=merged_df,
+        data_quality=data_quality,
+        source_fingerprint=fingerprint,
+        rutas_scd=rutas_scd,
+        clientes=ingesta.clientes
+    )
+    _DATASETS[key] = dataset
+    return dataset
+
+
+def get_feedbacks(feedbacks_path=FEEDBACKS_FILE):
+    """Atajo para los scripts que solo necesitan los feedbacks preparados"""
+    return load_dataset(feedbacks_path).feedbacks
@@ -1,8 +1,11 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import calendar
 import warnings
+from feedbacks_core import get_feedbacks
+from rutas_catalog import get_rutas_catalog
+from exportar_excel import export_frames, formato_encabezado
+from motor_consecuencias import update_consequence_state
 warnings.filterwarnings('ignore')
 
 def analyze_route_compliance():
@@ -14,20 +17,13 @@ def analyze_route_compliance():
     
     try:
         # Cargar datos de feedbacks
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        feedbacks_df = get_feedbacks()
         print(f"✅ Datos cargados: {len(feedbacks_df)} registros de feedbacks")
         
         # Intentar cargar base de datos de rutas más reciente
-        rutas_files = ['BD_Rutas_Junio.xlsx', 'BD_Rutas_Mayo.xlsx', 'BD_Rutas.xlsx']
-        rutas_df = None
-        
-        for file in rutas_files:
-            try:
-                rutas_df = pd.read_excel(file)
-                print(f"✅ Base de rutas cargada: {file}")
-                break
-            except FileNotFoundError:
-                continue
+        rutas_df, archivo = get_rutas_catalog().get_first(['Junio', 'Mayo', 'default'])
+        if rutas_df is not None:
+            print(f"✅ Base de rutas cargada: {archivo}")
         
         if rutas_df is None:
             print("❌ No se pudo cargar ninguna base de datos de rutas")
@@ -39,76 +35,48 @@ def analyze_route_compliance():
         print(f"❌ Error cargando datos: {e}")
         return None
 
-def create_consequence_flow(feedbacks_df, rutas_df):
+def create_consequence_flow(feedbacks_df, rutas_df=None, meses=6):
     """
-    Crea el flujo de consecuencias para rutas que no cumplen con feedbacks
+    Crea el flujo de consecuencias para rutas que no cumplen con feedbacks.
+    Usa el estado persistido del motor de consecuencias: solo se calculan los meses nuevos.
+    Devuelve el análisis de los últimos meses evaluados y el estado completo.
     """
     print("\n🔍 GENERANDO FLUJO DE CONSECUENCIAS...")
     
-    # Convertir fechas
-    feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
-    
-    # Obtener el mes actual y anterior para análisis
-    current_date = datetime.now()
-    current_month = current_date.month
-    current_year = current_date.year
+    estado = update_consequence_state(feedbacks_df, rutas_df)
+    if estado is None or not estado.periodos:
+        print("❌ No hay meses evaluados para el flujo de consecuencias")
+        return [], estado
     
-    # Analizar por mes
+    # Analizar por mes (del más reciente al más antiguo)
     monthly_analysis = []
+    resumen = estado.resumen_mensual().iloc[::-1].head(meses)
     
-    for month_offset in range(6):  # Analizar últimos 6 meses
-        target_date = current_date - timedelta(days=30 * month_offset)
-        target_month = target_date.month
-        target_year = target_date.year
-        month_name = calendar.month_name[target_month]
-        
-        # Filtrar feedbacks del mes
-        month_feedbacks = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == target_month) &
-            (feedbacks_df['fecha_registro'].dt.year == target_year)
-        ]
-        
-        # Obtener rutas únicas del mes
-        rutas_con_feedback = set(month_feedbacks['ruta'].dropna().unique())
-        
-        # Obtener todas las rutas que deberían tener feedback
-        if 'RUTA' in rutas_df.columns:
-            todas_las_rutas = set(rutas_df['RUTA'].dropna().unique())
-        elif 'ruta' in rutas_df.columns:
-            todas_las_rutas = set(rutas_df['ruta'].dropna().unique())
-        else:
-            # Si no hay columna de rutas clara, usar las rutas de feedbacks
-            todas_las_rutas = set(feedbacks_df['ruta'].dropna().unique())
-        
-        # Rutas que NO realizaron feedback
-        rutas_sin_feedback = todas_las_rutas - rutas_con_feedback
-        
-        # Calcular estadísticas
-        total_rutas = len(todas_las_rutas)
-        rutas_cumplieron = len(rutas_con_feedback)
-        rutas_no_cumplieron = len(rutas_sin_feedback)
-        porcentaje_cumplimiento = (rutas_cumplieron / total_rutas * 100) if total_rutas > 0 else 0
+    for _, item in resumen.iterrows():
+        columna = estado.cumplimiento[item['Periodo']]
+        rutas_sin_feedback = columna.index[columna == 0].tolist()
+        porcentaje_cumplimiento = item['Porcentaje_Cumplimiento']
         
         monthly_analysis.append({
-            'Año': target_year,
-            'Mes': month_name,
-            'Mes_Num': target_month,
-            'Total_Rutas': total_rutas,
-            'Rutas_Con_Feedback': rutas_cumplieron,
-            'Rutas_Sin_Feedback': rutas_no_cumplieron,
-            'Porcentaje_Cumplimiento': round(porcentaje_cumplimiento, 2),
-            'Rutas_Incumplidas': list(rutas_sin_feedback)
+            'Año': int(item['Año']),
+            'Mes': item['Mes'],
+            'Mes_Num': int(item['Mes_Num']),
+            'Total_Rutas': int(item['Total_Rutas']),
+            'Rutas_Con_Feedback': int(item['Rutas_Con_Feedback']),
+            'Rutas_Sin_Feedback': int(item['Rutas_Sin_Feedback']),
+            'Porcentaje_Cumplimiento': porcentaje_cumplimiento,
+            'Rutas_Incumplidas': rutas_sin_feedback
         })
         
-        print(f"\n📅 {month_name} {target_year}:")
-        print(f"   • Total rutas: {total_rutas}")
-        print(f"   • Rutas con feedback: {rutas_cumplieron}")
-        print(f"   • Rutas sin feedback: {rutas_no_cumplieron}")
+        print(f"\n📅 {item['Mes']} {int(item['Año'])}:")
+        print(f"   • Total rutas: {int(item['Total_Rutas'])}")
+        print(f"   • Rutas con feedback: {int(item['Rutas_Con_Feedback'])}")
+        print(f"   • Rutas sin feedback: {int(item['Rutas_Sin_Feedback'])}")
         print(f"   • % Cumplimiento: {porcentaje_cumplimiento:.1f}%")
     
-    return monthly_analysis
+    return monthly_analysis, estado
 
-def generate_consequence_flow_excel(monthly_analysis):
+def generate_consequence_flow_excel(monthly_analysis, estado):
     """
     Genera el archivo Excel con el flujo de consecuencias
     """
@@ -143,122 +111,50 @@ def generate_consequence_flow_excel(monthly_analysis):
     
     rutas_incumplidas_df = pd.DataFrame(rutas_incumplidas)
     
-    # 3. Flujo de consecuencias progresivas
-    flujo_consecuencias = []
+    # 3. Flujo de consecuencias progresivas (nivel según meses consecutivos sin feedback)
+    estado_rutas = estado.resumen_mes()
+    estado_rutas = estado_rutas[estado_rutas['Nivel'] > 0].sort_values(['Racha', 'RUTA'], ascending=[False, True])
     
-    # Contar incumplimientos por ruta
-    ruta_incumplimientos = {}
-    for item in monthly_analysis:
-        for ruta in item['Rutas_Incumplidas']:
-            if ruta not in ruta_incumplimientos:
-                ruta_incumplimientos[ruta] = 0
-            ruta_incumplimientos[ruta] += 1
-    
-    # Definir consecuencias según el número de incumplimientos
-    for ruta, incumplimientos in ruta_incumplimientos.items():
-        if incumplimientos == 1:
-            consecuencia = "LLAMADA DE ATENCIÓN VERBAL"
-            nivel = "NIVEL 1"
-        elif incumplimientos == 2:
-            consecuencia = "AMONESTACIÓN ESCRITA"
-            nivel = "NIVEL 2"
-        elif incumplimientos == 3:
-            consecuencia = "SUSPENSIÓN DE 1 DÍA"
-            nivel = "NIVEL 3"
-        elif incumplimientos >= 4:
-            consecuencia = "EVALUACIÓN PARA SUSPENSIÓN EXTENDIDA"
-            nivel = "NIVEL 4"
-        else:
-            consecuencia = "SIN CONSECUENCIAS"
-            nivel = "NIVEL 0"
-        
-        flujo_consecuencias.append({
-            'Ruta': ruta,
-            'Incumplimientos_Totales': incumplimientos,
-            'Nivel_Consecuencia': nivel,
-            'Accion_Requerida': consecuencia,
-            'Fecha_Evaluacion': datetime.now().strftime('%Y-%m-%d'),
-            'Estado': 'PENDIENTE',
-            'Responsable': 'Coordinador de Distribución',
-            'Fecha_Limite_Accion': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-        })
-    
-    flujo_df = pd.DataFrame(flujo_consecuencias)
+    flujo_df = pd.DataFrame({
+        'Ruta': estado_rutas['RUTA'].to_numpy(),
+        'Meses_Consecutivos_Sin_Feedback': estado_rutas['Racha'].to_numpy(),
+        'Incumplimientos_Totales': estado_rutas['Incumplimientos_Totales'].to_numpy(),
+        'Nivel_Consecuencia': estado_rutas['Nivel_Consecuencia'].to_numpy(),
+        'Accion_Requerida': estado_rutas['Accion_Requerida'].to_numpy(),
+        'Fecha_Evaluacion': datetime.now().strftime('%Y-%m-%d'),
+        'Estado': 'PENDIENTE',
+        'Responsable': 'Coordinador de Distribución',
+        'Fecha_Limite_Accion': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+    })
     
     # 4. Hoja de seguimiento de acciones
-    seguimiento_df = pd.DataFrame([
-        {
-            'Ruta': row['Ruta'],
-            'Nivel': row['Nivel_Consecuencia'],
-            'Accion': row['Accion_Requerida'],
-            'Fecha_Programada': row['Fecha_Limite_Accion'],
-            'Fecha_Ejecutada': '',
-            'Responsable_Ejecucion': '',
-            'Observaciones': '',
-            'Estado': 'PENDIENTE',
-            'Evidencia': ''
-        }
-        for _, row in flujo_df.iterrows()
-    ])
+    seguimiento_df = pd.DataFrame({
+        'Ruta': flujo_df['Ruta'],
+        'Nivel': flujo_df['Nivel_Consecuencia'],
+        'Accion': flujo_df['Accion_Requerida'],
+        'Fecha_Programada': flujo_df['Fecha_Limite_Accion'],
+        'Fecha_Ejecutada': '',
+        'Responsable_Ejecucion': '',
+        'Observaciones': '',
+        'Estado': 'PENDIENTE',
+        'Evidencia': ''
+    })
     
     # Crear archivo Excel con múltiples hojas
     filename = f"Flujo_Consecuencias_Feedbacks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
     
-    with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
-        # Hoja 1: Resumen ejecutivo
-        resumen_df.to_excel(writer, sheet_name='Resumen_Mensual', index=False)
-        
-        # Hoja 2: Rutas incumplidas detallado
-        rutas_incumplidas_df.to_excel(writer, sheet_name='Rutas_Incumplidas', index=False)
-        
-        # Hoja 3: Flujo de consecuencias
-        flujo_df.to_excel(writer, sheet_name='Flujo_Consecuencias', index=False)
-        
-        # Hoja 4: Seguimiento de acciones
-        seguimiento_df.to_excel(writer, sheet_name='Seguimiento_Acciones', index=False)
-        
-        # Acceder al workbook para formato
-        workbook = writer.book
-        
-        # Formatos
-        header_format = workbook.add_format({
-            'bold': True,
-            'text_wrap': True,
-            'valign': 'top',
-            'fg_color': '#366092',
-            'font_color': 'white',
-            'border': 1
-        })
-        
-        nivel1_format = workbook.add_format({
-            'bg_color': '#FFEB9C',
-            'border': 1
-        })
-        
-        nivel2_format = workbook.add_format({
-            'bg_color': '#FFCC99',
-            'border': 1
-        })
-        
-        nivel3_format = workbook.add_format({
-            'bg_color': '#FF9999',
-            'border': 1
-        })
-        
-        nivel4_format = workbook.add_format({
-            'bg_color': '#FF6666',
-            'border': 1
-        })
-          # Aplicar formato a las hojas
-        for sheet_name in ['Resumen_Mensual', 'Rutas_Incumplidas', 'Flujo_Consecuencias', 'Seguimiento_Acciones']:
-            worksheet = writer.sheets[sheet_name]
-            
-            # Ajustar ancho de columnas
-            worksheet.set_column('A:Z', 20)
-            
-            # Aplicar formato de encabezado a la primera fila
-            for col_num in range(20):  # Aplicar a las primeras 20 columnas
-                worksheet.set_row(0, None, header_format)
+    # Libro en modo constant_memory: encabezado y anchos definidos una vez para todas las hojas
+    export_frames(
+        {
+            'Resumen_Mensual': resumen_df,                 # Hoja 1: Resumen ejecutivo
+            'Rutas_Incumplidas': rutas_incumplidas_df,     # Hoja 2: Rutas incumplidas detallado
+            'Flujo_Consecuencias': flujo_df,               # Hoja 3: Flujo de consecuencias
+            'Seguimiento_Acciones': seguimiento_df         # Hoja 4: Seguimiento de acciones
+        },
+        destino=filename,
+        formatos={'encabezado': formato_encabezado('#366092', border=1)},
+        ancho_default=20
+    )
     
     print(f"✅ Archivo generado: {filename}")
     return filename
@@ -335,11 +231,13 @@ def main():
     
     feedbacks_df, rutas_df = data
     
-    # Crear análisis mensual
-    monthly_analysis = create_consequence_flow(feedbacks_df, rutas_df)
+    # Crear análisis mensual (BD de rutas del catálogo para cada mes)
+    monthly_analysis, estado = create_consequence_flow(feedbacks_df)
+    if not monthly_analysis:
+        return
     
     # Generar archivo de consecuencias
-    consequence_file = generate_consequence_flow_excel(monthly_analysis)
+    consequence_file = generate_consequence_flow_excel(monthly_analysis, estado)
     
     # Generar plan de acción
     action_plan_file = generate_action_plan()
@@ -1,6 +1,8 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import calendar
+from feedbacks_core import get_feedbacks
+from motor_consecuencias import update_consequence_state
 
 def create_simple_monthly_consequences_flow():
     """
@@ -11,61 +13,55 @@ def create_simple_monthly_consequences_flow():
     
     try:
         # Cargar datos de feedbacks
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        feedbacks_df = get_feedbacks()
         rutas_df = pd.read_excel('BD_Rutas_Mayo.xlsx')  # Usar Mayo como base
         
         print(f"✅ Datos cargados: {len(feedbacks_df)} feedbacks")
         print(f"✅ Base de rutas Mayo: {len(rutas_df)} rutas")
         
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+        # Las fechas y columnas de calendario ya vienen de feedbacks_core
         
-        # Filtrar feedbacks de Mayo 2025
-        mayo_feedbacks = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == 5) &
-            (feedbacks_df['fecha_registro'].dt.year == 2025)
-        ]
-        
-        print(f"📊 Feedbacks de Mayo 2025: {len(mayo_feedbacks)}")
-        
-        # Obtener todas las rutas que deberían haber hecho feedback en Mayo
-        todas_las_rutas_mayo = set(rutas_df['RUTA'].dropna().unique())
-        
-        # Rutas que SÍ hicieron feedback en Mayo
-        rutas_con_feedback_mayo = set(mayo_feedbacks['ruta'].dropna().unique())
+        # Estado de Mayo 2025 desde el motor de consecuencias (meses ya evaluados no se recalculan)
+        estado = update_consequence_state(feedbacks_df, hasta=(2025, 5))
+        if estado is None or '2025-05' not in estado.periodos:
+            print("❌ No hay feedbacks de Mayo 2025 para evaluar")
+            return None, 0
+        estado_mayo = estado.resumen_mes('2025-05')
         
         # Rutas que NO hicieron feedback en Mayo (estas necesitan consecuencias)
-        rutas_sin_feedback_mayo = todas_las_rutas_mayo - rutas_con_feedback_mayo
+        rutas_sin_feedback_mayo = estado_mayo[~estado_mayo['Cumplio']].sort_values('RUTA')
         
-        print(f"📈 Total rutas esperadas en Mayo: {len(todas_las_rutas_mayo)}")
-        print(f"✅ Rutas que sí cumplieron: {len(rutas_con_feedback_mayo)}")
-        print(f"❌ Rutas que NO cumplieron: {len(rutas_sin_feedback_mayo)}")
+        total_rutas_mayo = len(estado_mayo)
+        rutas_cumplieron_mayo = int(estado_mayo['Cumplio'].sum())
         
-        # Crear DataFrame principal con las rutas que necesitan consecuencias
-        consecuencias_data = []
+        print(f"📈 Total rutas esperadas en Mayo: {total_rutas_mayo}")
+        print(f"✅ Rutas que sí cumplieron: {rutas_cumplieron_mayo}")
+        print(f"❌ Rutas que NO cumplieron: {len(rutas_sin_feedback_mayo)}")
         
-        for ruta in rutas_sin_feedback_mayo:
-            # Buscar información del vendedor en la base de rutas
-            ruta_info = rutas_df[rutas_df['RUTA'] == ruta]
-            vendedor = ruta_info['NOMBRE_VENDEDOR'].iloc[0] if not ruta_info.empty and 'NOMBRE_VENDEDOR' in ruta_info.columns else 'No disponible'
-            
-            consecuencias_data.append({
-                'RUTA': ruta,
-                'VENDEDOR/CONDUCTOR': vendedor,
-                'MES_INCUMPLIMIENTO': 'Mayo 2025',
-                'FECHA_DETECCION': datetime.now().strftime('%Y-%m-%d'),
-                'NIVEL_CONSECUENCIA': 'PENDIENTE EVALUAR',
-                'ACCION_REQUERIDA': 'PENDIENTE ASIGNAR',
-                'RESPONSABLE': 'PENDIENTE ASIGNAR',
-                'FECHA_LIMITE_ACCION': '',
-                'FECHA_EJECUCION': '',
-                'ESTADO': 'PENDIENTE',
-                'OBSERVACIONES': '',
-                'EVIDENCIA_DOCUMENTO': ''
-            })
+        # Información del vendedor desde la base de rutas
+        if 'NOMBRE_VENDEDOR' in rutas_df.columns:
+            vendedores = rutas_df.drop_duplicates(subset=['RUTA'])
+            vendedores = vendedores.set_index(vendedores['RUTA'].astype(str))['NOMBRE_VENDEDOR']
+            vendedor = rutas_sin_feedback_mayo['RUTA'].map(vendedores).fillna('No disponible')
+        else:
+            vendedor = 'No disponible'
         
-        # Crear DataFrame
-        consecuencias_df = pd.DataFrame(consecuencias_data)
+        # Crear DataFrame principal con las rutas que necesitan consecuencias
+        consecuencias_df = pd.DataFrame({
+            'RUTA': rutas_sin_feedback_mayo['RUTA'].to_numpy(),
+            'VENDEDOR/CONDUCTOR': vendedor if isinstance(vendedor, str) else vendedor.to_numpy(),
+            'MES_INCUMPLIMIENTO': 'Mayo 2025',
+            'MESES_CONSECUTIVOS_SIN_FEEDBACK': rutas_sin_feedback_mayo['Racha'].to_numpy(),
+            'FECHA_DETECCION': datetime.now().strftime('%Y-%m-%d'),
+            'NIVEL_CONSECUENCIA': rutas_sin_feedback_mayo['Nivel_Consecuencia'].to_numpy(),
+            'ACCION_REQUERIDA': rutas_sin_feedback_mayo['Accion_Requerida'].to_numpy(),
+            'RESPONSABLE': 'PENDIENTE ASIGNAR',
+            'FECHA_LIMITE_ACCION': '',
+            'FECHA_EJECUCION': '',
+            'ESTADO': 'PENDIENTE',
+            'OBSERVACIONES': '',
+            'EVIDENCIA_DOCUMENTO': ''
+        })
         
         # Crear plantilla de niveles de consecuencias
         niveles_data = [
@@ -113,14 +109,14 @@ def create_simple_monthly_consequences_flow():
         seguimiento_mensual = [
             {
                 'MES': 'Mayo 2025',
-                'TOTAL_RUTAS': len(todas_las_rutas_mayo),
-                'RUTAS_CUMPLIERON': len(rutas_con_feedback_mayo),
+                'TOTAL_RUTAS': total_rutas_mayo,
+                'RUTAS_CUMPLIERON': rutas_cumplieron_mayo,
                 'RUTAS_NO_CUMPLIERON': len(rutas_sin_feedback_mayo),
-                'PORCENTAJE_CUMPLIMIENTO': round((len(rutas_con_feedback_mayo) / len(todas_las_rutas_mayo)) * 100, 1),
-                'ACCIONES_NIVEL_1': 0,
-                'ACCIONES_NIVEL_2': 0,
-                'ACCIONES_NIVEL_3': 0,
-                'ACCIONES_NIVEL_4': 0,
+                'PORCENTAJE_CUMPLIMIENTO': round((rutas_cumplieron_mayo / total_rutas_mayo) * 100, 1),
+                'ACCIONES_NIVEL_1': int((rutas_sin_feedback_mayo['Nivel'] == 1).sum()),
+                'ACCIONES_NIVEL_2': int((rutas_sin_feedback_mayo['Nivel'] == 2).sum()),
+                'ACCIONES_NIVEL_3': int((rutas_sin_feedback_mayo['Nivel'] == 3).sum()),
+                'ACCIONES_NIVEL_4': int((rutas_sin_feedback_mayo['Nivel'] == 4).sum()),
                 'FECHA_REVISION': datetime.now().strftime('%Y-%m-%d'),
                 'RESPONSABLE_REVISION': 'Coordinador de Distribución'
             }
@@ -206,15 +202,15 @@ def create_simple_monthly_consequences_flow():
         
         # Mostrar resumen
         print(f"\n📊 RESUMEN PARA MAYO 2025:")
-        print(f"   • Total rutas: {len(todas_las_rutas_mayo)}")
-        print(f"   • Rutas que cumplieron: {len(rutas_con_feedback_mayo)}")
+        print(f"   • Total rutas: {total_rutas_mayo}")
+        print(f"   • Rutas que cumplieron: {rutas_cumplieron_mayo}")
         print(f"   • Rutas para consecuencias: {len(rutas_sin_feedback_mayo)}")
-        print(f"   • % Cumplimiento: {round((len(rutas_con_feedback_mayo) / len(todas_las_rutas_mayo)) * 100, 1)}%")
+        print(f"   • % Cumplimiento: {round((rutas_cumplieron_mayo / total_rutas_mayo) * 100, 1)}%")
         
         if len(rutas_sin_feedback_mayo) > 0:
             print(f"\n🚨 RUTAS QUE REQUIEREN ACCIÓN (Mayo 2025):")
-            for i, ruta in enumerate(sorted(list(rutas_sin_feedback_mayo))[:10], 1):
-                print(f"   {i}. {ruta}")
+            for i, (ruta, nivel) in enumerate(rutas_sin_feedback_mayo[['RUTA', 'Nivel_Consecuencia']].head(10).to_numpy(), 1):
+                print(f"   {i}. {ruta} ({nivel})")
             if len(rutas_sin_feedback_mayo) > 10:
                 print(f"   ... y {len(rutas_sin_feedback_mayo) - 10} rutas más")
         
@@ -8,6 +8,8 @@ from reportlab.lib import colors
 from reportlab.lib.units import inch
 import os
 import io
+from feedbacks_core import MES_INGLES_A_ESPANOL, get_feedbacks
+from rutas_catalog import get_rutas_catalog
 
 def load_headcount_data():
     """
@@ -72,43 +74,28 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2025):
     
     try:
         # Cargar datos principales
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        feedbacks_df = get_feedbacks()
         headcount_df = load_headcount_data()
         
         if headcount_df is None:
             print("⚠️ Continuando sin base HEADCOUNT, usando datos disponibles")
         
         # Cargar base de rutas
-        archivos_rutas = [
-            f'BD_Rutas_{mes_nombre}.xlsx',
-            'BD_Rutas_Junio.xlsx',
-            'BD_Rutas_Mayo.xlsx', 
-            'BD_Rutas.xlsx'
-        ]
-        
-        rutas_df = None
-        archivo_usado = None
-        
-        for archivo in archivos_rutas:
-            try:
-                rutas_df = pd.read_excel(archivo)
-                archivo_usado = archivo
-                print(f"✅ Usando base de rutas: {archivo}")
-                break
-            except FileNotFoundError:
-                continue
+        candidatos = [MES_INGLES_A_ESPANOL.get(mes_nombre, mes_nombre), 'Junio', 'Mayo', 'default']
+        rutas_df, archivo_usado = get_rutas_catalog().get_first(candidatos)
+        if rutas_df is not None:
+            print(f"✅ Usando base de rutas: {archivo_usado}")
         
         if rutas_df is None:
             print("❌ No se encontró ninguna base de datos de rutas")
             return None
         
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+        # Las fechas y columnas de calendario ya vienen de feedbacks_core
         
         # Filtrar feedbacks del mes específico
         feedbacks_mes = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == mes) &
-            (feedbacks_df['fecha_registro'].dt.year == año)
+            (feedbacks_df['mes'] == mes) &
+            (feedbacks_df['año'] == año)
         ]
         
         print(f"📊 Feedbacks encontrados en {mes_nombre} {año}: {len(feedbacks_mes)}")
@@ -515,16 +502,15 @@ def generate_cartas_for_routes():
     
     try:
         # Cargar datos
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        feedbacks_df = get_feedbacks()
         rutas_df = pd.read_excel('BD_Rutas_Mayo.xlsx')
         
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+        # Las fechas y columnas de calendario ya vienen de feedbacks_core
         
         # Filtrar Mayo 2025
         mayo_feedbacks = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == 5) &
-            (feedbacks_df['fecha_registro'].dt.year == 2025)
+            (feedbacks_df['mes'] == 5) &
+            (feedbacks_df['año'] == 2025)
         ]
         
         # Identificar rutas sin feedback
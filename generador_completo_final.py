@@ -6,8 +6,13 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+import inspect
 import os
 import io
+from feedbacks_core import get_feedbacks
+from rutas_catalog import get_rutas_catalog
+from cartas_lote import ManifiestoDocumentos, carta_path, huella_documento, render_batch
+from plantilla_cartas import build_consolidated_pdf, get_plantilla, huella_fuente
 
 def load_headcount_data():
     """
@@ -54,7 +59,7 @@ def get_signatures_for_date():
         {"name": "Óscar Cuellar", "title": "Coordinador de Distribución"}
     ]
 
-def generar_flujo_consecuencias_con_cartas(mes=5, año=2025):
+def generar_flujo_consecuencias_con_cartas(mes=5, año=2025, workers=None, force=False):
     """
     Genera el flujo de consecuencias mensual con cartas PDF personalizadas
     """
@@ -70,40 +75,24 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2025):
     
     try:
         # Cargar datos principales
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        feedbacks_df = get_feedbacks()
         headcount_df = load_headcount_data()
         
         # Cargar base de rutas
-        archivos_rutas = [
-            f'BD_Rutas_{mes_nombre}.xlsx',
-            'BD_Rutas_Junio.xlsx',
-            'BD_Rutas_Mayo.xlsx', 
-            'BD_Rutas.xlsx'
-        ]
-        
-        rutas_df = None
-        archivo_usado = None
-        
-        for archivo in archivos_rutas:
-            try:
-                rutas_df = pd.read_excel(archivo)
-                archivo_usado = archivo
-                print(f"✅ Usando base de rutas: {archivo}")
-                break
-            except FileNotFoundError:
-                continue
+        rutas_df, archivo_usado = get_rutas_catalog().get_for_month(mes)
+        if rutas_df is not None:
+            print(f"✅ Usando base de rutas: {archivo_usado}")
         
         if rutas_df is None:
             print("❌ No se encontró ninguna base de datos de rutas")
             return None
         
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+        # Las fechas y columnas de calendario ya vienen de feedbacks_core
         
         # Filtrar feedbacks del mes específico
         feedbacks_mes = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == mes) &
-            (feedbacks_df['fecha_registro'].dt.year == año)
+            (feedbacks_df['mes'] == mes) &
+            (feedbacks_df['año'] == año)
         ]
         
         print(f"📊 Feedbacks encontrados en {mes_nombre} {año}: {len(feedbacks_mes)}")
@@ -294,7 +283,7 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2025):
         
         # Generar cartas PDF para cada ruta
         if len(rutas_sin_feedback) > 0:
-            generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str)
+            generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str, workers=workers, force=force)
         
         # Generar PDF del flujo completo
         generar_pdf_flujo_completo(df_guia, mes_nombre, año, df_resumen)
@@ -307,29 +296,50 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2025):
         traceback.print_exc()
         return None, 0
 
-def generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str):
+def generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str, workers=None, force=False):
     """
-    Genera cartas PDF individuales para cada ruta usando el formato del weekly report
+    Genera cartas PDF individuales para cada ruta usando el formato del weekly report.
+    Las cartas se reparten en un pool de procesos (workers, por defecto uno por núcleo);
+    una carta con error no detiene el resto y queda en el resumen. Las cartas cuyos datos
+    no cambiaron desde la corrida anterior se omiten, salvo con force=True.
     """
     print(f"\n📄 GENERANDO CARTAS PDF PARA {len(df_consecuencias)} RUTAS...")
     
     # Crear directorio para las cartas
     cartas_dir = f"Cartas_{mes_nombre}_{año}"
-    if not os.path.exists(cartas_dir):
-        os.makedirs(cartas_dir)
+    os.makedirs(cartas_dir, exist_ok=True)
     
-    for _, row in df_consecuencias.iterrows():
-        ruta = row['RUTA']
-        reparto = row['REPARTO']
-        supervisor = row['SUPERVISOR']
-        contratista = row['CONTRATISTA']
-        
-        # Crear carta PDF
-        filename = f"{cartas_dir}/Carta_Incumplimiento_{ruta}_{mes_nombre}_{año}.pdf"
-        
-        crear_carta_individual_pdf(filename, ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str)
+    columnas = ['RUTA', 'REPARTO', 'SUPERVISOR', 'CONTRATISTA']
+    tareas = [
+        (
+            carta_path(cartas_dir, ruta, mes_nombre, año),
+            {
+                'ruta': ruta,
+                'reparto': reparto,
+                'supervisor': supervisor,
+                'contratista': contratista,
+                'mes_nombre': mes_nombre,
+                'año': año,
+                'fecha_deteccion_str': fecha_deteccion_str
+            }
+        )
+        for ruta, reparto, supervisor, contratista in df_consecuencias[columnas].itertuples(index=False, name=None)
+    ]
     
-    print(f"✅ {len(df_consecuencias)} cartas PDF generadas en directorio: {cartas_dir}")
+    resumen = render_batch(crear_carta_individual_pdf, tareas, workers=workers, force=force)
+    resumen.imprimir(f"Cartas PDF en directorio {cartas_dir}")
+    
+    # PDF único del mes con índice por supervisor y ruta
+    generar_pdf_consolidado_cartas(df_consecuencias, mes_nombre, año, fecha_deteccion_str, cartas_dir, force=force)
+    return resumen
+
+# Márgenes de las cartas (individuales y consolidado mensual)
+MARGENES_CARTA = {
+    'leftMargin': 0.75*inch,
+    'rightMargin': 0.75*inch,
+    'topMargin': 0.5*inch,
+    'bottomMargin': 0.5*inch
+}
 
 def crear_carta_individual_pdf(filename, ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str):
     """
@@ -339,77 +349,35 @@ def crear_carta_individual_pdf(filename, ruta, reparto, supervisor, contratista,
     doc = SimpleDocTemplate(
         filename, 
         pagesize=letter,
-        leftMargin=0.75*inch,
-        rightMargin=0.75*inch,
-        topMargin=0.5*inch,
-        bottomMargin=0.5*inch,
         title=f"Carta Incumplimiento {ruta}",
         author="CD Soyapango",
-        subject=f"Incumplimiento Feedback {mes_nombre} {año}"
-    )
-    
-    # Obtener estilos
-    styles = getSampleStyleSheet()
-    
-    # Estilos personalizados
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        alignment=1,  # Center
-        fontSize=14,
-        fontName='Helvetica-Bold',
-        spaceAfter=0.2*inch,
-        spaceBefore=0
+        subject=f"Incumplimiento Feedback {mes_nombre} {año}",
+        **MARGENES_CARTA
     )
     
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        leading=14,
-        spaceBefore=6,
-        spaceAfter=6,
-        alignment=4  # Justified
-    )
+    # Construir PDF
+    doc.build(contenido_carta_pdf(ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str))
+
+def contenido_carta_pdf(ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str):
+    """
+    Flowables de la carta de incumplimiento de una ruta (usados por la carta individual y
+    por el PDF consolidado del mes)
+    """
+    # Estilos, logo y tablas de firma compartidos por todas las cartas del proceso
+    plantilla = get_plantilla()
+    title_style = plantilla.carta_titulo
+    normal_style = plantilla.carta_normal
     
     # Construir el contenido
     story = []
     
-    # Logo de la empresa
-    try:
-        logo_path = "LogoConst.png"
-        logo_img = Image(logo_path, width=2*inch, height=0.8*inch)
-        logo_table = Table([[logo_img]], colWidths=[6*inch])
-        logo_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('VALIGN', (0, 0), (0, 0), 'TOP'),
-        ]))
-        story.append(logo_table)
-    except Exception as e:
-        # Fallback a texto si no hay logo
-        company_name = "LA CONSTANCIA"
-        subtitle = "ABInBev"
-        header_data = [[company_name], [subtitle]]
-        header_table = Table(header_data, colWidths=[6*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (0, 0), 16),
-            ('FONTNAME', (0, 1), (0, 1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (0, 1), 12),
-        ]))
-        story.append(header_table)
+    # Logo de la empresa (texto si no hay logo)
+    story.append(plantilla.encabezado_logo())
     
     story.append(Spacer(1, 0.2*inch))
     
     # Usar fecha de detección (primer día del mes siguiente) en lugar de fecha actual
-    date_style = ParagraphStyle(
-        'Date',
-        parent=styles['Normal'],
-        alignment=2,  # Right-aligned
-        fontSize=10
-    )
-    story.append(Paragraph(fecha_deteccion_str, date_style))
+    story.append(Paragraph(fecha_deteccion_str, plantilla.fecha))
     story.append(Spacer(1, 0.3*inch))
     
     # Título
@@ -454,24 +422,62 @@ responsabilidades, nos despedimos cordialmente.
     story.append(Spacer(1, 0.4*inch))
     
     # Firmas simplificadas: Solo Reparto y Supervisor
-    firma_data = [
-        ["_____________________", "_____________________"],
-        [f"{reparto}", f"{supervisor}"],
-        ["Reparto Responsable", "Supervisor Inmediato"]
-    ]
-    
-    sig_table = Table(firma_data, colWidths=[3*inch, 3*inch])
-    sig_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    sig_table = plantilla.firmas_carta(reparto, supervisor)
     
     story.append(sig_table)
     
-    # Construir PDF
-    doc.build(story)
+    return story
+
+def generar_pdf_consolidado_cartas(df_consecuencias, mes_nombre, año, fecha_deteccion_str, cartas_dir, force=False):
+    """
+    Genera un único PDF con todas las cartas del mes, con índice por supervisor y ruta,
+    para impresión y archivo. Se escribe en una sola pasada, carta por carta.
+    """
+    filename = os.path.join(cartas_dir, f"Cartas_{mes_nombre}_{año}_Consolidado.pdf")
+    columnas = ['RUTA', 'REPARTO', 'SUPERVISOR', 'CONTRATISTA']
+    documentos = [
+        (
+            supervisor,
+            f"{ruta} - {reparto}",
+            {
+                'ruta': ruta,
+                'reparto': reparto,
+                'supervisor': supervisor,
+                'contratista': contratista,
+                'mes_nombre': mes_nombre,
+                'año': año,
+                'fecha_deteccion_str': fecha_deteccion_str
+            }
+        )
+        for ruta, reparto, supervisor, contratista in df_consecuencias[columnas].itertuples(index=False, name=None)
+    ]
+    
+    # Omitir si ninguna carta cambió desde la última generación del consolidado
+    manifiesto = ManifiestoDocumentos(cartas_dir)
+    huella = huella_documento({
+        'render': 'consolidado',
+        'fuente': huella_fuente(inspect.getsourcefile(contenido_carta_pdf)),
+        'documentos': documentos
+    })
+    if not force and manifiesto.vigente(filename, huella):
+        print(f"⏭️ PDF consolidado sin cambios: {filename}")
+        return filename
+    
+    try:
+        build_consolidated_pdf(
+            filename, documentos, contenido_carta_pdf,
+            title=f"Cartas Incumplimiento {mes_nombre} {año}",
+            author="CD Soyapango",
+            subject=f"Incumplimiento Feedback {mes_nombre} {año}",
+            **MARGENES_CARTA
+        )
+        manifiesto.registrar(filename, huella)
+        manifiesto.guardar()
+        print(f"✅ PDF consolidado generado: {filename} ({len(documentos)} cartas)")
+        return filename
+    except Exception as e:
+        print(f"❌ Error generando PDF consolidado: {e}")
+        return None
 
 def generar_pdf_flujo_completo(df_guia, mes_nombre, año, df_resumen):
     """
@@ -628,7 +634,7 @@ Monitoreo mensual para verificar efectividad y ajustar el sistema según resulta
     
     print(f"✅ Manual PDF generado: {filename}")
 
-def main():
+def main(workers=None, force=False):
     """
     Función principal - CAMBIAR AQUÍ EL MES Y AÑO
     """    # 🔧 CONFIGURACIÓN - Cambiar estos valores según necesites:
@@ -642,7 +648,7 @@ def main():
     print("📅 FECHA EN CARTAS: Primer día del mes siguiente al incumplimiento")
     print("=" * 80)
     
-    archivo, total_rutas = generar_flujo_consecuencias_con_cartas(MES, AÑO)
+    archivo, total_rutas = generar_flujo_consecuencias_con_cartas(MES, AÑO, workers=workers, force=force)
     
     if archivo:
         print("\n" + "=" * 80)
@@ -667,4 +673,13 @@ def main():
         print(f"\n✅ SISTEMA LISTO PARA IMPLEMENTACIÓN")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Flujo de consecuencias con cartas PDF')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos para generar las cartas (por defecto uno por núcleo)')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerar todas las cartas aunque sus datos no hayan cambiado')
+    args = parser.parse_args()
+    
+    main(workers=args.workers, force=args.force)
@@ -6,20 +6,25 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
+import inspect
 import os
 import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from feedbacks_core import MESES_ESPANOL, get_feedbacks
+from rutas_catalog import get_rutas_catalog
+from cartas_lote import ManifiestoDocumentos, carta_path, huella_documento, render_batch
+from plantilla_cartas import build_consolidated_pdf, get_plantilla, huella_fuente
+from indice_headcount import build_headcount_index, load_headcount, resolve_routes
+from motor_consecuencias import periodo_label, update_consequence_state
 
 def load_headcount_data():
     """
     Carga la base de datos de HEADCOUNT para obtener nombres completos y supervisores
     """
     try:
-        # Cargar el archivo HEADCOUNT de Octubre - HOJA BASE con datos individuales
-        headcount_file = "BASE HEADCOUNT OCTUBRE - 2025.xlsm"
-        headcount_df = pd.read_excel(headcount_file, sheet_name='BASE', header=0, engine='openpyxl')
-        
-        # Limpiar nombres de columnas (quitar espacios extra)
-        headcount_df.columns = headcount_df.columns.str.strip()
+        # Cargar el archivo HEADCOUNT de Octubre - HOJA BASE con datos individuales (cache columnar)
+        headcount_df = load_headcount()
         
         print(f"✅ BASE HEADCOUNT OCTUBRE cargada: {len(headcount_df)} registros")
         
@@ -61,9 +66,37 @@ def get_signatures_for_date():
         {"name": "Óscar Cuellar", "title": "Coordinador de Distribución"}
     ]
 
-def generar_flujo_consecuencias_con_cartas(mes=5, año=2026):
+@dataclass
+class DatosFlujo:
+    """
+    Entradas compartidas por los meses de una corrida: índice del HEADCOUNT por ruta, estado
+    del motor de consecuencias y base de rutas de cada mes (mes -> (rutas_df, archivo)),
+    resuelta con RutasCatalog.get_for_month igual que en el motor.
+    """
+    headcount: pd.DataFrame
+    estado: object
+    rutas: dict = field(default_factory=dict)
+
+def cargar_datos_flujo(meses, año):
+    """
+    Carga una sola vez las entradas del flujo para los meses indicados. El motor agrupa los
+    feedbacks por período en una sola pasada y su estado hasta el último mes incluye la racha
+    de cada mes anterior, así que todos los meses se evalúan sobre el mismo estado.
+    """
+    feedbacks_df = get_feedbacks()
+    headcount_df = load_headcount_data()
+    headcount_idx = build_headcount_index(headcount_df) if headcount_df is not None else None
+    estado = update_consequence_state(feedbacks_df, hasta=(año, max(meses)))
+    
+    catalog = get_rutas_catalog()
+    rutas = {mes: catalog.get_for_month(mes) for mes in meses}
+    
+    return DatosFlujo(headcount=headcount_idx, estado=estado, rutas=rutas)
+
+def generar_flujo_consecuencias_con_cartas(mes=5, año=2026, workers=None, force=False, datos=None):
     """
-    Genera el flujo de consecuencias mensual con cartas PDF personalizadas
+    Genera el flujo de consecuencias mensual con cartas PDF personalizadas.
+    datos son las entradas ya cargadas por generar_flujo_meses; sin ellas se cargan aquí.
     """
     # Nombres de meses en español
     meses_español = [
@@ -76,52 +109,37 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2026):
     print("=" * 80)
     
     try:
-        # Cargar datos principales
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
-        headcount_df = load_headcount_data()
-        
-        # Cargar base de rutas
-        archivos_rutas = [
-            f'BD_Rutas_{mes_nombre}.xlsx',
-            'BD_Rutas_Junio.xlsx',
-            'BD_Rutas_Mayo.xlsx', 
-            'BD_Rutas.xlsx'
-        ]
-        
-        rutas_df = None
-        archivo_usado = None
-        
-        for archivo in archivos_rutas:
-            try:
-                rutas_df = pd.read_excel(archivo)
-                archivo_usado = archivo
-                print(f"✅ Usando base de rutas: {archivo}")
-                break
-            except FileNotFoundError:
-                continue
+        # Cargar datos principales (una sola vez por corrida cuando vienen del driver)
+        if datos is None:
+            datos = cargar_datos_flujo([mes], año)
+        headcount_idx = datos.headcount
         
+        # Base de rutas del mes
+        rutas_df, archivo_usado = datos.rutas.get(mes, (None, None))
         if rutas_df is None:
             print("❌ No se encontró ninguna base de datos de rutas")
-            return None
-        
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+            return None, 0
         
-        # Filtrar feedbacks del mes específico
-        feedbacks_mes = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == mes) &
-            (feedbacks_df['fecha_registro'].dt.year == año)
-        ]
+        # Las fechas y columnas de calendario ya vienen de feedbacks_core
         
-        print(f"📊 Feedbacks encontrados en {mes_nombre} {año}: {len(feedbacks_mes)}")
+        # Estado del mes desde el motor de consecuencias (racha y nivel por ruta)
+        estado = datos.estado
+        periodo = periodo_label(año, mes)
+        if estado is None or periodo not in estado.periodos:
+            print(f"❌ No hay feedbacks para evaluar {mes_nombre} {año}")
+            return None, 0
         
-        # Obtener todas las rutas activas
-        todas_las_rutas = set(rutas_df['RUTA'].dropna().unique())
+        # Se informa la BD con la que el motor evaluó el mes
+        archivo_usado = estado.rosters.get(periodo, {}).get('archivo') or archivo_usado
+        print(f"✅ Usando base de rutas: {archivo_usado}")
+        estado_mes = estado.resumen_mes(periodo)
+        niveles_ruta = estado_mes.set_index('RUTA')
         
-        # Rutas que SÍ hicieron feedback
-        rutas_con_feedback = set(feedbacks_mes['ruta'].dropna().unique())
+        print(f"📊 Feedbacks encontrados en {mes_nombre} {año}: {estado.conteos.get(periodo, 0)}")
         
-        # Rutas que NO hicieron feedback (necesitan consecuencias)
+        # Rutas activas del mes, las que SÍ hicieron feedback y las que NO (necesitan consecuencias)
+        todas_las_rutas = set(estado_mes['RUTA'])
+        rutas_con_feedback = set(estado_mes.loc[estado_mes['Cumplio'], 'RUTA'])
         rutas_sin_feedback = todas_las_rutas - rutas_con_feedback
         
         print(f"📈 Total rutas activas: {len(todas_las_rutas)}")
@@ -147,90 +165,42 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2026):
         
         fecha_deteccion_str = fecha_en_español(fecha_deteccion)
         
-        # Crear lista de rutas para consecuencias con datos completos
-        rutas_consecuencias = []
-        rutas_sin_datos_headcount = []
+        # Resolver todas las rutas sin feedback contra el índice del HEADCOUNT en un solo join
+        if headcount_idx is None:
+            print("❌ HEADCOUNT no disponible - No se generarán cartas")
+            headcount_idx = build_headcount_index(None)
+        resueltas = resolve_routes(sorted(rutas_sin_feedback), headcount_idx)
         
-        for ruta in sorted(rutas_sin_feedback):
-            # Buscar información en la base de rutas
-            info_ruta = rutas_df[rutas_df['RUTA'] == ruta]
-            
-            reparto_nombre = None
-            supervisor_nombre = None
-            contratista_nombre = None
-            datos_encontrados = False
-            
-            # Buscar en HEADCOUNT para obtener datos completos
-            if headcount_df is not None and 'RUTA' in headcount_df.columns:
-                try:
-                    # Buscar por ruta exacta
-                    headcount_match = headcount_df[headcount_df['RUTA'] == ruta]
-                    
-                    if not headcount_match.empty:
-                        # Tomar el primer empleado de la ruta (CONDUCTOR, que es el principal)
-                        # Filtrar por CONDUCTOR si es posible
-                        conductores = headcount_match[headcount_match['PUESTO'].str.contains('CONDUCTOR', case=False, na=False)]
-                        if not conductores.empty:
-                            empleado_principal = conductores.iloc[0]
-                        else:
-                            empleado_principal = headcount_match.iloc[0]
-                        
-                        # Obtener nombre completo del empleado
-                        if 'NOMBRE COMPLETO EMPLEADO' in headcount_match.columns and pd.notna(empleado_principal['NOMBRE COMPLETO EMPLEADO']):
-                            reparto_nombre = str(empleado_principal['NOMBRE COMPLETO EMPLEADO']).strip()
-                        
-                        # Obtener supervisor del nombre
-                        if 'NOMBRE - SUPERVISOR' in headcount_match.columns and pd.notna(empleado_principal['NOMBRE - SUPERVISOR']):
-                            supervisor_nombre = str(empleado_principal['NOMBRE - SUPERVISOR']).strip()
-                        
-                        # Obtener contratista
-                        if 'CONTRATISTA' in headcount_match.columns and pd.notna(empleado_principal['CONTRATISTA']):
-                            contratista_nombre = str(empleado_principal['CONTRATISTA']).strip()
-                        
-                        # Verificar que al menos tengamos el nombre del reparto
-                        if reparto_nombre:
-                            datos_encontrados = True
-                            print(f"✅ Datos encontrados para {ruta}: {reparto_nombre} - Supervisor: {supervisor_nombre} - Contratista: {contratista_nombre}")
-                        else:
-                            print(f"⚠️ Datos incompletos en HEADCOUNT para ruta {ruta} - No se generará carta")
-                            rutas_sin_datos_headcount.append(ruta)
-                    else:
-                        print(f"⚠️ Ruta {ruta} no encontrada en HEADCOUNT - No se generará carta")
-                        rutas_sin_datos_headcount.append(ruta)
-                        
-                except Exception as e:
-                    print(f"❌ Error buscando en HEADCOUNT para {ruta}: {e}")
-                    rutas_sin_datos_headcount.append(ruta)
-            else:
-                print(f"❌ HEADCOUNT no disponible para ruta {ruta} - No se generará carta")
-                rutas_sin_datos_headcount.append(ruta)
-            
-            # Solo agregar a la lista si se encontraron datos válidos
-            if datos_encontrados and reparto_nombre:
-                rutas_consecuencias.append({
-                    'RUTA': ruta,
-                    'REPARTO': reparto_nombre,
-                    'SUPERVISOR': supervisor_nombre if supervisor_nombre else 'No especificado',
-                    'CONTRATISTA': contratista_nombre if contratista_nombre else 'No especificado',
-                    'MES_INCUMPLIMIENTO': f'{mes_nombre} {año}',
-                    'NIVEL_CONSECUENCIA': '',  # Para llenar manualmente
-                    'ACCION_REQUERIDA': '',    # Para llenar manualmente
-                    'RESPONSABLE': '',         # Para llenar manualmente
-                    'FECHA_LIMITE': '',        # Para llenar manualmente
-                    'FECHA_EJECUTADA': '',     # Para llenar al ejecutar
-                    'ESTADO': 'PENDIENTE',
-                    'OBSERVACIONES': '',
-                    'DOCUMENTO_EVIDENCIA': ''
-                })
+        # Solo se genera carta si al menos tenemos el nombre del reparto
+        con_datos = resueltas['REPARTO'].notna()
+        rutas_sin_datos_headcount = resueltas.loc[~con_datos, 'RUTA'].tolist()
+        encontradas = resueltas[con_datos]
+        niveles = niveles_ruta.reindex(encontradas['RUTA'])
+        print(f"✅ Rutas con datos en HEADCOUNT: {len(encontradas)}")
+        
+        # Crear DataFrame
+        df_consecuencias = pd.DataFrame({
+            'RUTA': encontradas['RUTA'].to_numpy(),
+            'REPARTO': encontradas['REPARTO'].to_numpy(),
+            'SUPERVISOR': encontradas['SUPERVISOR'].fillna('No especificado').to_numpy(),
+            'CONTRATISTA': encontradas['CONTRATISTA'].fillna('No especificado').to_numpy(),
+            'MES_INCUMPLIMIENTO': f'{mes_nombre} {año}',
+            'MESES_CONSECUTIVOS': niveles['Racha'].astype(int).to_numpy(),
+            'NIVEL_CONSECUENCIA': niveles['Nivel_Consecuencia'].to_numpy(),
+            'ACCION_REQUERIDA': niveles['Accion_Requerida'].to_numpy(),
+            'RESPONSABLE': '',         # Para llenar manualmente
+            'FECHA_LIMITE': '',        # Para llenar manualmente
+            'FECHA_EJECUTADA': '',     # Para llenar al ejecutar
+            'ESTADO': 'PENDIENTE',
+            'OBSERVACIONES': '',
+            'DOCUMENTO_EVIDENCIA': ''
+        })
         
         # Mostrar resumen de rutas sin datos
         if rutas_sin_datos_headcount:
             print(f"\n⚠️ RUTAS SIN DATOS EN HEADCOUNT (no se generarán cartas): {len(rutas_sin_datos_headcount)}")
             print(f"   Rutas: {', '.join(sorted(rutas_sin_datos_headcount))}")
         
-        # Crear DataFrame
-        df_consecuencias = pd.DataFrame(rutas_consecuencias)
-        
         # Crear hoja de guía rápida CORREGIDA
         guia_rapida = [
             {
@@ -271,9 +241,9 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2026):
             'TOTAL_RUTAS': len(todas_las_rutas),
             'CUMPLIERON': len(rutas_con_feedback),
             'NO_CUMPLIERON': len(rutas_sin_feedback),
-            'CON_DATOS_HEADCOUNT': len(rutas_consecuencias),
+            'CON_DATOS_HEADCOUNT': len(df_consecuencias),
             'SIN_DATOS_HEADCOUNT': len(rutas_sin_datos_headcount),
-            'CARTAS_GENERADAS': len(rutas_consecuencias),
+            'CARTAS_GENERADAS': len(df_consecuencias),
             'PORCENTAJE_CUMPLIMIENTO': round((len(rutas_con_feedback) / len(todas_las_rutas)) * 100, 1),
             'ARCHIVO_RUTAS_USADO': archivo_usado,
             'FECHA_GENERACION': datetime.now().strftime('%Y-%m-%d %H:%M')
@@ -318,8 +288,8 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2026):
         print(f"✅ Archivo Excel generado: {excel_filename}")
         
         # Generar cartas PDF para cada ruta
-        if len(rutas_sin_feedback) > 0:
-            generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str)
+        if len(df_consecuencias) > 0:
+            generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str, workers=workers, force=force)
         
         # Generar PDF del flujo completo
         generar_pdf_flujo_completo(df_guia, mes_nombre, año, df_resumen)
@@ -332,29 +302,50 @@ def generar_flujo_consecuencias_con_cartas(mes=5, año=2026):
         traceback.print_exc()
         return None, 0
 
-def generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str):
+def generar_cartas_pdf(df_consecuencias, mes_nombre, año, fecha_deteccion_str, workers=None, force=False):
     """
-    Genera cartas PDF individuales para cada ruta usando el formato del weekly report
+    Genera cartas PDF individuales para cada ruta usando el formato del weekly report.
+    Las cartas se reparten en un pool de procesos (workers, por defecto uno por núcleo);
+    una carta con error no detiene el resto y queda en el resumen. Las cartas cuyos datos
+    no cambiaron desde la corrida anterior se omiten, salvo con force=True.
     """
     print(f"\n📄 GENERANDO CARTAS PDF PARA {len(df_consecuencias)} RUTAS...")
     
     # Crear directorio para las cartas
     cartas_dir = f"Cartas_{mes_nombre}_{año}"
-    if not os.path.exists(cartas_dir):
-        os.makedirs(cartas_dir)
-    
-    for _, row in df_consecuencias.iterrows():
-        ruta = row['RUTA']
-        reparto = row['REPARTO']
-        supervisor = row['SUPERVISOR']
-        contratista = row['CONTRATISTA']
-        
-        # Crear carta PDF
-        filename = f"{cartas_dir}/Carta_Incumplimiento_{ruta}_{mes_nombre}_{año}.pdf"
-        
-        crear_carta_individual_pdf(filename, ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str)
+    os.makedirs(cartas_dir, exist_ok=True)
     
-    print(f"✅ {len(df_consecuencias)} cartas PDF generadas en directorio: {cartas_dir}")
+    columnas = ['RUTA', 'REPARTO', 'SUPERVISOR', 'CONTRATISTA']
+    tareas = [
+        (
+            carta_path(cartas_dir, ruta, mes_nombre, año),
+            {
+                'ruta': ruta,
+                'reparto': reparto,
+                'supervisor': supervisor,
+                'contratista': contratista,
+                'mes_nombre': mes_nombre,
+                'año': año,
+                'fecha_deteccion_str': fecha_deteccion_str
+            }
+        )
+        for ruta, reparto, supervisor, contratista in df_consecuencias[columnas].itertuples(index=False, name=None)
+    ]
+    
+    resumen = render_batch(crear_carta_individual_pdf, tareas, workers=workers, force=force)
+    resumen.imprimir(f"Cartas PDF en directorio {cartas_dir}")
+    
+    # PDF único del mes con índice por supervisor y ruta
+    generar_pdf_consolidado_cartas(df_consecuencias, mes_nombre, año, fecha_deteccion_str, cartas_dir, force=force)
+    return resumen
+
+# Márgenes de las cartas (individuales y consolidado mensual)
+MARGENES_CARTA = {
+    'leftMargin': 0.75*inch,
+    'rightMargin': 0.75*inch,
+    'topMargin': 0.5*inch,
+    'bottomMargin': 0.5*inch
+}
 
 def crear_carta_individual_pdf(filename, ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str):
     """
@@ -364,77 +355,35 @@ def crear_carta_individual_pdf(filename, ruta, reparto, supervisor, contratista,
     doc = SimpleDocTemplate(
         filename, 
         pagesize=letter,
-        leftMargin=0.75*inch,
-        rightMargin=0.75*inch,
-        topMargin=0.5*inch,
-        bottomMargin=0.5*inch,
         title=f"Carta Incumplimiento {ruta}",
         author="CD Soyapango",
-        subject=f"Incumplimiento Feedback {mes_nombre} {año}"
+        subject=f"Incumplimiento Feedback {mes_nombre} {año}",
+        **MARGENES_CARTA
     )
     
-    # Obtener estilos
-    styles = getSampleStyleSheet()
-    
-    # Estilos personalizados
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        alignment=1,  # Center
-        fontSize=14,
-        fontName='Helvetica-Bold',
-        spaceAfter=0.2*inch,
-        spaceBefore=0
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        leading=14,
-        spaceBefore=6,
-        spaceAfter=6,
-        alignment=4  # Justified
-    )
+    # Construir PDF
+    doc.build(contenido_carta_pdf(ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str))
+
+def contenido_carta_pdf(ruta, reparto, supervisor, contratista, mes_nombre, año, fecha_deteccion_str):
+    """
+    Flowables de la carta de incumplimiento de una ruta (usados por la carta individual y
+    por el PDF consolidado del mes)
+    """
+    # Estilos, logo y tablas de firma compartidos por todas las cartas del proceso
+    plantilla = get_plantilla()
+    title_style = plantilla.carta_titulo
+    normal_style = plantilla.carta_normal
     
     # Construir el contenido
     story = []
     
-    # Logo de la empresa
-    try:
-        logo_path = "LogoConst.png"
-        logo_img = Image(logo_path, width=2*inch, height=0.8*inch)
-        logo_table = Table([[logo_img]], colWidths=[6*inch])
-        logo_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('VALIGN', (0, 0), (0, 0), 'TOP'),
-        ]))
-        story.append(logo_table)
-    except Exception as e:
-        # Fallback a texto si no hay logo
-        company_name = "LA CONSTANCIA"
-        subtitle = "ABInBev"
-        header_data = [[company_name], [subtitle]]
-        header_table = Table(header_data, colWidths=[6*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (0, 0), 16),
-            ('FONTNAME', (0, 1), (0, 1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (0, 1), 12),
-        ]))
-        story.append(header_table)
+    # Logo de la empresa (texto si no hay logo)
+    story.append(plantilla.encabezado_logo())
     
     story.append(Spacer(1, 0.2*inch))
     
     # Usar fecha de detección (primer día del mes siguiente) en lugar de fecha actual
-    date_style = ParagraphStyle(
-        'Date',
-        parent=styles['Normal'],
-        alignment=2,  # Right-aligned
-        fontSize=10
-    )
-    story.append(Paragraph(fecha_deteccion_str, date_style))
+    story.append(Paragraph(fecha_deteccion_str, plantilla.fecha))
     story.append(Spacer(1, 0.3*inch))
     
     # Título
@@ -479,24 +428,62 @@ responsabilidades, nos despedimos cordialmente.
     story.append(Spacer(1, 0.4*inch))
     
     # Firmas simplificadas: Solo Reparto y Supervisor
-    firma_data = [
-        ["_____________________", "_____________________"],
-        [f"{reparto}", f"{supervisor}"],
-        ["Reparto Responsable", "Supervisor Inmediato"]
-    ]
-    
-    sig_table = Table(firma_data, colWidths=[3*inch, 3*inch])
-    sig_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    sig_table = plantilla.firmas_carta(reparto, supervisor)
     
     story.append(sig_table)
     
-    # Construir PDF
-    doc.build(story)
+    return story
+
+def generar_pdf_consolidado_cartas(df_consecuencias, mes_nombre, año, fecha_deteccion_str, cartas_dir, force=False):
+    """
+    Genera un único PDF con todas las cartas del mes, con índice por supervisor y ruta,
+    para impresión y archivo. Se escribe en una sola pasada, carta por carta.
+    """
+    filename = os.path.join(cartas_dir, f"Cartas_{mes_nombre}_{año}_Consolidado.pdf")
+    columnas = ['RUTA', 'REPARTO', 'SUPERVISOR', 'CONTRATISTA']
+    documentos = [
+        (
+            supervisor,
+            f"{ruta} - {reparto}",
+            {
+                'ruta': ruta,
+                'reparto': reparto,
+                'supervisor': supervisor,
+                'contratista': contratista,
+                'mes_nombre': mes_nombre,
+                'año': año,
+                'fecha_deteccion_str': fecha_deteccion_str
+            }
+        )
+        for ruta, reparto, supervisor, contratista in df_consecuencias[columnas].itertuples(index=False, name=None)
+    ]
+    
+    # Omitir si ninguna carta cambió desde la última generación del consolidado
+    manifiesto = ManifiestoDocumentos(cartas_dir)
+    huella = huella_documento({
+        'render': 'consolidado',
+        'fuente': huella_fuente(inspect.getsourcefile(contenido_carta_pdf)),
+        'documentos': documentos
+    })
+    if not force and manifiesto.vigente(filename, huella):
+        print(f"⏭️ PDF consolidado sin cambios: {filename}")
+        return filename
+    
+    try:
+        build_consolidated_pdf(
+            filename, documentos, contenido_carta_pdf,
+            title=f"Cartas Incumplimiento {mes_nombre} {año}",
+            author="CD Soyapango",
+            subject=f"Incumplimiento Feedback {mes_nombre} {año}",
+            **MARGENES_CARTA
+        )
+        manifiesto.registrar(filename, huella)
+        manifiesto.guardar()
+        print(f"✅ PDF consolidado generado: {filename} ({len(documentos)} cartas)")
+        return filename
+    except Exception as e:
+        print(f"❌ Error generando PDF consolidado: {e}")
+        return None
 
 def generar_pdf_flujo_completo(df_guia, mes_nombre, año, df_resumen):
     """
@@ -653,7 +640,41 @@ Monitoreo mensual para verificar efectividad y ajustar el sistema según resulta
     
     print(f"✅ Manual PDF generado: {filename}")
 
-def main():
+def _procesar_mes(mes, año, force, datos):
+    """Un mes de generar_flujo_meses en un proceso del pool (sus cartas en ese mismo proceso)"""
+    return mes, generar_flujo_consecuencias_con_cartas(mes, año, workers=1, force=force, datos=datos)
+
+def generar_flujo_meses(meses, año, workers=None, force=False, meses_paralelos=1):
+    """
+    Genera el flujo con cartas de varios meses cargando feedbacks, HEADCOUNT, bases de rutas
+    y estado del motor una sola vez. Con meses_paralelos > 1 los meses se reparten en un pool
+    de procesos y cada uno genera sus cartas sin pool propio. Devuelve {mes: (excel, rutas)}.
+    """
+    meses = sorted(set(meses))
+    datos = cargar_datos_flujo(meses, año)
+    resultados = {}
+    
+    if meses_paralelos > 1 and len(meses) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(meses_paralelos, len(meses))) as executor:
+                futuros = [executor.submit(_procesar_mes, mes, año, force, datos) for mes in meses]
+                for futuro in as_completed(futuros):
+                    mes, resultado = futuro.result()
+                    resultados[mes] = resultado
+        except Exception as e:
+            print(f"⚠️ Procesamiento paralelo de meses no disponible, se continúa en forma secuencial: {e}")
+    
+    for mes in meses:
+        if mes in resultados:
+            continue
+        print(f"\n{'='*80}")
+        print(f"📅 PROCESANDO: {MESES_ESPANOL[mes]} {año}")
+        print(f"{'='*80}")
+        resultados[mes] = generar_flujo_consecuencias_con_cartas(mes, año, workers=workers, force=force, datos=datos)
+    
+    return resultados
+
+def main(workers=None, force=False, meses_paralelos=1):
     """
     Función principal - Genera cartas para múltiples meses
     """
@@ -674,28 +695,21 @@ def main():
     total_rutas_accion = 0
     resultados = []
     
-    # Generar para cada mes
-    for mes in MESES:
-        meses_nombres = ['', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                        'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-        
-        print(f"\n{'='*80}")
-        print(f"📅 PROCESANDO: {meses_nombres[mes]} {AÑO}")
-        print(f"{'='*80}")
-        
-        archivo, total_rutas = generar_flujo_consecuencias_con_cartas(mes, AÑO)
-        
+    # Generar todos los meses sobre las mismas entradas cargadas
+    resultados_meses = generar_flujo_meses(MESES, AÑO, workers=workers, force=force, meses_paralelos=meses_paralelos)
+    
+    for mes, (archivo, total_rutas) in sorted(resultados_meses.items()):
         if archivo:
             total_archivos += 1
             total_rutas_accion += total_rutas
             resultados.append({
-                'mes': meses_nombres[mes],
+                'mes': MESES_ESPANOL[mes],
                 'archivo': archivo,
                 'rutas': total_rutas
             })
-            print(f"✅ {meses_nombres[mes]}: {total_rutas} rutas procesadas")
+            print(f"✅ {MESES_ESPANOL[mes]}: {total_rutas} rutas procesadas")
         else:
-            print(f"❌ {meses_nombres[mes]}: Error al procesar")
+            print(f"❌ {MESES_ESPANOL[mes]}: Error al procesar")
     
     # Resumen final
     print("\n" + "=" * 80)
@@ -727,4 +741,15 @@ def main():
     print(f"\n✅ SISTEMA LISTO PARA IMPLEMENTACIÓN")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Flujo de consecuencias con cartas PDF')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos para generar las cartas (por defecto uno por núcleo)')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerar todas las cartas aunque sus datos no hayan cambiado')
+    parser.add_argument('--meses-paralelos', type=int, default=1,
+                        help='Meses a procesar en paralelo (por defecto uno a la vez)')
+    args = parser.parse_args()
+    
+    main(workers=args.workers, force=args.force, meses_paralelos=args.meses_paralelos)
@@ -1,6 +1,8 @@
 import pandas as pd
 from datetime import datetime
 import calendar
+from feedbacks_core import get_feedbacks
+from rutas_catalog import get_rutas_catalog
 
 def generar_flujo_consecuencias_mes(mes=5, año=2025):
     """
@@ -17,39 +19,23 @@ def generar_flujo_consecuencias_mes(mes=5, año=2025):
     
     try:
         # Cargar datos
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        feedbacks_df = get_feedbacks()
         
         # Intentar cargar la base de rutas más apropiada
-        archivos_rutas = [
-            f'BD_Rutas_{mes_nombre}.xlsx',
-            'BD_Rutas_Junio.xlsx',
-            'BD_Rutas_Mayo.xlsx', 
-            'BD_Rutas.xlsx'
-        ]
-        
-        rutas_df = None
-        archivo_usado = None
-        
-        for archivo in archivos_rutas:
-            try:
-                rutas_df = pd.read_excel(archivo)
-                archivo_usado = archivo
-                print(f"✅ Usando base de rutas: {archivo}")
-                break
-            except FileNotFoundError:
-                continue
+        rutas_df, archivo_usado = get_rutas_catalog().get_for_month(mes)
+        if rutas_df is not None:
+            print(f"✅ Usando base de rutas: {archivo_usado}")
         
         if rutas_df is None:
             print("❌ No se encontró ninguna base de datos de rutas")
             return None
         
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+        # Las fechas y columnas de calendario ya vienen de feedbacks_core
         
         # Filtrar feedbacks del mes específico
         feedbacks_mes = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == mes) &
-            (feedbacks_df['fecha_registro'].dt.year == año)
+            (feedbacks_df['mes'] == mes) &
+            (feedbacks_df['año'] == año)
         ]
         
         print(f"📊 Feedbacks encontrados en {mes_nombre} {año}: {len(feedbacks_mes)}")
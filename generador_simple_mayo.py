@@ -1,6 +1,7 @@
 import pandas as pd
 from datetime import datetime
 import calendar
+from feedbacks_core import get_feedbacks
 
 def load_headcount_data_fixed():
     """
@@ -50,17 +51,16 @@ def generar_flujo_simple_mayo():
     
     try:
         # Cargar datos básicos
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        feedbacks_df = get_feedbacks()
         rutas_df = pd.read_excel('BD_Rutas_Junio.xlsx')
         headcount_df = load_headcount_data_fixed()
         
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+        # Las fechas y columnas de calendario ya vienen de feedbacks_core
         
         # Filtrar Mayo 2025
         mayo_feedbacks = feedbacks_df[
-            (feedbacks_df['fecha_registro'].dt.month == 5) &
-            (feedbacks_df['fecha_registro'].dt.year == 2025)
+            (feedbacks_df['mes'] == 5) &
+            (feedbacks_df['año'] == 2025)
         ]
         
         print(f"📊 Feedbacks de Mayo 2025: {len(mayo_feedbacks)}")
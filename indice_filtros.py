@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# Dimensiones filtrables del sidebar: nombre del filtro -> columna de merged_df
+DIMENSIONES = {
+    'rutas': 'ruta',
+    'usuarios': 'usuario',
+    'meses': 'mes_nombre',
+    'semanas': 'semana',
+    'trimestres': 'trimestre_nombre',
+    'supervisores': 'SUPERVISOR',
+    'contratistas': 'CONTRATISTA'
+}
+
+
+class _Postings:
+    """Dimensión codificada como enteros con la lista ordenada de filas de cada valor"""
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values, sort=False)
+        self.lookup = {valor: code for code, valor in enumerate(uniques)}
+        # Filas agrupadas por código: las filas del código k están en order[offsets[k]:offsets[k + 1]]
+        self.order = np.argsort(codes, kind='stable').astype(np.int64)
+        conteos = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        inicio = int((codes < 0).sum())  # los nulos (código -1) quedan al principio
+        self.offsets = np.concatenate([[0], np.cumsum(conteos)]) + inicio
+
+    def rows(self, valores):
+        """Filas que tienen alguno de los valores indicados (sin duplicados, en orden por valor)"""
+        partes = []
+        for valor in valores:
+            code = self.lookup.get(valor)
+            if code is not None:
+                partes.append(self.order[self.offsets[code]:self.offsets[code + 1]])
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(partes)
+
+
+class FilterIndex:
+    """
+    Índice de filtros del dashboard construido una vez por dataset.
+
+    Cada dimensión se codifica como enteros y guarda las filas de cada valor, y la fecha de
+    registro se guarda como día ordinal ordenado. Un filtro compone las selecciones activas
+    en una única máscara booleana por posición, que sirve tanto para feedbacks como para
+    merged_df porque ambos tienen las mismas filas en el mismo orden.
+    """
+
+    def __init__(self, merged_df):
+        self.n_rows = len(merged_df)
+
+        dias = merged_df['fecha_registro'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        dias = dias.astype(np.int64)
+        self.dia_orden = np.argsort(dias, kind='stable')
+        self.dias_ordenados = dias[self.dia_orden]
+
+        self.dimensiones = {
+            nombre: _Postings(merged_df[col])
+            for nombre, col in DIMENSIONES.items()
+            if col in merged_df.columns
+        }
+
+    @staticmethod
+    def _dia(fecha):
+        return np.datetime64(fecha, 'D').astype(np.int64)
+
+    def mask(self, fecha_inicio, fecha_fin, **selecciones):
+        """
+        Máscara de filas para el rango de fechas (inclusive) y las selecciones múltiples
+        (rutas, usuarios, meses, semanas, trimestres, supervisores, contratistas).
+        Una selección vacía o None no filtra esa dimensión.
+        """
+        inicio = np.searchsorted(self.dias_ordenados, self._dia(fecha_inicio), side='left')
+        fin = np.searchsorted(self.dias_ordenados, self._dia(fecha_fin), side='right')
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.dia_orden[inicio:fin]] = True
+
+        for nombre, valores in selecciones.items():
+            if not valores:
+                continue
+            if nombre not in self.dimensiones:
+                raise KeyError(f"Dimensión de filtro desconocida: {nombre}")
+            seleccion = np.zeros(self.n_rows, dtype=bool)
+            seleccion[self.dimensiones[nombre].rows(valores)] = True
+            mask &= seleccion
+
+        return mask
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from excel_cache import read_excel_cached
+
+HEADCOUNT_FILE = 'BASE HEADCOUNT OCTUBRE - 2025.xlsm'
+HEADCOUNT_SHEET = 'BASE'
+
+# Puestos que se prefieren como empleado principal de la ruta, en orden de prioridad
+PRIORIDAD_PUESTO = ['CONDUCTOR']
+
+# Columnas del HEADCOUNT -> columnas del índice
+COLUMNAS_INDICE = {
+    'NOMBRE COMPLETO EMPLEADO': 'REPARTO',
+    'NOMBRE - SUPERVISOR': 'SUPERVISOR',
+    'CONTRATISTA': 'CONTRATISTA',
+    'PUESTO': 'PUESTO'
+}
+
+
+def load_headcount(path=HEADCOUNT_FILE, sheet_name=HEADCOUNT_SHEET):
+    """Hoja BASE del HEADCOUNT (leída desde la cache columnar) con nombres de columna limpios"""
+    headcount_df = read_excel_cached(path, sheet_name=sheet_name, header=0, engine='openpyxl')
+    headcount_df.columns = headcount_df.columns.astype(str).str.strip()
+    return headcount_df
+
+
+def _limpiar(serie):
+    """Texto sin espacios a los lados; nulos y vacíos quedan como NaN"""
+    texto = serie.astype(str).str.strip()
+    return texto.where(serie.notna() & (texto != ''))
+
+
+def build_headcount_index(headcount_df):
+    """
+    Índice del HEADCOUNT por RUTA con el empleado principal de cada ruta: el primero cuyo
+    PUESTO contiene un puesto de PRIORIDAD_PUESTO (en ese orden) o, si no hay, el primero de
+    la ruta. Columnas: REPARTO, SUPERVISOR, CONTRATISTA y PUESTO (NaN si no hay dato).
+    """
+    columnas = list(COLUMNAS_INDICE.values())
+    if headcount_df is None or 'RUTA' not in headcount_df.columns:
+        return pd.DataFrame(columns=columnas, index=pd.Index([], name='RUTA'))
+
+    base = pd.DataFrame({'RUTA': _limpiar(headcount_df['RUTA'])})
+    for origen, destino in COLUMNAS_INDICE.items():
+        base[destino] = _limpiar(headcount_df[origen]) if origen in headcount_df.columns else np.nan
+
+    # Prioridad por puesto: el primer puesto de la lista gana, el resto queda al final
+    puesto = base['PUESTO'].fillna('').str.upper()
+    prioridad = np.full(len(base), len(PRIORIDAD_PUESTO))
+    for i, nombre in reversed(list(enumerate(PRIORIDAD_PUESTO))):
+        prioridad = np.where(puesto.str.contains(nombre.upper(), regex=False).to_numpy(), i, prioridad)
+
+    # Orden estable: dentro de la misma prioridad se conserva el orden del HEADCOUNT
+    principal = (
+        base.assign(_prioridad=prioridad)
+        .dropna(subset=['RUTA'])
+        .sort_values('_prioridad', kind='mergesort')
+        .drop_duplicates(subset=['RUTA'], keep='first')
+    )
+    return principal.drop(columns='_prioridad').set_index('RUTA').sort_index()
+
+
+def resolve_routes(rutas, indice):
+    """
+    Datos del empleado principal de cada ruta en un solo join contra el índice.
+    Devuelve un DataFrame con RUTA y las columnas del índice, en el orden de rutas;
+    las rutas que no están en el HEADCOUNT quedan con NaN.
+    """
+    rutas = pd.Index([str(ruta).strip() for ruta in rutas], name='RUTA')
+    return indice.reindex(rutas).reset_index()
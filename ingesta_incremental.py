@@ -0,0 +1,230 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+
+from excel_cache import read_excel_cached, read_frame, write_frame
+from dimension_clientes import build_client_dimension, update_client_dimension
+from feedbacks_core import COLUMNAS_CLIENTE, FEEDBACKS_FILE, add_calendar_columns, add_client_columns
+
+STORE_DIR_NAME = '.feedbacks_store'
+ESTADO_FILE = 'estado.json'
+HASH_COL = '_row_hash'
+
+# Agregados que se mantienen por deltas: nombre -> columnas de agrupación
+AGREGADOS = {
+    'rutas_mes': ['año', 'mes', 'ruta'],
+    'offenders_semana': ['year', 'week', 'respuesta_sub', 'cliente_id']
+}
+
+
+@dataclass
+class IngestaResultado:
+    """Estado del dataset persistido después de una ingesta"""
+    feedbacks: pd.DataFrame
+    agregados: dict
+    filas_nuevas: int
+    # Filas persistidas reemplazadas por su versión actual (o que ya no están en el Excel)
+    filas_modificadas: int
+    reconstruido: bool
+    clientes: pd.DataFrame = None
+
+
+def get_store_dir(feedbacks_path=FEEDBACKS_FILE):
+    return os.path.join(os.path.dirname(os.path.abspath(feedbacks_path)), STORE_DIR_NAME)
+
+
+def _row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _row_keys(hashes):
+    """
+    Clave de cada fila: su hash y el número de aparición de ese hash. El Excel no tiene una
+    clave natural por fila (id_tema es el mismo en todas), así que una fila es su contenido;
+    el número de aparición distingue filas idénticas repetidas.
+    """
+    hashes = pd.Series(hashes)
+    return pd.MultiIndex.from_arrays([hashes.to_numpy(), hashes.groupby(hashes).cumcount().to_numpy()])
+
+
+def _load_estado(store_dir):
+    try:
+        with open(os.path.join(store_dir, ESTADO_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_estado(store_dir, estado):
+    estado_path = os.path.join(store_dir, ESTADO_FILE)
+    tmp_path = f"{estado_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, estado_path)
+
+
+def _agregar(df, nombre):
+    """Conteo de filas por las columnas del agregado (delta o total)"""
+    keys = AGREGADOS[nombre]
+    return df.groupby(keys, dropna=False).size().rename('count')
+
+
+def _aplicar_delta(agregado, sumar, restar=None):
+    """Suma/resta conteos sobre un agregado existente sin recalcular el historial"""
+    partes = [agregado, sumar]
+    if restar is not None and len(restar):
+        partes.append(-restar)
+    combinado = pd.concat([p for p in partes if p is not None and len(p)])
+    if combinado.empty:
+        return agregado
+    combinado = combinado.groupby(level=list(range(combinado.index.nlevels)), dropna=False).sum()
+    return combinado[combinado > 0]
+
+
+def _persistir(store_dir, feedbacks, agregados, clientes, estado_anterior, ultima_fecha):
+    """Escribe nuevas versiones de los archivos y luego apunta el estado a ellas"""
+    os.makedirs(store_dir, exist_ok=True)
+    sufijo = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    archivos = {
+        'feedbacks': os.path.basename(write_frame(feedbacks, os.path.join(store_dir, f'feedbacks_{sufijo}'))),
+        'clientes': os.path.basename(write_frame(clientes.reset_index(), os.path.join(store_dir, f'clientes_{sufijo}')))
+    }
+    for nombre, agregado in agregados.items():
+        ruta = write_frame(agregado.reset_index(), os.path.join(store_dir, f'{nombre}_{sufijo}'))
+        archivos[nombre] = os.path.basename(ruta)
+
+    _save_estado(store_dir, {
+        'ultima_fecha_registro': ultima_fecha,
+        'filas': len(feedbacks),
+        'archivos': archivos,
+        'actualizado': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+    # Eliminar las versiones anteriores una vez que el estado ya apunta a las nuevas
+    if estado_anterior:
+        for archivo in estado_anterior.get('archivos', {}).values():
+            if archivo not in archivos.values():
+                try:
+                    os.remove(os.path.join(store_dir, archivo))
+                except OSError:
+                    pass
+
+
+def _leer_store(store_dir, estado):
+    archivos = estado['archivos']
+    feedbacks = read_frame(os.path.join(store_dir, archivos['feedbacks']))
+    clientes = read_frame(os.path.join(store_dir, archivos['clientes'])).set_index('cliente_id')
+    agregados = {}
+    for nombre, keys in AGREGADOS.items():
+        agregados[nombre] = read_frame(os.path.join(store_dir, archivos[nombre])).set_index(keys)['count']
+    return feedbacks, agregados, clientes
+
+
+def _reconstruir(incoming, hashes, store_dir, estado_anterior):
+    feedbacks = add_client_columns(add_calendar_columns(incoming))
+    feedbacks[HASH_COL] = hashes
+    agregados = {nombre: _agregar(feedbacks, nombre) for nombre in AGREGADOS}
+    clientes = build_client_dimension(feedbacks)
+    ultima = feedbacks['fecha_registro'].max()
+    _persistir(store_dir, feedbacks, agregados, clientes, estado_anterior,
+               None if pd.isna(ultima) else ultima.isoformat())
+    return IngestaResultado(feedbacks.drop(columns=[HASH_COL]), agregados, len(feedbacks), 0, True, clientes)
+
+
+def ingest_incremental(feedbacks_path=FEEDBACKS_FILE, rebuild=False):
+    """
+    Agrega al dataset persistido solo las filas nuevas del Excel de feedbacks.
+
+    Las filas se comparan por contenido (hash de la fila): las del Excel que no están en el
+    dataset persistido son nuevas (incluye las agregadas el mismo día de la última ingesta
+    y la versión actual de un caso que se cerró después) y las persistidas que ya no están
+    en el Excel se quitan (la versión anterior de ese caso). Las columnas derivadas, los
+    agregados (conteos mensuales por ruta y conteos semanales de offenders) y la dimensión
+    de clientes se actualizan solo con esas filas, por lo que el costo depende del volumen
+    de la semana y no del año completo. El resultado es el mismo que el de una reconstrucción.
+    """
+    store_dir = get_store_dir(feedbacks_path)
+    estado = None if rebuild else _load_estado(store_dir)
+    incoming = read_excel_cached(feedbacks_path)
+    hashes = _row_hashes(incoming)
+
+    try:
+        stored, agregados, clientes = _leer_store(store_dir, estado) if estado else (None, None, None)
+    except Exception as e:
+        print(f"⚠️ Dataset persistido ilegible, se reconstruye: {e}")
+        stored = None
+
+    # Sin historial, el origen perdió filas o el dataset persistido no tiene las columnas de
+    # cliente: no se puede trabajar por deltas
+    if (stored is None or len(incoming) < len(stored)
+            or not set(COLUMNAS_CLIENTE).issubset(stored.columns)):
+        return _reconstruir(incoming, hashes, store_dir, estado or _load_estado(store_dir))
+
+    claves_incoming = _row_keys(hashes)
+    claves_stored = _row_keys(stored[HASH_COL])
+    nuevas = ~claves_incoming.isin(claves_stored)
+    reemplazadas = ~claves_stored.isin(claves_incoming)
+
+    if not nuevas.any() and not reemplazadas.any():
+        return IngestaResultado(stored.drop(columns=[HASH_COL]), agregados, 0, 0, False, clientes)
+
+    delta = add_client_columns(add_calendar_columns(incoming[nuevas]))
+    delta[HASH_COL] = hashes[nuevas]
+
+    # Filas persistidas que ya no están en el Excel (se restan de los agregados)
+    anteriores = stored[reemplazadas]
+
+    # Mismo orden de filas que el Excel, igual que en una reconstrucción
+    feedbacks = pd.concat([stored[~reemplazadas], delta], ignore_index=True)
+    posiciones = pd.Series(range(len(incoming)), index=claves_incoming)
+    orden = posiciones.reindex(_row_keys(feedbacks[HASH_COL])).to_numpy().argsort(kind='stable')
+    feedbacks = feedbacks.iloc[orden].reset_index(drop=True)
+    for nombre in AGREGADOS:
+        agregados[nombre] = _aplicar_delta(
+            agregados[nombre],
+            _agregar(delta, nombre),
+            _agregar(anteriores, nombre) if len(anteriores) else None
+        )
+
+    # Dimensión de clientes: solo se recalculan los clientes de las filas nuevas o modificadas
+    clientes = update_client_dimension(
+        clientes, feedbacks, pd.concat([delta['cliente_id'], anteriores['cliente_id']])
+    )
+
+    ultima = feedbacks['fecha_registro'].max()
+    _persistir(store_dir, feedbacks, agregados, clientes, estado, None if pd.isna(ultima) else ultima.isoformat())
+
+    print(f"✅ Ingesta incremental: {int(nuevas.sum())} filas nuevas, {int(reemplazadas.sum())} reemplazadas")
+    return IngestaResultado(feedbacks.drop(columns=[HASH_COL]), agregados, int(nuevas.sum()),
+                            int(reemplazadas.sum()), False, clientes)
+
+
+def load_aggregates(feedbacks_path=FEEDBACKS_FILE):
+    """Devuelve los agregados persistidos, ingiriendo antes las filas nuevas si las hay"""
+    return ingest_incremental(feedbacks_path).agregados
+
+
+def load_client_dimension(feedbacks_path=FEEDBACKS_FILE):
+    """Devuelve la dimensión de clientes persistida, ingiriendo antes las filas nuevas si las hay"""
+    return ingest_incremental(feedbacks_path).clientes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Ingesta incremental de Feedbacks H1.xlsx')
+    parser.add_argument('--archivo', type=str, default=FEEDBACKS_FILE,
+                        help='Archivo Excel de feedbacks')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Reconstruir el dataset persistido desde cero')
+    args = parser.parse_args()
+
+    resultado = ingest_incremental(args.archivo, rebuild=args.rebuild)
+    print(f"📊 Filas en dataset: {len(resultado.feedbacks)}")
+    print(f"   • Nuevas: {resultado.filas_nuevas}")
+    print(f"   • Modificadas: {resultado.filas_modificadas}")
+    print(f"   • Reconstruido: {'Sí' if resultado.reconstruido else 'No'}")
+    print(f"👥 Clientes en dimensión: {len(resultado.clientes)}")
@@ -0,0 +1,376 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import read_frame, write_frame
+from feedbacks_core import FEEDBACKS_FILE, MESES_ESPANOL
+
+STORE_DIR_NAME = '.consecuencias_store'
+ESTADO_FILE = 'estado.json'
+
+# Nivel de escalamiento según meses consecutivos sin feedback (4 o más = Nivel 4)
+NIVELES = {
+    0: ('NIVEL 0', 'SIN CONSECUENCIAS'),
+    1: ('NIVEL 1', 'LLAMADA DE ATENCIÓN VERBAL'),
+    2: ('NIVEL 2', 'AMONESTACIÓN ESCRITA'),
+    3: ('NIVEL 3', 'SUSPENSIÓN DE 1 DÍA'),
+    4: ('NIVEL 4', 'EVALUACIÓN PARA SUSPENSIÓN EXTENDIDA')
+}
+NIVEL_MAXIMO = max(NIVELES)
+
+
+def periodo_label(año, mes):
+    """Etiqueta de columna de un mes en la matriz: 'AAAA-MM'"""
+    return f"{int(año):04d}-{int(mes):02d}"
+
+
+def periodo_partes(periodo):
+    año, mes = periodo.split('-')
+    return int(año), int(mes)
+
+
+@dataclass
+class EstadoConsecuencias:
+    """
+    Matrices ruta × mes del flujo de consecuencias.
+
+    cumplimiento: 1 si la ruta tuvo al menos un feedback en el mes, 0 si no tuvo y NaN si la
+    ruta no estaba en la BD de rutas de ese mes. racha: meses consecutivos sin feedback al
+    cierre de cada mes (un mes no evaluado no corta ni suma a la racha). conteos y rosters
+    son, por mes, la cantidad de feedbacks y la BD de rutas evaluada (archivo y huella de
+    sus rutas); si alguno cambia el mes se vuelve a calcular.
+    """
+    cumplimiento: pd.DataFrame
+    racha: pd.DataFrame
+    conteos: dict = field(default_factory=dict)
+    rosters: dict = field(default_factory=dict)
+
+    @property
+    def periodos(self):
+        return list(self.cumplimiento.columns)
+
+    def _periodo(self, periodo):
+        if periodo is None:
+            if not self.periodos:
+                raise KeyError("El estado de consecuencias no tiene meses evaluados")
+            return self.periodos[-1]
+        if not isinstance(periodo, str):
+            periodo = periodo_label(*periodo)
+        if periodo not in self.cumplimiento.columns:
+            raise KeyError(f"Mes no evaluado en el estado de consecuencias: {periodo}")
+        return periodo
+
+    def incumplimientos(self, hasta=None):
+        """Total de meses sin feedback por ruta hasta el mes indicado (inclusive)"""
+        hasta = self._periodo(hasta)
+        columnas = self.periodos[:self.periodos.index(hasta) + 1]
+        return (self.cumplimiento[columnas] == 0).sum(axis=1)
+
+    def resumen_mes(self, periodo=None):
+        """
+        Estado de cada ruta evaluada en el mes: RUTA, Cumplio, Racha, Incumplimientos_Totales,
+        Nivel (0-4), Nivel_Consecuencia y Accion_Requerida.
+        """
+        periodo = self._periodo(periodo)
+        evaluadas = self.cumplimiento[periodo].notna()
+        racha = self.racha.loc[evaluadas, periodo].astype(int)
+        nivel = escalation_level(racha)
+
+        resumen = pd.DataFrame({
+            'RUTA': racha.index,
+            'Cumplio': self.cumplimiento.loc[evaluadas, periodo].astype(bool).to_numpy(),
+            'Racha': racha.to_numpy(),
+            'Incumplimientos_Totales': self.incumplimientos(periodo)[evaluadas].to_numpy(),
+            'Nivel': nivel
+        })
+        resumen['Nivel_Consecuencia'] = resumen['Nivel'].map(lambda n: NIVELES[n][0])
+        resumen['Accion_Requerida'] = resumen['Nivel'].map(lambda n: NIVELES[n][1])
+        return resumen
+
+    def resumen_mensual(self):
+        """Totales por mes: rutas evaluadas, con y sin feedback y % de cumplimiento"""
+        evaluadas = self.cumplimiento.notna().sum()
+        con_feedback = (self.cumplimiento == 1).sum()
+        partes = [periodo_partes(p) for p in self.periodos]
+        resumen = pd.DataFrame({
+            'Periodo': self.periodos,
+            'Año': [año for año, _ in partes],
+            'Mes_Num': [mes for _, mes in partes],
+            'Mes': [MESES_ESPANOL[mes] for _, mes in partes],
+            'Total_Rutas': evaluadas.to_numpy(),
+            'Rutas_Con_Feedback': con_feedback.to_numpy(),
+            'Rutas_Sin_Feedback': (evaluadas - con_feedback).to_numpy()
+        })
+        resumen['Porcentaje_Cumplimiento'] = (
+            resumen['Rutas_Con_Feedback'] / resumen['Total_Rutas'].where(resumen['Total_Rutas'] > 0) * 100
+        ).fillna(0).round(2)
+        return resumen
+
+
+def presence_matrix(feedbacks_df, periodos=None):
+    """
+    Matriz ruta × mes con la cantidad de feedbacks, en una sola pasada sobre
+    fecha_registro.dt.to_period('M'). Las columnas ('AAAA-MM') son los meses indicados o,
+    por defecto, todos los meses del primero al último con datos; un mes sin feedbacks de
+    la ruta queda en 0, así que cualquier ventana de N meses es una selección de columnas.
+    """
+    fecha = pd.to_datetime(feedbacks_df['fecha_registro'], errors='coerce')
+    validos = (fecha.notna() & feedbacks_df['ruta'].notna()).to_numpy()
+    registros = pd.DataFrame({
+        'RUTA': feedbacks_df['ruta'][validos].astype(str).str.strip(),
+        'periodo': fecha[validos].dt.to_period('M')
+    })
+
+    if periodos is not None:
+        columnas = pd.PeriodIndex(list(periodos), freq='M')
+    elif len(registros):
+        columnas = pd.period_range(registros['periodo'].min(), registros['periodo'].max(), freq='M')
+    else:
+        columnas = pd.PeriodIndex([], freq='M')
+
+    if registros.empty:
+        return pd.DataFrame(0, index=pd.Index([], name='RUTA'), columns=columnas.strftime('%Y-%m'))
+
+    conteos = registros.groupby(['RUTA', 'periodo']).size().unstack('periodo', fill_value=0)
+    conteos = conteos.reindex(columns=columnas, fill_value=0).astype(int)
+    conteos.columns = columnas.strftime('%Y-%m')
+    conteos.columns.name = None
+    return conteos
+
+
+def compliance_matrix(presencia, rosters):
+    """
+    Matriz ruta × mes (1 = con feedback, 0 = sin feedback, NaN = ruta fuera de la BD del mes)
+    a partir de la matriz de presencia. rosters: {periodo 'AAAA-MM': rutas que debían reportar ese mes}.
+    """
+    periodos = list(rosters)
+    rutas = pd.Index(sorted({str(r) for roster in rosters.values() for r in roster}), name='RUTA')
+    if not periodos:
+        return pd.DataFrame(index=rutas)
+
+    con_feedback = presencia.reindex(index=rutas, columns=periodos, fill_value=0).to_numpy() > 0
+
+    # Solo se evalúan las rutas de la BD de cada mes
+    asignadas = np.column_stack([rutas.isin([str(r) for r in rosters[p]]) for p in periodos])
+    matriz = np.where(asignadas, con_feedback.astype(float), np.nan)
+    return pd.DataFrame(matriz, index=rutas, columns=periodos)
+
+
+def streaks(cumplimiento, racha_inicial=None):
+    """
+    Meses consecutivos sin feedback al cierre de cada mes, para todas las rutas a la vez.
+
+    Con c = suma acumulada de incumplimientos (más la racha inicial), la racha es c menos el
+    valor de c en el último mes cumplido. Los meses no evaluados (NaN) no modifican la racha.
+    """
+    valores = cumplimiento.to_numpy(dtype=float)
+    inicial = np.zeros(len(cumplimiento)) if racha_inicial is None else np.asarray(racha_inicial, dtype=float)
+
+    acumulado = np.cumsum(valores == 0, axis=1) + inicial[:, None]
+    ultimo_cumplido = np.maximum.accumulate(np.where(valores == 1, acumulado, 0), axis=1)
+    return pd.DataFrame(
+        (acumulado - ultimo_cumplido).astype(int), index=cumplimiento.index, columns=cumplimiento.columns
+    )
+
+
+def escalation_level(racha):
+    """Nivel de consecuencia (0-4) según la racha de meses sin feedback"""
+    return np.minimum(np.asarray(racha, dtype=int), NIVEL_MAXIMO)
+
+
+def get_store_dir(feedbacks_path=FEEDBACKS_FILE):
+    return os.path.join(os.path.dirname(os.path.abspath(feedbacks_path)), STORE_DIR_NAME)
+
+
+def _load_estado(store_dir):
+    try:
+        with open(os.path.join(store_dir, ESTADO_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_estado(store_dir, estado):
+    estado_path = os.path.join(store_dir, ESTADO_FILE)
+    tmp_path = f"{estado_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, estado_path)
+
+
+def _persistir(store_dir, estado_consecuencias, estado_anterior):
+    """Escribe las matrices nuevas y luego apunta el estado a ellas"""
+    os.makedirs(store_dir, exist_ok=True)
+    sufijo = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    archivos = {}
+    for nombre in ['cumplimiento', 'racha']:
+        matriz = getattr(estado_consecuencias, nombre).reset_index()
+        archivos[nombre] = os.path.basename(write_frame(matriz, os.path.join(store_dir, f'{nombre}_{sufijo}')))
+
+    _save_estado(store_dir, {
+        'periodos': estado_consecuencias.periodos,
+        'conteos': estado_consecuencias.conteos,
+        'rosters': estado_consecuencias.rosters,
+        'archivos': archivos,
+        'actualizado': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+    if estado_anterior:
+        for archivo in estado_anterior.get('archivos', {}).values():
+            if archivo not in archivos.values():
+                try:
+                    os.remove(os.path.join(store_dir, archivo))
+                except OSError:
+                    pass
+
+
+def load_consequence_state(feedbacks_path=FEEDBACKS_FILE):
+    """Estado persistido (o None si no existe o no se puede leer)"""
+    store_dir = get_store_dir(feedbacks_path)
+    estado = _load_estado(store_dir)
+    if not estado:
+        return None
+    try:
+        matrices = {
+            nombre: read_frame(os.path.join(store_dir, archivo)).set_index('RUTA')[estado['periodos']]
+            for nombre, archivo in estado['archivos'].items()
+        }
+    except Exception as e:
+        print(f"⚠️ Estado de consecuencias ilegible: {e}")
+        return None
+    return EstadoConsecuencias(matrices['cumplimiento'], matrices['racha'], estado.get('conteos', {}),
+                               estado.get('rosters', {}))
+
+
+def _roster_del_mes(mes, rutas_df, catalog):
+    """Rutas que debían reportar en el mes y archivo de la BD (ver RutasCatalog.get_for_month)"""
+    archivo = None
+    if rutas_df is None:
+        rutas_df, archivo = catalog.get_for_month(mes)
+    if rutas_df is None:
+        return [], None
+    columna = 'RUTA' if 'RUTA' in rutas_df.columns else 'ruta'
+    return rutas_df[columna].dropna().astype(str).str.strip().unique(), archivo
+
+
+def _firma_roster(rutas, archivo):
+    """Archivo y huella de las rutas de un mes: detecta una BD agregada o editada después"""
+    huella = hashlib.sha256('\n'.join(sorted(rutas)).encode('utf-8')).hexdigest()
+    return {'archivo': archivo, 'huella': huella}
+
+
+def update_consequence_state(feedbacks_df, rutas_df=None, hasta=None, rebuild=False,
+                             feedbacks_path=FEEDBACKS_FILE):
+    """
+    Actualiza el estado persistido del flujo de consecuencias hasta el mes indicado.
+
+    Se evalúan todos los meses desde el primero con feedbacks hasta 'hasta' ((año, mes) o
+    'AAAA-MM'; por defecto el último mes con feedbacks que ya cerró). Los meses ya guardados
+    no se recalculan: solo se agregan las columnas de los meses nuevos y la racha continúa
+    desde la última guardada. Si cambió la cantidad de feedbacks de un mes ya evaluado
+    (ingesta tardía) o su BD de rutas (un BD_Rutas_<Mes>.xlsx agregado o editado) se
+    recalcula desde ese mes.
+    La BD de rutas de cada mes es la que resuelve RutasCatalog.get_for_month; con rutas_df
+    explícito se usa esa BD para todos los meses y el cálculo se hace en memoria sin tocar
+    el estado.
+    """
+    persistir = rutas_df is None
+    store_dir = get_store_dir(feedbacks_path)
+    estado_anterior = _load_estado(store_dir) if persistir else None
+    guardado = load_consequence_state(feedbacks_path) if persistir and not rebuild else None
+
+    # Presencia ruta × mes de todo el histórico en una sola pasada
+    presencia = presence_matrix(feedbacks_df)
+    conteos = {periodo: int(n) for periodo, n in presencia.sum().items() if n > 0}
+    if not conteos:
+        print("⚠️ No hay feedbacks para evaluar")
+        return guardado
+
+    hoy = datetime.now()
+    ultimo_cerrado = periodo_label(hoy.year - 1, 12) if hoy.month == 1 else periodo_label(hoy.year, hoy.month - 1)
+    if hasta is None:
+        hasta = min(max(conteos), ultimo_cerrado)
+    elif not isinstance(hasta, str):
+        hasta = periodo_label(*hasta)
+    if guardado is not None and guardado.periodos:
+        hasta = max(hasta, guardado.periodos[-1])
+
+    # Todos los meses desde el primero con datos: un mes sin feedbacks cuenta como incumplido
+    periodos = pd.period_range(min(conteos), hasta, freq='M').strftime('%Y-%m').tolist() if hasta >= min(conteos) else []
+    if not periodos:
+        print(f"⚠️ No hay feedbacks hasta {hasta}")
+        return guardado
+
+    catalog = None
+    if rutas_df is None:
+        from rutas_catalog import get_rutas_catalog
+        catalog = get_rutas_catalog()
+
+    # BD de rutas de cada mes (búsquedas en el catálogo en memoria) y su firma
+    rosters = {p: _roster_del_mes(periodo_partes(p)[1], rutas_df, catalog) for p in periodos}
+    firmas = {p: _firma_roster(*rosters[p]) for p in periodos}
+
+    # Meses que se deben (re)calcular: nuevos o con cambios desde la última evaluación
+    if guardado is not None and guardado.periodos and guardado.periodos[0] == periodos[0]:
+        cambiados = [p for p in guardado.periodos
+                     if guardado.conteos.get(p) != conteos.get(p, 0) or guardado.rosters.get(p) != firmas.get(p)]
+        desde = min(cambiados) if cambiados else None
+        nuevos = [p for p in periodos if p > guardado.periodos[-1]]
+        if desde is None and not nuevos:
+            return guardado
+        conservar = [p for p in guardado.periodos if desde is None or p < desde]
+    else:
+        conservar = []
+    calcular = [p for p in periodos if p not in conservar and (not conservar or p > conservar[-1])]
+
+    nueva = compliance_matrix(presencia, {p: rosters[p][0] for p in calcular})
+
+    if conservar:
+        previa = guardado.cumplimiento[conservar]
+        rutas = previa.index.union(nueva.index)
+        racha_inicial = guardado.racha[conservar[-1]].reindex(rutas, fill_value=0)
+        cumplimiento = pd.concat([previa.reindex(rutas), nueva.reindex(rutas)], axis=1)
+        racha = pd.concat([
+            guardado.racha[conservar].reindex(rutas, fill_value=0),
+            streaks(nueva.reindex(rutas), racha_inicial)
+        ], axis=1)
+    else:
+        cumplimiento = nueva
+        racha = streaks(nueva)
+
+    cumplimiento.index.name = racha.index.name = 'RUTA'
+    resultado = EstadoConsecuencias(
+        cumplimiento, racha, {p: conteos.get(p, 0) for p in cumplimiento.columns},
+        {p: firmas[p] for p in cumplimiento.columns}
+    )
+    if persistir:
+        _persistir(store_dir, resultado, estado_anterior)
+        print(f"✅ Estado de consecuencias actualizado: {len(calcular)} meses calculados, "
+              f"{len(conservar)} reutilizados ({len(cumplimiento)} rutas)")
+    return resultado
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from feedbacks_core import get_feedbacks
+
+    parser = argparse.ArgumentParser(description='Actualiza el estado del flujo de consecuencias por ruta')
+    parser.add_argument('--hasta', type=str, default=None,
+                        help='Último mes a evaluar (AAAA-MM); por defecto el último mes cerrado con feedbacks')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recalcular todos los meses desde cero')
+    args = parser.parse_args()
+
+    estado = update_consequence_state(get_feedbacks(), hasta=args.hasta, rebuild=args.rebuild)
+    if estado is not None:
+        print(estado.resumen_mensual().to_string(index=False))
+        niveles = estado.resumen_mes()['Nivel_Consecuencia'].value_counts().sort_index()
+        print(f"\n📋 Niveles en {estado.periodos[-1]}:")
+        for nivel, cantidad in niveles.items():
+            print(f"   • {nivel}: {cantidad} rutas")
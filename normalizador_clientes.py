@@ -0,0 +1,173 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import get_cache_dir
+from feedbacks_core import FEEDBACKS_FILE
+
+# Cache persistente nombre crudo -> nombre canónico, junto a la cache de Excel
+NOMBRES_FILE = 'nombres_clientes.json'
+
+# Cambiar al modificar las reglas de limpieza: invalida los nombres ya guardados
+NORMALIZADOR_VERSION = 1
+
+# Máximo de pasadas de las reglas de duplicación (igual que la limpieza original)
+MAX_ITERACIONES = 10
+
+_ESPACIOS_RE = re.compile(r'\s+')
+# Nombre formado por dos mitades iguales en palabras: "JUAN PEREZ JUAN PEREZ"
+_MITADES_RE = re.compile(r'^(.+) \1$', re.IGNORECASE)
+# Reglas de duplicación que se aplican hasta que el nombre no cambia
+_DUPLICACION_RES = [
+    re.compile(r'(.+?)\s+\1$', re.IGNORECASE),
+    re.compile(r'^(.+?)\s+\1\s*$', re.IGNORECASE),
+    re.compile(r'^(.{2,})\1$', re.IGNORECASE)
+]
+# Texto sin espacios repetido dos veces: "TIENDAROSATIENDAROSA"
+_REPETIDO_RE = re.compile(r'(.+)\1', re.IGNORECASE)
+# Palabras duplicadas consecutivas: "TIENDA TIENDA ROSA"
+_PALABRA_REPETIDA_RE = re.compile(r'(?<!\S)(\S+)(?: \1(?!\S))+', re.IGNORECASE)
+
+# Códigos que no identifican a un cliente: solo ceros (con o sin "Bodega"), puntuación, vacío o "0001"
+CODIGO_INVALIDO_RE = re.compile(r'^(?:0+\s*(?:[Bb]odega)?|[.,]+|\s*|0001\.*)$')
+# Nombres que no identifican a un cliente: puntuación, vacío, "Bodega" o solo números
+NOMBRE_INVALIDO_RE = re.compile(r'^(?:[.,]+|\s*|[Bb]odega|[0-9,.\s]+)$')
+
+
+def clean_names_batch(nombres):
+    """
+    Limpia nombres duplicados de un lote completo con operaciones de columna (.str):
+    espacios, mitades repetidas, reglas de duplicación hasta estabilizar, texto repetido
+    sin espacios y palabras consecutivas repetidas. Devuelve una Serie alineada con nombres.
+    """
+    limpios = pd.Series(nombres, dtype=object).astype(str)
+    limpios = limpios.str.strip().str.replace(_ESPACIOS_RE, ' ', regex=True)
+
+    # Método 1: las dos mitades (en palabras) son iguales
+    limpios = limpios.str.replace(_MITADES_RE, r'\1', regex=True)
+
+    # Método 2: reglas de duplicación; en cada pasada solo se procesan los que siguen cambiando
+    pendientes = limpios.index
+    for _ in range(MAX_ITERACIONES):
+        if len(pendientes) == 0:
+            break
+        anteriores = limpios.loc[pendientes]
+        nuevos = anteriores
+        for patron in _DUPLICACION_RES:
+            nuevos = nuevos.str.replace(patron, r'\1', regex=True)
+        limpios.loc[pendientes] = nuevos
+        pendientes = nuevos.index[nuevos != anteriores]
+
+    # Método 3: texto sin espacios repetido con un número par de palabras
+    palabras = limpios.str.split()
+    repetidos = (
+        (limpios.str.len() > 4)
+        & limpios.str.replace(' ', '', regex=False).str.fullmatch(_REPETIDO_RE)
+        & (palabras.str.len() % 2 == 0)
+    )
+    if repetidos.any():
+        limpios.loc[repetidos] = [' '.join(p[:len(p) // 2]) for p in palabras[repetidos]]
+
+    # Método 4: palabras duplicadas consecutivas
+    return limpios.str.replace(_PALABRA_REPETIDA_RE, r'\1', regex=True)
+
+
+def client_code_numbers(codigos):
+    """Parte numérica inicial de los códigos de cliente (NaN si no empieza con dígitos)"""
+    return pd.Series(codigos).astype(str).str.extract(r'^(\d+)')[0]
+
+
+def invalid_code_mask(codigos):
+    """True para los códigos (parte numérica) que no identifican a un cliente; nulos como 'nan'"""
+    return pd.Series(codigos).astype(str).str.match(CODIGO_INVALIDO_RE).to_numpy(dtype=bool)
+
+
+def invalid_name_mask(nombres):
+    """True para los nombres canónicos que no identifican a un cliente; nulos como 'nan'"""
+    return pd.Series(nombres).astype(str).str.match(NOMBRE_INVALIDO_RE).to_numpy(dtype=bool)
+
+
+def valid_client_mask(codigos, nombres):
+    """
+    True para los clientes con código y nombre válidos, evaluado sobre columnas completas con
+    un patrón combinado por columna. Los nulos se evalúan como el texto 'nan' (válido).
+    """
+    return ~(invalid_code_mask(codigos) | invalid_name_mask(nombres))
+
+
+class NormalizadorClientes:
+    """
+    Servicio de nombres canónicos de clientes con cache persistente: cada nombre crudo
+    distinto se limpia una sola vez y el resultado queda guardado para las siguientes
+    corridas. Los nombres nuevos de una consulta se limpian juntos en un lote.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir(FEEDBACKS_FILE), NOMBRES_FILE)
+        self.nombres = {}
+        self.nuevos = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    contenido = json.load(f)
+                if contenido.get('version') == NORMALIZADOR_VERSION:
+                    self.nombres = contenido.get('nombres', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Cache de nombres ilegible, se reconstruye: {e}")
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def normalize(self, nombres, guardar=True):
+        """
+        Nombres canónicos de una Serie (o lista) de nombres crudos, alineados con la entrada.
+        Los nulos se mantienen como NaN.
+        """
+        serie = nombres if isinstance(nombres, pd.Series) else pd.Series(nombres, dtype=object)
+        codigos, unicos = pd.factorize(serie)
+        claves = [str(nombre) for nombre in unicos]
+
+        faltantes = list(dict.fromkeys(clave for clave in claves if clave not in self.nombres))
+        if faltantes:
+            self.nombres.update(zip(faltantes, clean_names_batch(faltantes).tolist()))
+            self.nuevos += len(faltantes)
+            if guardar:
+                self.guardar()
+
+        canonicos = np.array([self.nombres[clave] for clave in claves] + [np.nan], dtype=object)
+        # factorize marca los nulos con -1, que apunta al NaN del final
+        return pd.Series(canonicos[codigos], index=serie.index, name=serie.name)
+
+    def canonical(self, nombre):
+        """Nombre canónico de un solo nombre crudo"""
+        return self.normalize([nombre]).iloc[0]
+
+    def guardar(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': NORMALIZADOR_VERSION, 'nombres': self.nombres}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.nuevos = 0
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la cache de nombres: {e}")
+
+
+_NORMALIZADOR = None
+
+
+def get_normalizador():
+    """Normalizador del proceso actual (la cache en disco se lee en el primer uso)"""
+    global _NORMALIZADOR
+    if _NORMALIZADOR is None:
+        _NORMALIZADOR = NormalizadorClientes()
+    return _NORMALIZADOR
+
+
+def normalize_client_names(nombres):
+    """Nombres canónicos de clientes usando la cache compartida del proceso"""
+    return get_normalizador().normalize(nombres)
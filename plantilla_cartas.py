@@ -0,0 +1,328 @@
+import hashlib
+import os
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import Flowable, PageBreak, SimpleDocTemplate, Table, TableStyle
+
+LOGO_PATH = 'LogoConst.png'
+DPO_PATH = 'dpo.png'
+
+# Subir para forzar la regeneración de todos los PDFs. Los textos fijos de este archivo
+# (firmas, pie, estilos) ya invalidan los PDFs al editarse: su fuente entra en la huella
+PLANTILLA_VERSION = 1
+
+# Imágenes decodificadas una vez por proceso: ruta -> ImageReader (None si no se pudo leer)
+_IMAGENES = {}
+
+# Huellas de archivos fuente ya calculadas: (ruta, mtime, tamaño) -> SHA-256
+_FUENTES = {}
+
+
+def cached_image(path):
+    """
+    ImageReader del archivo, decodificado una sola vez por proceso. ReportLab identifica la
+    imagen por el contenido, así que dentro de un mismo PDF se guarda una sola vez aunque se
+    dibuje en varias páginas.
+    """
+    if path not in _IMAGENES:
+        try:
+            reader = ImageReader(path)
+            reader.getRGBData()  # decodificar ahora y no en cada documento
+            _IMAGENES[path] = reader
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar la imagen {path}: {e}")
+            _IMAGENES[path] = None
+    return _IMAGENES[path]
+
+
+def huella_fuente(path):
+    """SHA-256 de un archivo fuente; se vuelve a leer solo si cambian su mtime o su tamaño"""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    clave = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if clave not in _FUENTES:
+        with open(path, 'rb') as f:
+            _FUENTES[clave] = hashlib.sha256(f.read()).hexdigest()
+    return _FUENTES[clave]
+
+
+def version_plantilla():
+    """
+    Versión de la plantilla junto con la huella de los logos y del código fuente de este
+    archivo: reemplazar un logo o editar un texto fijo de la plantilla también invalida
+    """
+    recursos = []
+    for path in (LOGO_PATH, DPO_PATH):
+        try:
+            stat = os.stat(path)
+            recursos.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            recursos.append((path, None, None))
+    recursos.append((os.path.basename(__file__), huella_fuente(__file__)))
+    return PLANTILLA_VERSION, recursos
+
+
+class ImagenCacheada(Flowable):
+    """Imagen de tamaño fijo que se dibuja desde un ImageReader compartido"""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+class MarcadorOutline(Flowable):
+    """Marcador invisible: registra la página actual en el índice (outline) del PDF"""
+
+    def __init__(self, clave, titulo, nivel=0):
+        super().__init__()
+        self.clave = clave
+        self.titulo = titulo
+        self.nivel = nivel
+
+    def wrap(self, available_width, available_height):
+        return 0, 0
+
+    def draw(self):
+        self.canv.bookmarkPage(self.clave)
+        self.canv.addOutlineEntry(self.titulo, self.clave, level=self.nivel, closed=self.nivel == 0)
+
+
+class PlantillaCartas:
+    """
+    Contexto compartido de las cartas y reportes PDF: estilos de párrafo, estilos de tabla e
+    imágenes se construyen una vez por proceso y se reutilizan en todos los documentos.
+    Cada documento solo arma sus propias tablas (contenido distinto) con estos estilos.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.styles = styles
+
+        # Cartas de incumplimiento mensual
+        self.carta_titulo = ParagraphStyle(
+            'CustomTitle', parent=styles['Heading1'], alignment=1, fontSize=14,
+            fontName='Helvetica-Bold', spaceAfter=0.2*inch, spaceBefore=0
+        )
+        self.carta_normal = ParagraphStyle(
+            'CustomNormal', parent=styles['Normal'], fontSize=11, leading=14,
+            spaceBefore=6, spaceAfter=6, alignment=4
+        )
+        self.fecha = ParagraphStyle('Date', parent=styles['Normal'], alignment=2, fontSize=10)
+
+        # Reporte semanal de offenders
+        self.celda = ParagraphStyle('CellStyle', parent=styles['Normal'], fontSize=7, leading=9, alignment=0)
+        self.celda_centrada = ParagraphStyle(
+            'CenteredCellStyle', parent=styles['Normal'], fontSize=7, leading=9, alignment=1
+        )
+        self.semanal_titulo = ParagraphStyle(
+            'CustomTitle', parent=styles['Heading1'], alignment=1, fontSize=13,
+            fontName='Helvetica-Bold', spaceAfter=0.05*inch, spaceBefore=0
+        )
+        self.semanal_subtitulo = ParagraphStyle(
+            'CustomSubtitle', parent=styles['Heading2'], fontSize=11, fontName='Helvetica-Bold',
+            alignment=1, spaceAfter=0.1*inch, spaceBefore=0
+        )
+        self.semanal_normal = ParagraphStyle(
+            'CustomNormal', parent=styles['Normal'], fontSize=11, leading=13, spaceBefore=3, spaceAfter=3
+        )
+        self.semanal_encabezado = ParagraphStyle(
+            'CustomHeading', parent=styles['Heading3'], fontSize=11, fontName='Helvetica-Bold'
+        )
+        self.justificado = ParagraphStyle(
+            'Justified', parent=self.semanal_normal, alignment=4, spaceBefore=6, spaceAfter=6
+        )
+        self.firma_encabezado = ParagraphStyle(
+            'SignatureHeader', parent=styles['Normal'], fontName='Helvetica', fontSize=9,
+            leading=10, spaceBefore=6, spaceAfter=8
+        )
+
+        # Estilos de tabla reutilizables
+        self.estilo_logo = TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('VALIGN', (0, 0), (0, 0), 'TOP'),
+        ])
+        self.estilo_logo_texto = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (0, 0), 16),
+            ('FONTNAME', (0, 1), (0, 1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (0, 1), 12),
+        ])
+        self.estilo_firmas_carta = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.estilo_firmas_semanal = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('LEADING', (0, 0), (-1, -1), 12),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12)
+        ])
+        self.estilo_dpo = TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
+        ])
+        self.estilo_dpo_texto = TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (0, 0), 14),
+        ])
+        self.estilo_plan_accion = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('ALIGN', (0, 1), (0, -1), 'LEFT'),      # Cliente
+            ('ALIGN', (1, 1), (1, -1), 'CENTER'),    # Rutas
+            ('ALIGN', (2, 1), (2, -1), 'LEFT'),      # Plan de Acción
+            ('ALIGN', (3, 1), (3, -1), 'CENTER'),    # Fecha
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('GRID', (0, 0), (-1, -1), 0.75, colors.black),
+            ('LEFTPADDING', (0, 0), (-1, -1), 3),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ])
+        self.estilo_sin_clientes = TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (0, 0), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (0, 0), 10),
+        ])
+
+    def encabezado_logo(self, logo_path=LOGO_PATH):
+        """Logo de LA CONSTANCIA alineado a la izquierda (texto si no hay imagen)"""
+        reader = cached_image(logo_path)
+        if reader is None:
+            return Table([["LA CONSTANCIA"], ["ABInBev"]], colWidths=[6*inch], style=self.estilo_logo_texto)
+        return Table([[ImagenCacheada(reader, 2*inch, 0.8*inch)]], colWidths=[6*inch], style=self.estilo_logo)
+
+    def pie_dpo(self, dpo_path=DPO_PATH):
+        """Logo DPO centrado al pie del reporte semanal (texto si no hay imagen)"""
+        reader = cached_image(dpo_path)
+        if reader is None:
+            return Table([["DPO 2.0"]], colWidths=[6*inch], style=self.estilo_dpo_texto)
+        return Table([[ImagenCacheada(reader, 1.2*inch, 0.8*inch)]], colWidths=[6*inch], style=self.estilo_dpo)
+
+    def firmas_carta(self, reparto, supervisor):
+        """Firmas de la carta de incumplimiento: reparto y supervisor inmediato"""
+        firma_data = [
+            ["_____________________", "_____________________"],
+            [f"{reparto}", f"{supervisor}"],
+            ["Reparto Responsable", "Supervisor Inmediato"]
+        ]
+        return Table(firma_data, colWidths=[3*inch, 3*inch], style=self.estilo_firmas_carta)
+
+    def firmas_semanales(self, signatures):
+        """Tabla de firmas de enterados del reporte semanal (dos firmas por fila)"""
+        sig_data = _filas_firmas(tuple((sig['name'], sig['title']) for sig in signatures))
+        return Table(
+            [list(fila) for fila in sig_data], colWidths=[3*inch, 3*inch],
+            rowHeights=[1.0*inch] * len(sig_data), style=self.estilo_firmas_semanal
+        )
+
+
+@lru_cache(maxsize=None)
+def _filas_firmas(firmas):
+    filas = []
+    for i in range(0, len(firmas), 2):
+        fila = []
+        for nombre, cargo in firmas[i:i + 2]:
+            # Espacio entre línea de firma y nombre para firmar adecuadamente
+            fila.append(f"F.________________________________\n{nombre} - {cargo}")
+        fila += [""] * (2 - len(fila))
+        filas.append(tuple(fila))
+    return tuple(filas)
+
+
+_PLANTILLA = None
+
+
+def get_plantilla():
+    """Contexto de plantilla del proceso actual (se construye en el primer uso)"""
+    global _PLANTILLA
+    if _PLANTILLA is None:
+        _PLANTILLA = PlantillaCartas()
+    return _PLANTILLA
+
+
+class _SiguienteDocumento(Flowable):
+    """Marca el final de la story cargada: ahí se agregan los flowables del documento siguiente"""
+
+    def wrap(self, available_width, available_height):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+
+class _DocPorDocumento(SimpleDocTemplate):
+    """
+    DocTemplate que arma la story de a un documento: cuando platypus llega al marcador
+    _SiguienteDocumento lo reemplaza por los flowables del documento siguiente, usando el
+    hook público filterFlowables. Así solo está en memoria la carta que se está paginando.
+    """
+
+    def __init__(self, filename, partes, **doc_kwargs):
+        super().__init__(filename, **doc_kwargs)
+        self._partes = partes
+
+    def filterFlowables(self, flowables):
+        if not flowables or not isinstance(flowables[0], _SiguienteDocumento):
+            return
+        for parte in self._partes:
+            if parte:
+                flowables[0:1] = list(parte) + [_SiguienteDocumento()]
+                return
+        # Sin más documentos: platypus descarta el marcador
+        flowables[0] = None
+
+
+def build_consolidated_pdf(filename, documentos, construir_story, **doc_kwargs):
+    """
+    Escribe todos los documentos en un único PDF, cada uno desde una página nueva, en una
+    sola pasada y sin archivos intermedios.
+
+    documentos es una lista de (grupo, titulo, kwargs): el índice del PDF tiene una entrada
+    por grupo (por ejemplo el supervisor) y debajo una por documento (la ruta). Los documentos
+    se ordenan por grupo y título; construir_story(**kwargs) devuelve los flowables de cada
+    uno y se llama recién cuando el documento anterior ya fue paginado.
+    """
+    documentos = sorted(documentos, key=lambda d: (str(d[0]), str(d[1])))
+
+    def partes():
+        grupo_actual = None
+        for i, (grupo, titulo, kwargs) in enumerate(documentos):
+            parte = [PageBreak()] if i > 0 else []
+            if grupo != grupo_actual:
+                parte.append(MarcadorOutline(f"grupo_{i}", str(grupo), nivel=0))
+                grupo_actual = grupo
+            parte.append(MarcadorOutline(f"doc_{i}", str(titulo), nivel=1))
+            parte.extend(construir_story(**kwargs))
+            yield parte
+
+    doc_kwargs.setdefault('pagesize', letter)
+    doc = _DocPorDocumento(filename, partes(), **doc_kwargs)
+    doc.build([_SiguienteDocumento()])
+    return filename
@@ -3,109 +3,79 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
 import numpy as np
+from feedbacks_core import get_feedbacks
+from exportar_excel import LibroExcel
+from motor_consecuencias import periodo_partes, update_consequence_state
+from rutas_catalog import get_rutas_catalog
 
-def generate_priority_offenders_report():
+def generate_priority_offenders_report(meses=6):
     """
-    Genera un reporte específico de las rutas con mayor incumplimiento para priorizar acciones
+    Genera un reporte específico de las rutas con mayor incumplimiento para priorizar acciones.
+    meses es la profundidad del historial: los últimos N meses calendario evaluados.
     """
     print("🎯 GENERANDO REPORTE DE RUTAS PRIORITARIAS PARA ACCIÓN INMEDIATA")
     print("=" * 80)
     
     try:
         # Cargar datos
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
-        rutas_df = pd.read_excel('BD_Rutas_Junio.xlsx')
+        feedbacks_df = get_feedbacks()
         
-        # Convertir fechas
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
+        # Las fechas ya vienen convertidas desde feedbacks_core
         
-        # Análisis de los últimos 6 meses
-        current_date = datetime.now()
-        six_months_ago = current_date - timedelta(days=180)
+        # Matriz ruta × mes del motor de consecuencias (solo se calculan los meses nuevos)
+        estado = update_consequence_state(feedbacks_df)
+        if estado is None or not estado.periodos:
+            print("❌ No hay meses evaluados para el reporte")
+            return None, None, None
         
-        # Filtrar feedbacks de los últimos 6 meses
-        recent_feedbacks = feedbacks_df[feedbacks_df['fecha_registro'] >= six_months_ago]
+        # Análisis de los últimos meses calendario evaluados (columnas de la matriz ruta × mes)
+        ultimos = estado.periodos[-meses:]
+        matriz = estado.cumplimiento[ultimos]
         
-        print(f"📊 Analizando feedbacks desde: {six_months_ago.strftime('%Y-%m-%d')}")
-        print(f"📊 Total feedbacks en el período: {len(recent_feedbacks)}")
+        print(f"📊 Analizando meses: {', '.join(ultimos)}")
         
-        # Obtener todas las rutas activas
-        all_routes = set(rutas_df['RUTA'].unique())
-        
-        # Análisis mensual de cumplimiento por ruta
-        monthly_compliance = []
-        
-        for month_offset in range(6):
-            target_date = current_date - timedelta(days=30 * month_offset)
-            target_month = target_date.month
-            target_year = target_date.year
-            
-            # Feedbacks del mes
-            month_feedbacks = recent_feedbacks[
-                (recent_feedbacks['fecha_registro'].dt.month == target_month) &
-                (recent_feedbacks['fecha_registro'].dt.year == target_year)
-            ]
-            
-            # Rutas que SÍ hicieron feedback este mes
-            routes_with_feedback = set(month_feedbacks['ruta'].dropna().unique())
-            
-            # Rutas que NO hicieron feedback
-            routes_without_feedback = all_routes - routes_with_feedback
-            
-            # Registrar incumplimientos
-            for route in routes_without_feedback:
-                monthly_compliance.append({
-                    'Ruta': route,
-                    'Año': target_year,
-                    'Mes': target_month,
-                    'Cumplimiento': 0,
-                    'Fecha': target_date.strftime('%Y-%m')
-                })
-            
-            for route in routes_with_feedback:
-                monthly_compliance.append({
-                    'Ruta': route,
-                    'Año': target_year,
-                    'Mes': target_month,
-                    'Cumplimiento': 1,
-                    'Fecha': target_date.strftime('%Y-%m')
-                })
-        
-        compliance_df = pd.DataFrame(monthly_compliance)
+        # BD de rutas del último mes evaluado, con la misma resolución que el motor
+        rutas_df, archivo_rutas = get_rutas_catalog().get_for_month(periodo_partes(ultimos[-1])[1])
+        if rutas_df is not None:
+            print(f"✅ Usando base de rutas: {archivo_rutas}")
         
         # Calcular estadísticas por ruta
-        route_stats = compliance_df.groupby('Ruta').agg({
-            'Cumplimiento': ['count', 'sum', 'mean']
-        }).round(3)
-        
-        route_stats.columns = ['Meses_Evaluados', 'Meses_Cumplidos', 'Porcentaje_Cumplimiento']
+        route_stats = pd.DataFrame({
+            'Meses_Evaluados': matriz.notna().sum(axis=1),
+            'Meses_Cumplidos': (matriz == 1).sum(axis=1)
+        })
+        route_stats = route_stats[route_stats['Meses_Evaluados'] > 0]
+        route_stats.index.name = 'Ruta'
+        route_stats['Porcentaje_Cumplimiento'] = (
+            route_stats['Meses_Cumplidos'] / route_stats['Meses_Evaluados'] * 100
+        ).round(1)
         route_stats['Meses_Incumplidos'] = route_stats['Meses_Evaluados'] - route_stats['Meses_Cumplidos']
-        route_stats['Porcentaje_Cumplimiento'] = (route_stats['Porcentaje_Cumplimiento'] * 100).round(1)
         
-        # Clasificar rutas por nivel de riesgo
-        def classify_risk(row):
-            incumplimientos = row['Meses_Incumplidos']
-            porcentaje = row['Porcentaje_Cumplimiento']
-            
-            if incumplimientos >= 4 or porcentaje <= 33:
-                return 'CRÍTICO'
-            elif incumplimientos >= 3 or porcentaje <= 50:
-                return 'ALTO'
-            elif incumplimientos >= 2 or porcentaje <= 67:
-                return 'MEDIO'
-            elif incumplimientos >= 1 or porcentaje <= 83:
-                return 'BAJO'
-            else:
-                return 'ÓPTIMO'
+        # Racha actual y nivel de consecuencia del último mes
+        estado_actual = estado.resumen_mes(ultimos[-1]).set_index('RUTA')
+        route_stats['Racha_Actual'] = estado_actual['Racha'].reindex(route_stats.index)
+        route_stats['Nivel_Consecuencia'] = estado_actual['Nivel_Consecuencia'].reindex(route_stats.index)
         
-        route_stats['Nivel_Riesgo'] = route_stats.apply(classify_risk, axis=1)
+        # Clasificar rutas por nivel de riesgo
+        incumplimientos = route_stats['Meses_Incumplidos']
+        porcentaje = route_stats['Porcentaje_Cumplimiento']
+        route_stats['Nivel_Riesgo'] = np.select(
+            [
+                (incumplimientos >= 4) | (porcentaje <= 33),
+                (incumplimientos >= 3) | (porcentaje <= 50),
+                (incumplimientos >= 2) | (porcentaje <= 67),
+                (incumplimientos >= 1) | (porcentaje <= 83)
+            ],
+            ['CRÍTICO', 'ALTO', 'MEDIO', 'BAJO'],
+            default='ÓPTIMO'
+        )
         
         # Ordenar por prioridad (más incumplimientos primero)
         route_stats = route_stats.sort_values(['Meses_Incumplidos', 'Porcentaje_Cumplimiento'], 
                                             ascending=[False, True])
         
         # Agregar información de la ruta
-        if 'NOMBRE_VENDEDOR' in rutas_df.columns:
+        if rutas_df is not None and 'NOMBRE_VENDEDOR' in rutas_df.columns:
             route_info = rutas_df[['RUTA', 'NOMBRE_VENDEDOR']].drop_duplicates()
             route_stats = route_stats.merge(route_info, left_index=True, right_on='RUTA', how='left')
             route_stats.set_index('RUTA', inplace=True)
@@ -199,70 +169,47 @@ def generate_priority_offenders_report():
         # Generar archivo Excel con el reporte prioritario
         filename = f"Reporte_Rutas_Prioritarias_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         
-        with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
+        # Datos de la hoja 5 (dashboard resumen)
+        dashboard_data = {
+            'Indicador': [
+                'Total Rutas Evaluadas',
+                'Rutas Críticas',
+                'Rutas Alto Riesgo',
+                'Rutas Medio Riesgo',
+                'Rutas Bajo Riesgo',
+                'Rutas Óptimas',
+                'Porcentaje Críticas',
+                'Acciones Inmediatas Requeridas'
+            ],
+            'Valor': [
+                len(route_stats),
+                len(rutas_criticas),
+                len(rutas_alto_riesgo),
+                len(rutas_medio_riesgo),
+                len(route_stats[route_stats['Nivel_Riesgo'] == 'BAJO']),
+                len(route_stats[route_stats['Nivel_Riesgo'] == 'ÓPTIMO']),
+                f"{(len(rutas_criticas) / len(route_stats) * 100):.1f}%",
+                len(action_plan_df[action_plan_df['Prioridad'] == 1])
+            ]
+        }
+        dashboard_df = pd.DataFrame(dashboard_data)
+        
+        # Libro en modo constant_memory con los formatos creados una sola vez
+        with LibroExcel(filename) as libro:
             # Hoja 1: Plan de acción priorizado
-            action_plan_df.to_excel(writer, sheet_name='Plan_Accion_Prioritario', index=False)
+            libro.write_sheet('Plan_Accion_Prioritario', action_plan_df, ancho_default=18)
             
             # Hoja 2: Cronograma de acciones
-            chronogram_df.to_excel(writer, sheet_name='Cronograma_Acciones', index=False)
+            libro.write_sheet('Cronograma_Acciones', chronogram_df, ancho_default=18)
             
             # Hoja 3: Estadísticas completas por ruta
-            route_stats.to_excel(writer, sheet_name='Estadisticas_Rutas')
+            libro.write_sheet('Estadisticas_Rutas', route_stats.reset_index())
             
             # Hoja 4: Rutas críticas detalle
-            rutas_criticas.to_excel(writer, sheet_name='Rutas_Criticas')
+            libro.write_sheet('Rutas_Criticas', rutas_criticas.reset_index())
             
             # Hoja 5: Dashboard resumen
-            dashboard_data = {
-                'Indicador': [
-                    'Total Rutas Evaluadas',
-                    'Rutas Críticas',
-                    'Rutas Alto Riesgo',
-                    'Rutas Medio Riesgo',
-                    'Rutas Bajo Riesgo',
-                    'Rutas Óptimas',
-                    'Porcentaje Críticas',
-                    'Acciones Inmediatas Requeridas'
-                ],
-                'Valor': [
-                    len(route_stats),
-                    len(rutas_criticas),
-                    len(rutas_alto_riesgo),
-                    len(rutas_medio_riesgo),
-                    len(route_stats[route_stats['Nivel_Riesgo'] == 'BAJO']),
-                    len(route_stats[route_stats['Nivel_Riesgo'] == 'ÓPTIMO']),
-                    f"{(len(rutas_criticas) / len(route_stats) * 100):.1f}%",
-                    len(action_plan_df[action_plan_df['Prioridad'] == 1])
-                ]
-            }
-            dashboard_df = pd.DataFrame(dashboard_data)
-            dashboard_df.to_excel(writer, sheet_name='Dashboard_Resumen', index=False)
-            
-            # Formateo
-            workbook = writer.book
-            
-            # Formatos por nivel de riesgo
-            critico_format = workbook.add_format({
-                'bg_color': '#FF4444',
-                'font_color': 'white',
-                'bold': True,
-                'border': 1
-            })
-            
-            alto_format = workbook.add_format({
-                'bg_color': '#FF8844',
-                'border': 1
-            })
-            
-            medio_format = workbook.add_format({
-                'bg_color': '#FFAA44',
-                'border': 1
-            })
-            
-            # Aplicar formato condicional a las hojas principales
-            for sheet_name in ['Plan_Accion_Prioritario', 'Cronograma_Acciones']:
-                worksheet = writer.sheets[sheet_name]
-                worksheet.set_column('A:Z', 18)
+            libro.write_sheet('Dashboard_Resumen', dashboard_df)
         
         print(f"\n✅ Reporte prioritario generado: {filename}")
         
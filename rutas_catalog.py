@@ -0,0 +1,287 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import CACHE_DIR_NAME, read_excel_cached, read_frame, write_frame
+from feedbacks_core import MES_INGLES_A_ESPANOL, MESES_ESPANOL, RUTAS_DEFAULT_FILE
+
+CATALOG_MANIFEST = 'rutas_catalog.json'
+REQUIRED_COLS = ['RUTA', 'SUPERVISOR', 'CONTRATISTA']
+SCD_COLS = ['RUTA', 'SUPERVISOR', 'CONTRATISTA', 'archivo', 'valid_from', 'valid_to']
+DEFAULT_KEY = 'default'
+
+# BDs que rigen un mes sin BD propia, en orden de preferencia
+MESES_RESPALDO = ['Junio', 'Mayo', DEFAULT_KEY]
+
+# Token del nombre de archivo (en minúsculas) -> mes en español
+_MES_TOKENS = {mes.lower(): mes for mes in MESES_ESPANOL if mes}
+_MES_TOKENS.update({ingles.lower(): mes for ingles, mes in MES_INGLES_A_ESPANOL.items()})
+_MES_TOKENS.update({
+    'jan': 'Enero', 'feb': 'Febrero', 'mar': 'Marzo', 'apr': 'Abril',
+    'may': 'Mayo', 'jun': 'Junio', 'jul': 'Julio', 'aug': 'Agosto',
+    'sep': 'Septiembre', 'oct': 'Octubre', 'nov': 'Noviembre', 'dec': 'Diciembre'
+})
+
+_RUTAS_FILE_RE = re.compile(r'^bd_rutas_(.+)\.xlsx$', re.IGNORECASE)
+
+# Catálogos ya construidos en este proceso, por directorio
+_CATALOGS = {}
+
+
+def _mes_from_filename(filename):
+    """Detecta el mes de un archivo BD_Rutas_<Mes>.xlsx (español, inglés abreviado o contenido)"""
+    match = _RUTAS_FILE_RE.match(filename)
+    if not match:
+        return None
+
+    token = match.group(1).strip().lower()
+    if token in _MES_TOKENS:
+        return _MES_TOKENS[token]
+
+    # Variaciones como "BD_Rutas_Julio_v2.xlsx": buscar un nombre completo dentro del token
+    for mes in MESES_ESPANOL[1:]:
+        if mes.lower() in token:
+            return mes
+    return None
+
+
+def scan_rutas_files(directorio='.'):
+    """
+    Recorre el directorio una sola vez y devuelve {mes: nombre_archivo}.
+    Si hay varios archivos para el mismo mes gana el primero en orden alfabético.
+    """
+    archivos = {}
+    with os.scandir(directorio) as entries:
+        nombres = sorted(entry.name for entry in entries if entry.is_file())
+
+    for nombre in nombres:
+        if nombre == RUTAS_DEFAULT_FILE:
+            archivos[DEFAULT_KEY] = nombre
+            continue
+        mes = _mes_from_filename(nombre)
+        if mes and mes not in archivos:
+            archivos[mes] = nombre
+
+    return archivos
+
+
+def _load_one(path):
+    return read_excel_cached(path)
+
+
+def _load_files(paths, max_workers=None):
+    """Carga varios Excel en paralelo (un proceso por archivo); secuencial si es uno solo"""
+    if len(paths) <= 1:
+        return [_load_one(p) for p in paths]
+
+    workers = max_workers or min(len(paths), os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_load_one, paths))
+    except Exception as e:
+        print(f"⚠️ Carga paralela no disponible, se usa carga secuencial: {e}")
+        return [_load_one(p) for p in paths]
+
+
+class RutasCatalog:
+    """
+    Tabla única con todas las BDs de rutas (default + una por mes), indexada por (mes, RUTA).
+    La tabla concatenada se persiste junto con las huellas de los archivos, por lo que las
+    consultas posteriores no vuelven a abrir ningún Excel mientras los archivos no cambien.
+    """
+
+    def __init__(self, table, archivos, columnas):
+        self.table = table
+        self.archivos = archivos
+        # Columnas propias de cada archivo, en su orden original
+        self.columnas = columnas
+
+    @property
+    def meses(self):
+        """Meses con BD específica, en orden de calendario"""
+        return [mes for mes in MESES_ESPANOL[1:] if mes in self.archivos]
+
+    def has(self, mes):
+        return mes in self.archivos
+
+    def get(self, mes):
+        """Devuelve la BD de un mes (o 'default') con las columnas originales"""
+        if mes not in self.archivos:
+            return None
+        df = self.table.xs(mes, level='mes').reset_index()
+        return df[self.columnas[mes]]
+
+    def get_first(self, candidatos):
+        """Primera BD disponible de la lista de meses candidatos: (df, archivo) o (None, None)"""
+        for mes in candidatos:
+            if mes in self.archivos:
+                return self.get(mes), self.archivos[mes]
+        return None, None
+
+    def get_for_month(self, mes):
+        """
+        BD de rutas que rige un mes (número o nombre): la del propio mes o la primera de
+        MESES_RESPALDO. Es la resolución que usan el motor de consecuencias y los reportes
+        del flujo. Devuelve (df, archivo) o (None, None).
+        """
+        nombre = MESES_ESPANOL[mes] if isinstance(mes, (int, np.integer)) else mes
+        return self.get_first([nombre] + MESES_RESPALDO)
+
+    def as_dict(self):
+        """Formato {'default': df, 'Mayo': df, ...} usado por el dashboard"""
+        return {mes: self.get(mes) for mes in self.archivos}
+
+
+def _manifest_path(directorio):
+    return os.path.join(directorio, CACHE_DIR_NAME, CATALOG_MANIFEST)
+
+
+def _load_manifest(directorio):
+    try:
+        with open(_manifest_path(directorio), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_manifest(directorio, manifest):
+    path = _manifest_path(directorio)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _fingerprints(directorio, archivos):
+    result = {}
+    for mes, nombre in archivos.items():
+        stat = os.stat(os.path.join(directorio, nombre))
+        result[mes] = {'archivo': nombre, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    return result
+
+
+def build_catalog(directorio='.', max_workers=None):
+    """Lee cada BD de rutas exactamente una vez y construye la tabla concatenada"""
+    archivos = scan_rutas_files(directorio)
+    meses = list(archivos.keys())
+    frames = _load_files([os.path.join(directorio, archivos[m]) for m in meses], max_workers)
+
+    partes = []
+    validos = {}
+    columnas = {}
+    for mes, df in zip(meses, frames):
+        if mes != DEFAULT_KEY and not all(col in df.columns for col in REQUIRED_COLS):
+            print(f"⚠️ {archivos[mes]} no tiene las columnas requeridas: {REQUIRED_COLS}")
+            continue
+        validos[mes] = archivos[mes]
+        columnas[mes] = list(df.columns)
+        partes.append(df.assign(
+            mes=mes,
+            mes_num=MESES_ESPANOL.index(mes) if mes in MESES_ESPANOL else 0,
+            archivo=archivos[mes]
+        ))
+
+    if partes:
+        table = pd.concat(partes, ignore_index=True)
+    else:
+        table = pd.DataFrame(columns=REQUIRED_COLS + ['mes', 'mes_num', 'archivo'])
+    table = table.set_index(['mes', 'RUTA']).sort_index()
+
+    return RutasCatalog(table, validos, columnas)
+
+
+def get_rutas_catalog(directorio='.', max_workers=None):
+    """
+    Devuelve el catálogo de rutas del directorio. Se reutiliza la tabla persistida
+    si las huellas (mtime y tamaño) de todos los archivos coinciden con el manifiesto.
+    """
+    archivos = scan_rutas_files(directorio)
+    fingerprints = _fingerprints(directorio, archivos)
+    key = os.path.abspath(directorio)
+
+    cached = _CATALOGS.get(key)
+    if cached is not None and cached[0] == fingerprints:
+        return cached[1]
+
+    manifest = _load_manifest(directorio)
+    if manifest and manifest.get('fingerprints') == fingerprints and 'columnas' in manifest:
+        try:
+            table = read_frame(os.path.join(directorio, CACHE_DIR_NAME, manifest['tabla']))
+            catalog = RutasCatalog(table, manifest['validos'], manifest['columnas'])
+            _CATALOGS[key] = (fingerprints, catalog)
+            return catalog
+        except Exception as e:
+            print(f"⚠️ Catálogo de rutas inválido, se reconstruye: {e}")
+
+    catalog = build_catalog(directorio, max_workers)
+
+    try:
+        cache_dir = os.path.join(directorio, CACHE_DIR_NAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        tabla_path = write_frame(catalog.table, os.path.join(cache_dir, 'rutas_catalog_tabla'))
+        if manifest and manifest.get('tabla') not in (None, os.path.basename(tabla_path)):
+            old_path = os.path.join(cache_dir, manifest['tabla'])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        _save_manifest(directorio, {
+            'fingerprints': fingerprints,
+            'validos': catalog.archivos,
+            'columnas': catalog.columnas,
+            'tabla': os.path.basename(tabla_path)
+        })
+    except Exception as e:
+        print(f"⚠️ No se pudo persistir el catálogo de rutas: {e}")
+
+    _CATALOGS[key] = (fingerprints, catalog)
+    return catalog
+
+
+def build_rutas_scd(catalog):
+    """
+    Construye la dimensión de asignaciones versionada en el tiempo (SCD tipo 2) a partir
+    de las BDs mensuales del catálogo: una fila por RUTA y periodo continuo con el mismo
+    SUPERVISOR/CONTRATISTA, con valid_from/valid_to expresados como número de mes.
+
+    Cada BD mensual es una foto que sigue vigente hasta la siguiente BD mensual; si una ruta
+    desaparece de una foto posterior su versión se cierra en el mes anterior. La última
+    versión queda abierta hasta diciembre. Los archivos no indican año, por lo que los meses
+    se interpretan dentro del año de los feedbacks.
+    """
+    meses_archivo = [MESES_ESPANOL.index(mes) for mes in catalog.meses]
+    if not meses_archivo:
+        return pd.DataFrame(columns=SCD_COLS)
+
+    fotos = catalog.table.reset_index()
+    fotos = fotos[fotos['mes'] != DEFAULT_KEY]
+    fotos = fotos.drop_duplicates(subset=['mes_num', 'RUTA'], keep='first').copy()
+    for col in ['SUPERVISOR', 'CONTRATISTA']:
+        fotos[col] = fotos[col].astype(str).str.strip()
+
+    fotos = fotos.sort_values(['RUTA', 'mes_num'], kind='mergesort').reset_index(drop=True)
+    fotos['_pos'] = fotos['mes_num'].map({mes: i for i, mes in enumerate(meses_archivo)})
+
+    # Nueva versión cuando cambia la ruta, la asignación o la ruta faltó en la foto anterior
+    anterior = fotos.shift(1)
+    nueva_version = (
+        (fotos['RUTA'] != anterior['RUTA']) |
+        (fotos['SUPERVISOR'] != anterior['SUPERVISOR']) |
+        (fotos['CONTRATISTA'] != anterior['CONTRATISTA']) |
+        (fotos['_pos'] != anterior['_pos'] + 1)
+    )
+    fotos['_version'] = nueva_version.cumsum()
+
+    columnas = [c for c in fotos.columns if c not in ('mes', 'mes_num', '_pos', '_version')]
+    versiones = fotos.groupby('_version', sort=False)
+    scd = versiones[columnas].first()
+    scd['valid_from'] = versiones['mes_num'].min()
+
+    # La versión termina el mes anterior a la siguiente foto (o en diciembre si es la última)
+    siguiente_pos = versiones['_pos'].max() + 1
+    inicio_siguiente = np.append(np.array(meses_archivo), 13)
+    scd['valid_to'] = inicio_siguiente[siguiente_pos.clip(upper=len(meses_archivo)).to_numpy()] - 1
+
+    return scd.reset_index(drop=True)
@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+import normalizador_clientes
+from ingesta_incremental import AGREGADOS, ingest_incremental
+
+
+def _feedbacks(filas):
+    """Feedbacks con las columnas que usa la ingesta; id_tema es el mismo en todas, como en el Excel"""
+    return pd.DataFrame([
+        {
+            'id_tema': 564198939,
+            'fecha_registro': pd.Timestamp(registro),
+            'codigo_cliente': f'{codigo} {nombre}',
+            'ruta': ruta,
+            'nombre_cliente': nombre,
+            'fecha_cierre': pd.Timestamp(cierre) if cierre else pd.NaT,
+            'respuesta_sub': motivo
+        }
+        for registro, codigo, nombre, ruta, cierre, motivo in filas
+    ])
+
+
+BASE = [
+    ('2025-05-05 08:00', '13151095', 'S.S. EL FARO', 'DS0054', '2025-05-05 10:00', 'Cliente reiterativo en rechazo'),
+    ('2025-05-06 09:00', '13121866', 'ADELA JIMENEZ', 'DS0054', None, 'Cliente demorado en recibir o pagar'),
+    ('2025-05-06 09:00', '13121866', 'ADELA JIMENEZ', 'DS0054', None, 'Cliente demorado en recibir o pagar'),
+    ('2025-06-10 11:00', '13146724', 'CRISTINA CASTRO', 'DS0012', None, 'Cliente con novedad en envase'),
+]
+
+
+@pytest.fixture
+def excel(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(normalizador_clientes, '_NORMALIZADOR', None)
+    path = str(tmp_path / 'Feedbacks H1.xlsx')
+
+    def escribir(df):
+        df.to_excel(path, index=False)
+        return path
+
+    return escribir
+
+
+def _sin_orden(agregado):
+    return agregado.sort_index()
+
+
+def _assert_igual_a_reconstruccion(path):
+    incremental = ingest_incremental(path)
+    reconstruido = ingest_incremental(path, rebuild=True)
+
+    pd.testing.assert_frame_equal(incremental.feedbacks, reconstruido.feedbacks, check_dtype=False)
+    for nombre in AGREGADOS:
+        pd.testing.assert_series_equal(_sin_orden(incremental.agregados[nombre]),
+                                       _sin_orden(reconstruido.agregados[nombre]), check_dtype=False)
+    pd.testing.assert_frame_equal(incremental.clientes, reconstruido.clientes, check_dtype=False)
+    return incremental
+
+
+def test_append_equals_rebuild(excel):
+    path = excel(_feedbacks(BASE))
+    ingest_incremental(path, rebuild=True)
+
+    excel(_feedbacks(BASE + [
+        ('2025-06-20 08:00', '13151095', 'CALLEJA, S.A DE C.V', 'DS0012', None, 'Cliente problemático o grosero')
+    ]))
+    resultado = _assert_igual_a_reconstruccion(path)
+    assert len(resultado.feedbacks) == len(BASE) + 1
+
+
+def test_same_day_append_equals_rebuild(excel):
+    path = excel(_feedbacks(BASE))
+    ingest_incremental(path, rebuild=True)
+
+    # Misma fecha_registro que la última fila ingerida
+    excel(_feedbacks(BASE + [
+        ('2025-06-10 11:00', '13121866', 'ADELA JIMENEZ', 'DS0012', None, 'Cliente reiterativo en rechazo')
+    ]))
+    resultado = _assert_igual_a_reconstruccion(path)
+    assert len(resultado.feedbacks) == len(BASE) + 1
+
+
+def test_late_closure_equals_rebuild(excel):
+    path = excel(_feedbacks(BASE))
+    ingest_incremental(path, rebuild=True)
+
+    cerrados = list(BASE)
+    cerrados[1] = cerrados[1][:4] + ('2025-05-08 16:00',) + cerrados[1][5:]
+    cerrados[3] = cerrados[3][:4] + ('2025-06-11 09:00',) + cerrados[3][5:]
+    excel(_feedbacks(cerrados))
+
+    resultado = ingest_incremental(path)
+    assert resultado.filas_nuevas == 2
+    assert resultado.filas_modificadas == 2
+    assert len(resultado.feedbacks) == len(BASE)
+    _assert_igual_a_reconstruccion(path)
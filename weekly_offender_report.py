@@ -4,14 +4,17 @@ from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
 from reportlab.lib.units import inch
 import calendar
 import os
-import re
 import io
+import time
+from cartas_lote import render_batch
+from clasificador_incidencias import action_plans, classify_issue
+from plantilla_cartas import get_plantilla
+from feedbacks_core import load_dataset, MES_INGLES_A_ESPANOL, RUTAS_DEFAULT_FILE
+from ingesta_incremental import ingest_incremental
 
 # Define function to get signatures based on date
 def get_signatures_for_date(week, year):
@@ -48,167 +51,93 @@ SIGNATURES = [
     {"name": "Brian Lazo", "title": "Coordinador de Distribución"}
 ]
 
-# Planes de acción simplificados y escalables
-MOTIVO_ACTION_PLANS = {
-    # Top 1: Cliente demorado en recibir o pagar (30.2% de casos)
-    'Cliente demorado en recibir o pagar': {
-        'plan': 'Coordinación previa con cliente y ventana horaria específica',
-        'intro': 'demoras en recepción y pago',
-        'accion_especifica': 'coordinación previa y ventanas horarias',
-        'objetivo': 'reducir demoras en la ruta',
-        'conclusion': 'mejorando la eficiencia operativa'
-    },
-    
-    # Top 2: Cliente crítico en atención (Safety) (25.4% de casos)
-    'Cliente critico en atención (ubicación y/o acceso) - Requiere visita de Safety': {
-        'plan': 'Evaluación de seguridad y protocolo de entrega segura',
-        'intro': 'situaciones críticas de seguridad',
-        'accion_especifica': 'evaluación de seguridad especializada',
-        'objetivo': 'garantizar la seguridad del personal',
-        'conclusion': 'protegiendo al equipo'
-    },
-    
-    # Top 3: Cliente con novedad en envase (5.9% de casos)
-    'Cliente con novedad en envase': {
-        'plan': 'Inspección de envases y protocolo de limpieza',
-        'intro': 'problemas con envases',
-        'accion_especifica': 'inspección y limpieza de envases',
-        'objetivo': 'entregar envases en buen estado',
-        'conclusion': 'eliminando reclamos'
-    },
-    
-    # Top 4: Cliente reiterativo en rechazo (5.6% de casos)
-    'Cliente reiterativo en rechazo': {
-        'plan': 'Análisis de causas y ajuste de pedidos',
-        'intro': 'rechazos repetitivos',
-        'accion_especifica': 'análisis de causas y ajuste según histórico',
-        'objetivo': 'reducir rechazos',
-        'conclusion': 'mejorando la aceptación'
-    },
-    
-    # Top 5: Cliente problemático o grosero (4.9% de casos)
-    'Cliente problemático o grosero': {
-        'plan': 'Capacitación en manejo de clientes difíciles',
-        'intro': 'clientes problemáticos',
-        'accion_especifica': 'capacitación especializada',
-        'objetivo': 'mantener ambiente profesional',
-        'conclusion': 'asegurando calidad del servicio'
-    },
-    
-    # Otros motivos identificados en el análisis
-    'Faltante de producto': {
-        'plan': 'Checklist de verificación y control de inventario',
-        'intro': 'faltantes de productos',
-        'accion_especifica': 'checklist de verificación',
-        'objetivo': 'asegurar disponibilidad completa',
-        'conclusion': 'eliminando faltantes'
-    },
-    
-    'Calidad del producto (avería, rotura, mal olor, mala presentación)': {
-        'plan': 'Control de calidad pre-despacho',
-        'intro': 'problemas de calidad',
-        'accion_especifica': 'control de calidad previo',
-        'objetivo': 'asegurar calidad óptima',
-        'conclusion': 'eliminando reclamos'
-    }
-}
-
 def load_data():
-    """Load and preprocess the feedback data"""
+    """
+    Load the shared FeedbackDataset (derived columns + routes merge computed once).
+    Returns (feedbacks with routes, routes database).
+    """
     try:
-        # Load the feedbacks data
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
-        
-        # Convert date columns
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
-        feedbacks_df['fecha_cierre'] = pd.to_datetime(feedbacks_df['fecha_cierre'])
+        # Prefer the route database of the current month, fall back to the default one
+        month_esp = MES_INGLES_A_ESPANOL.get(datetime.now().strftime("%B"))
+        month_file = f'BD_Rutas_{month_esp}.xlsx'
+        rutas_path = month_file if os.path.exists(month_file) else RUTAS_DEFAULT_FILE
         
-        # Create time-based columns for analysis
-        feedbacks_df['year'] = feedbacks_df['fecha_registro'].dt.year
-        feedbacks_df['month'] = feedbacks_df['fecha_registro'].dt.month
-        feedbacks_df['week'] = feedbacks_df['fecha_registro'].dt.isocalendar().week
-        feedbacks_df['weekday'] = feedbacks_df['fecha_registro'].dt.day_name()
-        
-        # Calculate resolution time in days for closed issues
-        feedbacks_df['tiempo_cierre_dias'] = (
-            feedbacks_df['fecha_cierre'] - feedbacks_df['fecha_registro']
-        ).dt.days.fillna(0)
-        
-        # Try to load the routes database
         try:
-            # First try to load the most recent month-specific database
-            current_month = datetime.now().strftime("%B")
-            month_map = {
-                'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
-                'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
-                'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
-                'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-            }
-            month_esp = month_map.get(current_month, current_month)
-            
-            month_file = f'BD_Rutas_{month_esp}.xlsx'
-            if os.path.exists(month_file):
-                rutas_df = pd.read_excel(month_file)
-            else:
-                rutas_df = pd.read_excel('BD_Rutas.xlsx')
-                
-            # Merge with the routes data
-            merged_df = feedbacks_df.merge(
-                rutas_df,
-                left_on='ruta',
-                right_on='RUTA',
-                how='left'
-            )
-            
-            return merged_df, rutas_df
-            
+            dataset = load_dataset(rutas_path=rutas_path)
+            return dataset.merged, dataset.rutas
         except Exception as e:
             print(f"Warning: Could not load routes database. Using only feedbacks data: {e}")
-            return feedbacks_df, None
+            return ingest_incremental().feedbacks, None
             
     except Exception as e:
         print(f"Error loading data: {e}")
         return None, None
 
-def is_valid_client(client_code, client_name):
+# Columns of the offenders frame used by the weekly report
+OFFENDER_COLUMNS = ['codigo_cliente', 'nombre_cliente', 'count', 'most_reported_issue',
+                    'action_plan', 'routes', 'last_date']
+
+def compute_weekly_offenders(data, year, weeks=None, top_n=5):
     """
-    Check if a client code and name are valid based on requirements
-    Invalid examples: 'Cliente-0 Bodega', 'Cliente-00 000', 'Cliente-0001', points, commas, etc.
+    Top N valid clients of the most reported issue for every week of a year, computed in one
+    grouped pass over (year, week, respuesta_sub, cliente_id) instead of one filter per week.
+    Name, code and validity of each client come from that week's own issue rows, using the
+    client columns derived once at ingest: the first row's canonical name and numeric code,
+    valid if that row is valid (cliente_valido) and none of the client's codes is invalid.
+    A past report does not change when later data renames a client.
+    Returns {week: offenders DataFrame} with the columns of get_weekly_offenders; weeks without
+    valid offenders are not included.
     """
-    # Check for invalid patterns in code
-    if not isinstance(client_code, str):
-        client_code = str(client_code)
-        
-    invalid_code_patterns = [
-        r'^0+$',                  # All zeros
-        r'^0+\s*[Bb]odega$',      # Zeros followed by "Bodega"
-        r'^[0]+\s*$',             # Just zeros with spaces
-        r'^[.,]+$',               # Just dots or commas
-        r'^\s*$',                 # Empty or just spaces
-        r'^0001\.*$'              # "0001" pattern possibly followed by dots
-    ]
-    
-    # Check for invalid patterns in name
-    if not isinstance(client_name, str):
-        client_name = str(client_name)
-        
-    invalid_name_patterns = [
-        r'^[.,]+$',               # Just dots or commas
-        r'^\s*$',                 # Empty or just spaces
-        r'^[Bb]odega$',           # Just "Bodega"
-        r'^[0-9,.\s]+$'           # Just numbers, commas, dots and/or spaces
+    mask = (data['year'] == year) & data['respuesta_sub'].notna() & data['cliente_id'].notna()
+    if weeks is not None:
+        mask &= data['week'].isin(list(weeks))
+    year_data = data.loc[mask, ['week', 'respuesta_sub', 'cliente_id', 'codigo_numerico', 'nombre_canonico',
+                                'codigo_valido', 'cliente_valido', 'ruta', 'fecha_registro']]
+    if year_data.empty:
+        return {}
+    
+    # Most reported issue of each week
+    issue_counts = year_data.groupby(['week', 'respuesta_sub']).size().rename('issue_count').reset_index()
+    top_issues = (issue_counts.sort_values(['week', 'issue_count'], ascending=[True, False], kind='mergesort')
+                  .drop_duplicates(subset=['week'])[['week', 'respuesta_sub']])
+    issue_data = year_data.merge(top_issues, on=['week', 'respuesta_sub'])
+    
+    # Count per client of the week's issue, with the name and code of its first row in the week
+    clients = issue_data.groupby(['week', 'cliente_id']).agg(
+        count=('cliente_id', 'size'),
+        codigo_cliente=('codigo_numerico', 'first'),
+        nombre_cliente=('nombre_canonico', 'first'),
+        first_valid=('cliente_valido', 'first'),
+        codes_valid=('codigo_valido', 'all')
+    ).reset_index()
+    clients['valid'] = clients['first_valid'].astype(bool) & clients['codes_valid'].astype(bool)
+    
+    # Most reported first and top N valid clients of each week; each week is sorted on its own,
+    # by code and then by count, so ties keep the order of the single-week report
+    clients = clients.sort_values(['week', 'codigo_cliente'], kind='mergesort')
+    top_clients = [
+        frame.sort_values('count', ascending=False).loc[lambda df: df['valid']].head(top_n)
+        for _, frame in clients.groupby('week')
     ]
-    
-    # Check if any invalid pattern matches
-    for pattern in invalid_code_patterns:
-        if re.match(pattern, client_code):
-            return False
-    
-    for pattern in invalid_name_patterns:
-        if re.match(pattern, client_name):
-            return False
-    
-    return True
+    top_clients = pd.concat(top_clients) if top_clients else pd.DataFrame()
+    if top_clients.empty:
+        return {}
+    
+    # Routes and last report date only for the selected clients
+    selected = issue_data.merge(top_clients[['week', 'cliente_id']], on=['week', 'cliente_id'])
+    details = selected.groupby(['week', 'cliente_id']).agg(
+        routes=('ruta', lambda rutas: rutas.unique().tolist()),
+        last_date=('fecha_registro', 'max')
+    )
+    top_clients = top_clients.join(details, on=['week', 'cliente_id'])
+    top_clients['last_date'] = pd.to_datetime(top_clients['last_date']).dt.strftime('%d/%m/%Y')
+    top_clients['most_reported_issue'] = top_clients['week'].map(top_issues.set_index('week')['respuesta_sub'])
+    top_clients['action_plan'] = action_plans(top_clients['most_reported_issue'])
+    
+    return {
+        int(week): frame[OFFENDER_COLUMNS].reset_index(drop=True)
+        for week, frame in top_clients.groupby('week')
+    }
 
 def get_weekly_offenders(data, week=None, year=None, top_n=5):
     """
@@ -223,176 +152,55 @@ def get_weekly_offenders(data, week=None, year=None, top_n=5):
     if year is None:
         year = datetime.now().year
     
-    # Filter by week and year
-    weekly_data = data[
-        (data['week'] == week) &
-        (data['year'] == year)
-    ]
-    
-    # If there's no data for the specified week, return empty dataframe
-    if weekly_data.empty:
-        return pd.DataFrame()
-    
-    # Find the most reported issue for the week
-    issue_counts = weekly_data['respuesta_sub'].value_counts()
-    if issue_counts.empty:
-        return pd.DataFrame()
-    
-    most_reported_issue = issue_counts.idxmax()    # Filter by the most reported issue
-    issue_data = weekly_data[weekly_data['respuesta_sub'] == most_reported_issue]
-    
-    # PRIMERO: Limpiar nombres duplicados en los datos originales
-    def clean_name_universal(name):
-        """Limpiar nombres duplicados universalmente"""
-        clean_name = str(name).strip()
-        clean_name = re.sub(r'\s+', ' ', clean_name.strip())
-        
-        # Método 1: División de palabras para detectar duplicaciones
-        words = clean_name.split()
-        total_words = len(words)
-        
-        if total_words >= 2:
-            for split_point in range(1, total_words):
-                first_part = words[:split_point]
-                remaining_words = words[split_point:]
-                
-                if len(remaining_words) == len(first_part):
-                    if [w.lower() for w in first_part] == [w.lower() for w in remaining_words]:
-                        clean_name = " ".join(first_part)
-                        break
-        
-        # Método 2: Regex para duplicaciones
-        iteration = 0
-        max_iterations = 10
-        
-        while iteration < max_iterations:
-            prev_name = clean_name
-            clean_name = re.sub(r'(.+?)\s+\1$', r'\1', clean_name, flags=re.IGNORECASE)
-            clean_name = re.sub(r'^(.+?)\s+\1\s*$', r'\1', clean_name, flags=re.IGNORECASE)
-            clean_name = re.sub(r'^(.{2,})\1$', r'\1', clean_name, flags=re.IGNORECASE)
-            
-            if clean_name == prev_name:
-                break
-            iteration += 1
-        
-        # Método 3: Verificación de caracteres sin espacios
-        if len(clean_name) > 4:
-            text_no_spaces = clean_name.replace(' ', '')
-            text_length = len(text_no_spaces)
-            
-            if text_length % 2 == 0:
-                mid = text_length // 2
-                first_half = text_no_spaces[:mid]
-                second_half = text_no_spaces[mid:]
-                
-                if first_half.lower() == second_half.lower():
-                    original_words = clean_name.split()
-                    if len(original_words) % 2 == 0:
-                        half_words = len(original_words) // 2
-                        clean_name = " ".join(original_words[:half_words])
-        
-        # Método 4: Eliminar palabras duplicadas consecutivas
-        final_words = []
-        words = clean_name.split()
-        prev_word = ""
-        
-        for word in words:
-            if word.lower() != prev_word.lower():
-                final_words.append(word)
-                prev_word = word
-        
-        if final_words:
-            clean_name = " ".join(final_words)
-            
-        return clean_name    # Aplicar limpieza de nombres ANTES del groupby (corregir warning de pandas)
-    issue_data = issue_data.copy()  # Crear una copia para evitar el warning
-    issue_data['nombre_cliente_clean'] = issue_data['nombre_cliente'].apply(clean_name_universal)
-    
-    # Extraer solo el código numérico del inicio de codigo_cliente
-    issue_data['codigo_numerico'] = issue_data['codigo_cliente'].str.extract(r'^(\d+)')[0]
-    
-    # Group by NUMERIC client CODE only and count occurrences
-    # Esto evita que el mismo cliente aparezca múltiples veces con nombres diferentes
-    client_counts = issue_data.groupby('codigo_numerico').agg({
-        'nombre_cliente_clean': 'first',  # Tomar el primer nombre limpio
-        'codigo_numerico': 'size'          # Contar ocurrencias
-    }).rename(columns={'codigo_numerico': 'count'}).reset_index()
-    
-    # Renombrar la columna para que el resto del código funcione
-    client_counts = client_counts.rename(columns={'nombre_cliente_clean': 'nombre_cliente', 'codigo_numerico': 'codigo_cliente'})
-    client_counts = client_counts.sort_values('count', ascending=False)
-      # Filter out invalid clients 
-    valid_clients = client_counts[client_counts.apply(lambda x: is_valid_client(x['codigo_cliente'], x['nombre_cliente']), axis=1)]
-    
-    # Remove duplicates by client code only - keep first occurrence
-    valid_clients = valid_clients.drop_duplicates(subset=['codigo_cliente'], keep='first')
-      # Get top N valid clients (limit to requested number)
-    top_clients = valid_clients.head(top_n)
-    
-    # Add details for each client
-    results = []
-    for _, client in top_clients.iterrows():
-        client_code = client['codigo_cliente']
-        client_name = client['nombre_cliente']
-        client_issue_count = client['count']
-          # Get the client's specific data using numeric code
-        client_data = issue_data[issue_data['codigo_numerico'] == client_code]        # Generate a comprehensive action plan based on the specific issue and client data
-        def generate_specific_action_plan(issue_type, client_feedback_data):
-            """Generate specific action plan based on the issue type and historical analysis"""
-            
-            # Buscar el plan específico en nuestro diccionario de motivos
-            if issue_type in MOTIVO_ACTION_PLANS:
-                return MOTIVO_ACTION_PLANS[issue_type]['plan']
-            
-            # Si no encuentra el motivo exacto, buscar por palabras clave
-            issue_lower = issue_type.lower()
-            
-            # Buscar coincidencias parciales para motivos similares
-            for motivo_key, motivo_data in MOTIVO_ACTION_PLANS.items():
-                motivo_key_lower = motivo_key.lower()
-                
-                # Coincidencias específicas por palabras clave
-                if ('demorado' in issue_lower or 'demora' in issue_lower or 'espera' in issue_lower) and 'demorado' in motivo_key_lower:
-                    return motivo_data['plan']
-                elif ('safety' in issue_lower or 'critico' in issue_lower or 'acceso' in issue_lower) and 'critico' in motivo_key_lower:
-                    return motivo_data['plan']
-                elif ('envase' in issue_lower or 'canasta' in issue_lower) and 'envase' in motivo_key_lower:
-                    return motivo_data['plan']
-                elif ('rechazo' in issue_lower or 'rechaza' in issue_lower) and 'rechazo' in motivo_key_lower:
-                    return motivo_data['plan']
-                elif ('problemático' in issue_lower or 'grosero' in issue_lower) and 'problemático' in motivo_key_lower:
-                    return motivo_data['plan']
-                elif ('faltante' in issue_lower or 'falta' in issue_lower) and 'faltante' in motivo_key_lower:
-                    return motivo_data['plan']
-                elif ('calidad' in issue_lower or 'rotura' in issue_lower or 'avería' in issue_lower) and 'calidad' in motivo_key_lower:
-                    return motivo_data['plan']
-            
-            # Plan genérico si no encuentra coincidencia específica
-            return "Análisis personalizado de la situación, identificación de causa raíz y implementación de plan de mejora específico"
-        
-        action_plan = generate_specific_action_plan(most_reported_issue, client_data)
-        
-        # Add to results - el nombre ya está limpio del groupby
-        results.append({
-            'codigo_cliente': client_code,
-            'nombre_cliente': client_name,  # Ya está limpio
-            'count': client_issue_count,
-            'most_reported_issue': most_reported_issue,
-            'action_plan': action_plan,
-            'routes': client_data['ruta'].unique().tolist(),
-            'last_date': client_data['fecha_registro'].max().strftime('%d/%m/%Y')
-        })
-    
-    return pd.DataFrame(results)
+    offenders = compute_weekly_offenders(data, year, weeks=[week], top_n=top_n)
+    return offenders.get(int(week), pd.DataFrame())
+
+def weekly_report_path(week, year, output_dir=None):
+    """Output path of the weekly report, creating output_dir if needed"""
+    filename = f"weekly_offender_report_w{week}_{year}.pdf"
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        return os.path.join(output_dir, filename)
+    return filename
+
+def weekly_report_task(offenders_data, week, year):
+    """Inputs of one weekly report as plain values (hashed for the manifest and sent to the workers)"""
+    return {
+        'week': int(week),
+        'year': int(year),
+        'offenders': offenders_data[OFFENDER_COLUMNS].to_dict('records'),
+        'signatures': get_signatures_for_date(week, year),
+        'intro_text': classify_issue(offenders_data.iloc[0]['most_reported_issue']).intro_text(week)
+    }
 
-def generate_weekly_report(offenders_data, week, year, output_file="weekly_offender_report.pdf"):
+def generate_weekly_report(offenders_data, week, year, output_file="weekly_offender_report.pdf", force=False):
     """
-    Generate a PDF report with the weekly offenders and action plans
+    Generate a PDF report with the weekly offenders and action plans.
+    The report is skipped when its inputs (offenders, signatures, template version) did not
+    change since it was last generated, unless force=True.
     """
     if offenders_data.empty:
         print(f"No data available for week {week}, year {year}")
         return None
     
+    resumen = render_batch(render_weekly_report, [(output_file, weekly_report_task(offenders_data, week, year))],
+                           workers=1, force=force)
+    if resumen.errores:
+        print(f"Error generating report {output_file}: {resumen.errores[0][1]}")
+        return None
+    if resumen.omitidos:
+        print(f"Report unchanged, skipped: {output_file}")
+    else:
+        print(f"Report generated successfully: {output_file}")
+    return output_file
+
+def render_weekly_report(output_file, week, year, offenders, signatures=None, intro_text=None):
+    """
+    Build the weekly report PDF. Module-level so render_batch can run it in a worker process;
+    offenders is the list of records produced by weekly_report_task.
+    """
+    offenders_data = pd.DataFrame(offenders, columns=OFFENDER_COLUMNS)
+    
     # Create a buffer for PDF
     buffer = io.BytesIO()    # Create the PDF document with optimized margins to fit everything on one page
     doc = SimpleDocTemplate(
@@ -406,63 +214,11 @@ def generate_weekly_report(offenders_data, week, year, output_file="weekly_offen
         author="CD Soyapango",
         subject=f"Reporte Semana {week} del {year}"
     )
-      # Get styles - refined to match the example
-    styles = getSampleStyleSheet()
-    normal_style = styles['Normal']
-    
-    # Define styles for table cells with proper wrapping
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=normal_style,
-        fontSize=7,
-        leading=9,  # line spacing
-        alignment=0  # left aligned
-    )
-    
-    centered_cell_style = ParagraphStyle(
-        'CenteredCellStyle',
-        parent=normal_style,
-        fontSize=7,
-        leading=9,
-        alignment=1  # center aligned
-    )
-      # Main title style with reduced spacing
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        alignment=1,  # Center
-        fontSize=13,  # Slightly smaller font
-        fontName='Helvetica-Bold',
-        spaceAfter=0.05*inch,  # Reduce space after title
-        spaceBefore=0
-    )
-      # Subtitle style for week and problem with reduced spacing
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=11,  # Slightly smaller
-        fontName='Helvetica-Bold',
-        alignment=1,  # Center
-        spaceAfter=0.1*inch,  # Reduce space after
-        spaceBefore=0
-    )
-      # Normal text style with compact line spacing
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,   # Smaller font size
-        leading=13,   # Tighter line spacing
-        spaceBefore=3,  # Reduce space before
-        spaceAfter=3    # Reduce space after
-    )
-    
-    # Heading style for section headers
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading3'],
-        fontSize=11,
-        fontName='Helvetica-Bold'
-    )
+    # Shared template context: styles, logos and signature table styles built once per process
+    plantilla = get_plantilla()
+    styles = plantilla.styles
+    title_style = plantilla.semanal_titulo
+    subtitle_style = plantilla.semanal_subtitulo
     
     # Current date string
     current_date = datetime.now().strftime("%d de %B de %Y")
@@ -485,40 +241,11 @@ def generate_weekly_report(offenders_data, week, year, output_file="weekly_offen
     
     # Start building the document
     story = []    # Add the LA CONSTANCIA logo - smaller and left-aligned like in the example
-    try:
-        logo_path = "LogoConst.png"
-        logo_img = Image(logo_path, width=2*inch, height=0.8*inch)
-        logo_table = Table([[logo_img]], colWidths=[6*inch])
-        logo_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),  # Left-aligned like the example
-            ('VALIGN', (0, 0), (0, 0), 'TOP'),
-        ]))
-        story.append(logo_table)
-    except Exception as e:
-        print(f"Warning: Could not load logo image: {e}")
-        # Fallback to text if image fails
-        company_name = "LA CONSTANCIA"
-        subtitle = "ABInBev"
-        header_data = [[company_name], [subtitle]]
-        header_table = Table(header_data, colWidths=[6*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),  # Left-aligned to match logo
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (0, 0), 16),
-            ('FONTNAME', (0, 1), (0, 1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (0, 1), 12),
-        ]))
-        story.append(header_table)
+    story.append(plantilla.encabezado_logo())
     story.append(Spacer(1, 0.05*inch))  # Minimal spacing after logo
 
     # Add the date on the right side - positioned at the top right like in the example
-    date_style = ParagraphStyle(
-        'Date',
-        parent=styles['Normal'],
-        alignment=2,  # Right-aligned
-        fontSize=10
-    )
-    date_paragraph = Paragraph(tuesday_str, date_style)    
+    date_paragraph = Paragraph(tuesday_str, plantilla.fecha)    
     story.append(date_paragraph)
     story.append(Spacer(1, 0.1*inch))  # Minimal spacing after date
     
@@ -530,17 +257,9 @@ def generate_weekly_report(offenders_data, week, year, output_file="weekly_offen
     story.append(Spacer(1, 0.15*inch))  # Reduce spacing
     
     # Introduction paragraph - automatically adapted to the specific issue
-    intro_text = generate_intro_text(most_reported_issue, week)
+    intro_text = intro_text or classify_issue(most_reported_issue).intro_text(week)
     
-    # Create justified paragraph
-    justified_style = ParagraphStyle(
-        'Justified',
-        parent=normal_style,
-        alignment=4,  # 4 = justified
-        spaceBefore=6,
-        spaceAfter=6
-    )
-    story.append(Paragraph(intro_text, justified_style))
+    story.append(Paragraph(intro_text, plantilla.justificado))
     story.append(Spacer(1, 0.2*inch))  # Add space before the table
     
     # Add action plans table - prevent ALL duplicated entries with forced text wrapping
@@ -590,9 +309,6 @@ def generate_weekly_report(offenders_data, week, year, output_file="weekly_offen
             routes_text = ", ".join(client['routes'])
             routes_paragraph = wrap_routes_paragraph(routes_text, max_width=0.8*inch)
             
-            # Use current date for consistency with header
-            current_report_date = datetime.now().strftime("%d/%m/%Y")
-            
             action_plan_data.append([
                 client_paragraph,
                 routes_paragraph,
@@ -604,109 +320,29 @@ def generate_weekly_report(offenders_data, week, year, output_file="weekly_offen
               # Create simple table without complex formatting
     if len(action_plan_data) > 1:  # Only if we have data rows
         # Simple table con anchos de columna optimizados
-        action_table = Table(action_plan_data, colWidths=[2.0*inch, 0.8*inch, 2.5*inch, 0.8*inch])
-        action_table.setStyle(TableStyle([
-            # Headers
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            
-            # Data cells
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),      # Cliente
-            ('ALIGN', (1, 1), (1, -1), 'CENTER'),    # Rutas
-            ('ALIGN', (2, 1), (2, -1), 'LEFT'),      # Plan de Acción
-            ('ALIGN', (3, 1), (3, -1), 'CENTER'),    # Fecha
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            
-            # Grid y padding
-            ('GRID', (0, 0), (-1, -1), 0.75, colors.black),
-            ('LEFTPADDING', (0, 0), (-1, -1), 3),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ]))
+        action_table = Table(action_plan_data, colWidths=[2.0*inch, 0.8*inch, 2.5*inch, 0.8*inch],
+                             style=plantilla.estilo_plan_accion)
     else:
         # Simple placeholder when no data
-        action_table = Table([['No se encontraron clientes']], colWidths=[5.7*inch])
-        action_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (0, 0), 10),        ]))
+        action_table = Table([['No se encontraron clientes']], colWidths=[5.7*inch],
+                             style=plantilla.estilo_sin_clientes)
     
     story.append(action_table)
     story.append(Spacer(1, 0.2*inch))  # Minimal spacing before signatures
     
-    # Add signature section    
-    signature_style = ParagraphStyle(        'SignatureHeader',
-        parent=styles['Normal'],
-        fontName='Helvetica',
-        fontSize=9,    # Smaller font
-        leading=10,    # Tighter spacing
-        spaceBefore=6,  # Reduce space before        
-        spaceAfter=8   # Reduce space after
-    )
-    
-    story.append(Paragraph("Firma de enterados:", signature_style))
+    # Add signature section
+    story.append(Paragraph("Firma de enterados:", plantilla.firma_encabezado))
     story.append(Spacer(1, 0.15*inch))  # Reduce space for signatures
     
-    # Get appropriate signatures based on the week/year
-    current_signatures = get_signatures_for_date(week, year)
-    
-    # Create signatures table - matching the example layout exactly with more space
-    sig_data = []
-    # Create rows with 2 signatures per row, with more space for actual signatures
-    for i in range(0, len(current_signatures), 2):
-        row = []
-        for j in range(2):
-            idx = i + j
-            if idx < len(current_signatures):
-                sig = current_signatures[idx]
-                # Más espacio entre línea de firma y nombre para firmar adecuadamente
-                sig_cell = f"F.________________________________\n{sig['name']} - {sig['title']}"
-            else:
-                sig_cell = ""
-            row.append(sig_cell)
-        sig_data.append(row)
-    
-    # Create signature table with increased spacing for proper signing
-    sig_table = Table(sig_data, colWidths=[3*inch, 3*inch], rowHeights=[1.0*inch]*len(sig_data))  # Altura aumentada para más espacio
-    sig_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # Align to top for better spacing
-        ('FONTSIZE', (0, 0), (-1, -1), 8),  # Tamaño de letra
-        ('LEADING', (0, 0), (-1, -1), 12),  # Más espacio entre líneas
-        ('TOPPADDING', (0, 0), (-1, -1), 8),  # Más padding arriba
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12)  # Más padding abajo para separar filas
-    ]))
+    # Get appropriate signatures based on the week/year (2 per row, with room to sign)
+    current_signatures = signatures or get_signatures_for_date(week, year)
+    sig_table = plantilla.firmas_semanales(current_signatures)
     
     story.append(sig_table)
     # Add footer with DPO logo - reduced spacing to fit on one page
     story.append(Spacer(1, 0.2*inch))  # Reducir más el espacio
     
-    try:
-        dpo_logo_path = "dpo.png"
-        # Make DPO logo bigger and more visible like in the example
-        dpo_img = Image(dpo_logo_path, width=1.2*inch, height=0.8*inch)
-        dpo_table = Table([[dpo_img]], colWidths=[6*inch])
-        dpo_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-            ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
-        ]))
-        story.append(dpo_table)
-    except Exception as e:
-        print(f"Warning: Could not load DPO logo: {e}")
-        # Fallback to text if image fails - make it more visible
-        footer_table = Table([["DPO 2.0"]], colWidths=[6*inch])
-        footer_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (0, 0), 14),  # Bigger font size
-        ]))
-        story.append(footer_table)
+    story.append(plantilla.pie_dpo())
     
     # Build the PDF
     doc.build(story)
@@ -716,16 +352,16 @@ def generate_weekly_report(offenders_data, week, year, output_file="weekly_offen
     with open(output_file, 'wb') as f:
         f.write(buffer.read())
     
-    print(f"Report generated successfully: {output_file}")
     return output_file
 
-def main(specific_week=None, specific_year=None, output_dir=None):
+def main(specific_week=None, specific_year=None, output_dir=None, force=False):
     """Main function to generate the weekly offender report
     
     Args:
         specific_week: Optional specific week number to generate report for
         specific_year: Optional specific year to generate report for
         output_dir: Optional directory to save the report
+        force: Regenerate the report even if its inputs did not change
     """
     # Get current week number and year if not specified
     today = datetime.now()
@@ -762,14 +398,8 @@ def main(specific_week=None, specific_year=None, output_dir=None):
     
     # Generate the report
     if not offenders.empty:
-        # Create output directory if specified
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-            output_path = os.path.join(output_dir, f"weekly_offender_report_w{week_used}_{year_used}.pdf")
-        else:
-            output_path = f"weekly_offender_report_w{week_used}_{year_used}.pdf"
-            
-        report_path = generate_weekly_report(offenders, week_used, year_used, output_path)
+        output_path = weekly_report_path(week_used, year_used, output_dir)
+        report_path = generate_weekly_report(offenders, week_used, year_used, output_path, force=force)
         
         if report_path:
             print(f"Report generated successfully at: {report_path}")
@@ -784,62 +414,7 @@ def main(specific_week=None, specific_year=None, output_dir=None):
         print(msg)
         return None
 
-def generate_all_weekly_reports(year=None, output_dir=None):
-    """Generate reports for all weeks with data in the specified year
-    
-    Args:
-        year: Year to generate reports for (default: current year)
-        output_dir: Directory to save all reports
-    """
-    if year is None:
-        year = datetime.now().year
-    
-    print(f"Generating reports for all weeks with data in {year}...")
-    
-    # Load the data
-    data = load_data()
-    if data is None:
-        print("Error: Could not load data. Verify that 'Feedbacks H1.xlsx' exists.")
-        return []
-    
-    # Find all weeks with data
-    weekly_data = data[data['year'] == year]
-    weeks_with_data = sorted(weekly_data['week'].unique())
-    
-    print(f"Found data for {len(weeks_with_data)} weeks: {weeks_with_data}")
-    
-    generated_reports = []
-    
-    for week in weeks_with_data:
-        print(f"\n--- Generating report for week {week} ---")
-        
-        # Get offenders for this week
-        offenders = get_weekly_offenders(data, week=week, year=year)
-        
-        if not offenders.empty:
-            # Create output path
-            if output_dir:
-                import os
-                os.makedirs(output_dir, exist_ok=True)
-                output_path = os.path.join(output_dir, f"weekly_offender_report_w{week}_{year}.pdf")
-            else:
-                output_path = f"weekly_offender_report_w{week}_{year}.pdf"
-            
-            # Generate the report
-            report_path = generate_weekly_report(offenders, week, year, output_path)
-            
-            if report_path:
-                generated_reports.append(report_path)
-                print(f"✅ Report generated: {report_path}")
-            else:
-                print(f"❌ Failed to generate report for week {week}")
-        else:
-            print(f"⚠️  No valid offenders found for week {week}")
-    
-    print(f"\n🎉 Generation completed! Created {len(generated_reports)} reports.")
-    return generated_reports
-
-def generate_weekly_report_for_any_week(week_num, year_num=None):
+def generate_weekly_report_for_any_week(week_num, year_num=None, force=False):
     """Generate report for any specified week and year"""
     if year_num is None:
         year_num = datetime.now().year
@@ -857,147 +432,110 @@ def generate_weekly_report_for_any_week(week_num, year_num=None):
         return None
     
     # Generate the PDF report
-    output_file = f"weekly_offender_report_w{week_num}_{year_num}.pdf"
-    return generate_weekly_report(offenders_data, week_num, year_num, output_file)
+    output_file = weekly_report_path(week_num, year_num)
+    return generate_weekly_report(offenders_data, week_num, year_num, output_file, force=force)
 
-def generate_all_weekly_reports(year=None):
+def generate_weekly_reports_batch(data, year, weeks, output_dir=None, force=False, workers=1):
+    """
+    Generate the reports of several weeks of a year from data loaded once: the offenders of
+    every week come from a single grouped pass (compute_weekly_offenders) and the PDFs are
+    rendered with render_batch, in a process pool when workers > 1 (None uses every core).
+    Each worker only receives the compact task of its week (weekly_report_task), never the
+    loaded data.
+    Returns (ResumenLote, weeks without valid offenders, {week: report file}).
+    """
+    start = time.perf_counter()
+    offenders_by_week = compute_weekly_offenders(data, year, weeks=weeks)
+    missing_weeks = [week for week in weeks if int(week) not in offenders_by_week]
+    print(f"📊 Offenders de {len(offenders_by_week)} semanas calculados en {time.perf_counter() - start:.1f}s")
+    
+    report_files = {week: weekly_report_path(week, year, output_dir) for week in offenders_by_week}
+    tareas = [
+        (report_files[week], weekly_report_task(offenders, week, year))
+        for week, offenders in offenders_by_week.items()
+    ]
+    resumen = render_batch(render_weekly_report, tareas, workers=workers, force=force)
+    return resumen, missing_weeks, report_files
+
+WEEK_STATUS_ICONS = {
+    'generado': '✅',
+    'sin cambios': '⏭️',
+    'error': '❌'
+}
+
+def print_week_table(resumen, missing_weeks, report_files):
+    """Print one line per week of the batch: status and render time in its worker"""
+    errors = dict(resumen.errores)
+    print(f"\n⏱️ Detalle por semana ({resumen.workers} worker(s), {resumen.segundos:.1f}s en total):")
+    for week in sorted(set(report_files) | {int(week) for week in missing_weeks}):
+        filename = report_files.get(week)
+        if filename is None:
+            print(f"  ⚠️ Semana {week:>2}: sin clientes válidos")
+            continue
+        status = resumen.estado(filename)
+        line = f"  {WEEK_STATUS_ICONS.get(status, '❔')} Semana {week:>2}: {status}"
+        if filename in resumen.duraciones:
+            line += f" en {resumen.duraciones[filename]:.2f}s"
+        if filename in errors:
+            line += f" ({errors[filename]})"
+        print(line)
+
+def print_batch_summary(resumen, missing_weeks, title, report_files=None):
+    """Print the summary of a weekly batch and return (success_count, error_count)"""
+    resumen.imprimir("Reportes semanales")
+    if report_files is not None:
+        print_week_table(resumen, missing_weeks, report_files)
+    else:
+        for week in missing_weeks:
+            print(f"⚠️ No se encontraron clientes válidos para la semana {week}")
+    
+    reports = resumen.generados + resumen.omitidos
+    error_count = len(resumen.errores) + len(missing_weeks)
+    
+    print(f"\n📋 {title}:")
+    print(f"✅ Reportes generados exitosamente: {len(reports)}")
+    print(f"❌ Errores encontrados: {error_count}")
+    
+    if reports:
+        print(f"\n📁 Archivos generados:")
+        for report in sorted(reports):
+            print(f"  - {report}")
+    
+    return len(reports), error_count
+
+def generate_all_weekly_reports(year=None, output_dir=None, force=False, workers=1):
     """Generate reports for all weeks with data from the beginning of the year until current week"""
     if year is None:
         year = datetime.now().year
     
     print(f"Generando reportes para todas las semanas con datos en el año {year}")
     
-    # Load data to find the range of weeks with data
+    # Load data once for every week of the year
     data, routes_df = load_data()
     if data is None:
         print("Error: No se pudo cargar los datos")
         return 0, 1
     
-    # Filter data for the specified year
-    data_year = data[data['year'] == year].copy()
-    if data_year.empty:
+    # Get all unique weeks with data in the year
+    weeks_with_data = sorted(int(week) for week in data.loc[data['year'] == year, 'week'].dropna().unique())
+    if not weeks_with_data:
         print(f"No hay datos disponibles para el año {year}")
         return 0, 1
     
-    # Get all unique weeks with data in the year
-    weeks_with_data = sorted(data_year['week'].unique())
-    
-    # Get current week to avoid generating future reports
-    current_week = datetime.now().isocalendar().week
-    current_year = datetime.now().year
-    
-    # If we're looking at current year, limit to current week
-    if year == current_year:
+    # If we're looking at current year, limit to current week to avoid generating future reports
+    if year == datetime.now().year:
+        current_week = datetime.now().isocalendar().week
         weeks_with_data = [w for w in weeks_with_data if w <= current_week]
     
     print(f"Semanas con datos encontradas: {weeks_with_data}")
     print(f"Total de semanas a procesar: {len(weeks_with_data)}")
     
-    generated_reports = []
-    error_count = 0
-    
-    for i, week in enumerate(weeks_with_data, 1):
-        print(f"\n--- Procesando Semana {week} ({i}/{len(weeks_with_data)}) ---")
-        try:
-            result = generate_weekly_report_for_any_week(week, year)
-            if result:
-                filename = f"weekly_offender_report_w{week}_{year}.pdf"
-                generated_reports.append(filename)
-                print(f"✅ Reporte generado: {filename}")
-            else:
-                print(f"⚠️ No se pudieron generar datos para la semana {week}")
-                error_count += 1
-        except Exception as e:
-            print(f"❌ Error generando reporte para la semana {week}: {str(e)}")
-            error_count += 1
-    
-    print(f"\n📋 Resumen final:")
-    print(f"✅ Reportes generados exitosamente: {len(generated_reports)}")
-    print(f"❌ Errores encontrados: {error_count}")
-    
-    if generated_reports:
-        print(f"\n📁 Archivos generados:")
-        for report in generated_reports:
-            print(f"  - {report}")
-    
-    return len(generated_reports), error_count
-
-def classify_issue_type(issue_text):
-    """Classify the issue type for proper action plan assignment"""
-    if not issue_text:
-        return 'generic'
-    
-    issue_lower = str(issue_text).lower()
-    
-    # Clasificación específica por palabras clave
-    if any(word in issue_lower for word in ['faltante', 'producto', 'inventario', 'stock']):
-        return 'faltante_producto'
-    elif any(word in issue_lower for word in ['envase', 'canasta', 'sucio', 'roto', 'dañado']):
-        return 'envase_canasta'
-    elif any(word in issue_lower for word in ['pedido', 'orden', 'cantidad', 'solicitud']):
-        return 'pedido_orden'
-    elif any(word in issue_lower for word in ['entrega', 'delivery', 'tarde', 'hora', 'puntual']):
-        return 'entrega_delivery'
-    elif any(word in issue_lower for word in ['factura', 'documento', 'precio', 'dato']):
-        return 'factura_documento'
-    elif any(word in issue_lower for word in ['calidad', 'caducidad', 'fecha', 'vencimiento', 'sabor', 'olor']):
-        return 'calidad_caducidad'
-    elif any(word in issue_lower for word in ['servicio', 'atención', 'cordial', 'trato']):
-        return 'servicio_atencion'
-    elif any(word in issue_lower for word in ['ruta', 'vendedor', 'personal', 'ventas']):
-        return 'ruta_vendedor'
-    elif any(word in issue_lower for word in ['demora', 'demorado', 'recibir', 'pagar', 'espera']):
-        return 'cliente_demora'
-    elif any(word in issue_lower for word in ['safety', 'seguridad', 'crítico', 'peligro', 'riesgo']):
-        return 'safety_critico'
-    else:
-        return 'generic'
-
-def get_action_plan_for_issue(issue_type):
-    """Get the appropriate action plan for the classified issue type"""
-    action_plans = {
-        'faltante_producto': 'Checklist de verificación y control de inventario',
-        'envase_canasta': 'Inspección y limpieza de envases a ',
-        'pedido_orden': 'Verificación dual de cantidades',
-        'entrega_delivery': 'Optimización de rutas y comunicación',
-        'factura_documento': 'Capacitación en facturación',
-        'calidad_caducidad': 'Control de calidad y fechas',
-        'servicio_atencion': 'Capacitación en servicio al cliente',
-        'ruta_vendedor': 'Optimización de procedimientos',
-        'cliente_demora': 'Coordinación previa con clientes y BDR',
-        'safety_critico': 'Evaluación en RCOG con ventas de clientes criticos'
-    }
-    
-    issue_key = classify_issue_type(issue_type)
-    return action_plans.get(issue_key, "Análisis personalizado y plan de mejora específico")
-
-def get_intro_text_for_issue(issue_type, week_num):
-    """Get the appropriate intro text for the classified issue type"""
-    intro_texts = {
-        'faltante_producto': f"""El equipo de distribución del CD Soyapango informa sobre clientes con <b>faltante de productos</b> en la semana {week_num}. Se solicita implementar <b>checklist de verificación</b> para asegurar disponibilidad completa y optimizar la eficiencia de ruta. Detalles:""",
-        
-        'envase_canasta': f"""El equipo de distribución del CD Soyapango informa sobre problemas con <b>envases y canastas</b> en la semana {week_num}. Se solicita implementar <b>protocolo de inspección</b> para garantizar entrega en perfecto estado. Detalles:""",
-        
-        'pedido_orden': f"""El equipo de distribución del CD Soyapango informa sobre problemas en <b>toma de pedidos</b> en la semana {week_num}. Se solicita implementar <b>verificación dual</b> para asegurar precisión y evitar discrepancias. Detalles:""",
-        
-        'entrega_delivery': f"""El equipo de distribución del CD Soyapango informa sobre problemas de <b>puntualidad en entregas</b> en la semana {week_num}. Se solicita <b>optimización logística</b> para mejorar eficiencia y cumplir cronogramas. Detalles:""",
-        
-        'factura_documento': f"""El equipo de distribución del CD Soyapango informa sobre problemas de <b>documentación</b> en la semana {week_num}. Se solicita <b>mejora en procesos administrativos</b> para eliminar errores y reprocesos. Detalles:""",
-        
-        'calidad_caducidad': f"""El equipo de distribución del CD Soyapango informa sobre problemas de <b>calidad de productos</b> en la semana {week_num}. Se solicita implementar <b>controles de calidad</b> para asegurar productos óptimos. Detalles:""",
-        
-        'servicio_atencion': f"""El equipo de distribución del CD Soyapango informa sobre problemas de <b>servicio al cliente</b> en la semana {week_num}. Se solicita <b>capacitación en excelencia</b> para mejorar experiencia y satisfacción. Detalles:""",
-        
-        'ruta_vendedor': f"""El equipo de distribución del CD Soyapango informa sobre problemas en <b>procedimientos de ruta</b> en la semana {week_num}. Se solicita <b>optimización de procesos</b> para mejorar eficiencia operativa. Detalles:""",
-        
-        'cliente_demora': f"""El equipo de distribución del CD Soyapango informa sobre <b>demoras en recepción</b> en la semana {week_num}. Se solicita <b>mejora en comunicación</b> para minimizar tiempos de espera. Detalles:""",
-        
-        'safety_critico': f"""El equipo de distribución del CD Soyapango informa sobre <b>condiciones de seguridad</b> en la semana {week_num}. Se solicita implementar <b>protocolos de seguridad</b> para garantizar operación segura. Detalles:"""    }
-    
-    issue_key = classify_issue_type(issue_type)
-    return intro_texts.get(issue_key, f"""El equipo de distribución del CD Soyapango informa sobre problemas diversos en la semana {week_num}. Se solicita <b>implementar mejoras específicas</b> para optimizar procesos y completar jornadas eficientemente. Detalles:""")
+    resumen, missing_weeks, report_files = generate_weekly_reports_batch(
+        data, year, weeks_with_data, output_dir=output_dir, force=force, workers=workers
+    )
+    return print_batch_summary(resumen, missing_weeks, "Resumen final", report_files)
 
-def generate_monthly_reports(month=None, year=None):
+def generate_monthly_reports(month=None, year=None, force=False, output_dir=None, workers=1):
     """Generate reports for all weeks in a specified month that have data"""
     if month is None:
         month = datetime.now().month
@@ -1006,108 +544,26 @@ def generate_monthly_reports(month=None, year=None):
     
     print(f"Generando reportes para todas las semanas con datos en {calendar.month_name[month]} {year}")
     
-    # Load data to find the range of weeks with data
+    # Load data once for every week of the month
     data, routes_df = load_data()
     if data is None:
         print("Error: No se pudo cargar los datos")
         return 0, 1
     
-    # Filter data for the specified month and year
-    data_filtered = data[(data['year'] == year) & (data['month'] == month)].copy()
-    if data_filtered.empty:
+    # Get all unique weeks with data in the month
+    month_mask = (data['year'] == year) & (data['month'] == month)
+    weeks_with_data = sorted(int(week) for week in data.loc[month_mask, 'week'].dropna().unique())
+    if not weeks_with_data:
         print(f"No hay datos disponibles para {calendar.month_name[month]} {year}")
         return 0, 1
     
-    # Get all unique weeks with data in the month
-    weeks_with_data = sorted(data_filtered['week'].unique())
-    
     print(f"Semanas con datos en {calendar.month_name[month]}: {weeks_with_data}")
     print(f"Total de semanas a procesar: {len(weeks_with_data)}")
     
-    generated_reports = []
-    error_count = 0
-    
-    for i, week in enumerate(weeks_with_data, 1):
-        print(f"\n--- Procesando Semana {week} ({i}/{len(weeks_with_data)}) ---")
-        try:
-            result = generate_weekly_report_for_any_week(week, year)
-            if result:
-                filename = f"weekly_offender_report_w{week}_{year}.pdf"
-                generated_reports.append(filename)
-                print(f"✅ Reporte generado: {filename}")
-            else:
-                print(f"⚠️ No se pudieron generar datos para la semana {week}")
-                error_count += 1
-        except Exception as e:
-            print(f"❌ Error generando reporte para la semana {week}: {str(e)}")
-            error_count += 1
-    
-    print(f"\n📋 Resumen del mes:")
-    print(f"✅ Reportes generados exitosamente: {len(generated_reports)}")
-    print(f"❌ Errores encontrados: {error_count}")
-    
-    if generated_reports:
-        print(f"\n📁 Archivos generados:")
-        for report in generated_reports:
-            print(f"  - {report}")
-    
-    return len(generated_reports), error_count
-
-# Nueva función para generar el texto introductorio específico
-def generate_intro_text(issue_type, week_num):
-    """Generate specific introduction text based on the issue type and historical analysis"""
-    
-    # Buscar el texto específico en nuestro diccionario de motivos
-    if issue_type in MOTIVO_ACTION_PLANS:
-        motivo_data = MOTIVO_ACTION_PLANS[issue_type]
-        intro = motivo_data['intro']
-        accion_especifica = motivo_data['accion_especifica'] 
-        objetivo = motivo_data['objetivo']
-        conclusion = motivo_data['conclusion']
-    else:
-        # Buscar coincidencias parciales para motivos similares
-        issue_lower = issue_type.lower()
-        motivo_data = None
-        
-        for motivo_key, data in MOTIVO_ACTION_PLANS.items():
-            motivo_key_lower = motivo_key.lower()
-            
-            if ('demorado' in issue_lower or 'demora' in issue_lower) and 'demorado' in motivo_key_lower:
-                motivo_data = data
-                break
-            elif ('safety' in issue_lower or 'critico' in issue_lower) and 'critico' in motivo_key_lower:
-                motivo_data = data
-                break
-            elif ('envase' in issue_lower) and 'envase' in motivo_key_lower:
-                motivo_data = data
-                break
-            elif ('rechazo' in issue_lower) and 'rechazo' in motivo_key_lower:
-                motivo_data = data
-                break
-            elif ('problemático' in issue_lower or 'grosero' in issue_lower) and 'problemático' in motivo_key_lower:
-                motivo_data = data
-                break
-            elif ('faltante' in issue_lower) and 'faltante' in motivo_key_lower:
-                motivo_data = data
-                break
-            elif ('calidad' in issue_lower) and 'calidad' in motivo_key_lower:
-                motivo_data = data
-                break
-        
-        if motivo_data:
-            intro = motivo_data['intro']
-            accion_especifica = motivo_data['accion_especifica']
-            objetivo = motivo_data['objetivo']
-            conclusion = motivo_data['conclusion']
-        else:
-            # Texto genérico si no encuentra coincidencia
-            intro = "diversos problemas operativos"
-            accion_especifica = "análisis personalizado y plan de mejora"
-            objetivo = "resolver las problemáticas identificadas"
-            conclusion = "mejorando procesos"
-        
-    # Generar el texto completo simplificado
-    return f"""El equipo de distribución del CD Soyapango informa sobre clientes con {intro} en la semana {week_num}. Se solicita apoyo en <b>{accion_especifica}</b> para {objetivo}, {conclusion}. Detalles en la tabla:"""
+    resumen, missing_weeks, report_files = generate_weekly_reports_batch(
+        data, year, weeks_with_data, output_dir=output_dir, force=force, workers=workers
+    )
+    return print_batch_summary(resumen, missing_weeks, "Resumen del mes", report_files)
 
 if __name__ == "__main__":
     import sys
@@ -1124,8 +580,15 @@ if __name__ == "__main__":
                         help='Generate reports for all weeks of specified month')
     parser.add_argument('--output-dir', type=str, 
                         help='Output directory for generated reports')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerate reports even if their inputs did not change')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes to render the PDFs of --all/--month (0: one per CPU core), '
+                             'e.g. --all --workers 0 --output-dir "Offender Clientes Semanales"')
     
     args = parser.parse_args()
+    # 0 (or less) lets render_batch use every core
+    workers = args.workers if args.workers > 0 else None
     
     try:
         if args.all:
@@ -1133,14 +596,19 @@ if __name__ == "__main__":
             current_year = args.year or datetime.now().year
             
             print(f"📅 Procesando todas las semanas del año {current_year}")
-            success_count, error_count = generate_all_weekly_reports(year=current_year)
+            success_count, error_count = generate_all_weekly_reports(
+                year=current_year,
+                output_dir=args.output_dir,
+                force=args.force,
+                workers=workers
+            )
             
             print(f"\n✅ Proceso completado:")
             print(f"   - Reportes generados exitosamente: {success_count}")
             print(f"   - Errores encontrados: {error_count}")
             
             if success_count > 0:
-                print(f"\n📁 Reportes guardados en el directorio actual")
+                print(f"\n📁 Reportes guardados en {args.output_dir or 'el directorio actual'}")
             
         elif args.month:
             print(f"🔄 Generando reportes para todas las semanas del mes {args.month}...")
@@ -1148,7 +616,10 @@ if __name__ == "__main__":
             
             success_count, error_count = generate_monthly_reports(
                 month=args.month, 
-                year=year
+                year=year,
+                force=args.force,
+                output_dir=args.output_dir,
+                workers=workers
             )
             
             print(f"\n✅ Proceso completado:")
@@ -1159,7 +630,7 @@ if __name__ == "__main__":
             print(f"🔄 Generando reporte para la semana {args.week}...")
             year = args.year or datetime.now().year
             
-            success = generate_weekly_report_for_any_week(args.week, year)
+            success = generate_weekly_report_for_any_week(args.week, year, force=args.force)
             if success:
                 print(f"✅ Reporte generado exitosamente para la semana {args.week} del {year}")
             else:
@@ -1168,7 +639,7 @@ if __name__ == "__main__":
         else:
             # Default behavior: generate report for current week
             print("🔄 Generando reporte para la semana actual...")
-            main(output_dir=args.output_dir)
+            main(output_dir=args.output_dir, force=args.force)
             print("✅ Reporte generado exitosamente")
             
     except Exception as e:
@@ -12,6 +12,7 @@ import calendar
 import os
 import re
 import io
+from feedbacks_core import load_dataset, load_feedbacks, MES_INGLES_A_ESPANOL, RUTAS_DEFAULT_FILE
 
 # Define the required signatures for the report - exactly matching the example names
 SIGNATURES = [
@@ -22,57 +23,18 @@ SIGNATURES = [
 ]
 
 def load_data():
-    """Load and preprocess the feedback data"""
+    """Load the shared FeedbackDataset (derived columns + routes merge computed once)"""
     try:
-        # Load the feedbacks data
-        feedbacks_df = pd.read_excel('Feedbacks H1.xlsx')
+        # Prefer the route database of the current month, fall back to the default one
+        month_esp = MES_INGLES_A_ESPANOL.get(datetime.now().strftime("%B"))
+        month_file = f'BD_Rutas_{month_esp}.xlsx'
+        rutas_path = month_file if os.path.exists(month_file) else RUTAS_DEFAULT_FILE
         
-        # Convert date columns
-        feedbacks_df['fecha_registro'] = pd.to_datetime(feedbacks_df['fecha_registro'])
-        feedbacks_df['fecha_cierre'] = pd.to_datetime(feedbacks_df['fecha_cierre'])
-        
-        # Create time-based columns for analysis
-        feedbacks_df['year'] = feedbacks_df['fecha_registro'].dt.year
-        feedbacks_df['month'] = feedbacks_df['fecha_registro'].dt.month
-        feedbacks_df['week'] = feedbacks_df['fecha_registro'].dt.isocalendar().week
-        feedbacks_df['weekday'] = feedbacks_df['fecha_registro'].dt.day_name()
-        
-        # Calculate resolution time in days for closed issues
-        feedbacks_df['tiempo_cierre_dias'] = (
-            feedbacks_df['fecha_cierre'] - feedbacks_df['fecha_registro']
-        ).dt.days.fillna(0)
-        
-        # Try to load the routes database
         try:
-            # First try to load the most recent month-specific database
-            current_month = datetime.now().strftime("%B")
-            month_map = {
-                'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
-                'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
-                'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
-                'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-            }
-            month_esp = month_map.get(current_month, current_month)
-            
-            month_file = f'BD_Rutas_{month_esp}.xlsx'
-            if os.path.exists(month_file):
-                rutas_df = pd.read_excel(month_file)
-            else:
-                rutas_df = pd.read_excel('BD_Rutas.xlsx')
-                
-            # Merge with the routes data
-            merged_df = feedbacks_df.merge(
-                rutas_df,
-                left_on='ruta',
-                right_on='RUTA',
-                how='left'
-            )
-            
-            return merged_df
-            
+            return load_dataset(rutas_path=rutas_path).merged
         except Exception as e:
             print(f"Warning: Could not load routes database. Using only feedbacks data: {e}")
-            return feedbacks_df
+            return load_feedbacks()
             
     except Exception as e:
         print(f"Error loading data: {e}")